@@ -1,6 +1,14 @@
 from django.contrib import admin
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.db.models.functions import Length
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
 
-from .models import Author, Genre, Book, Review
+from .models import Author, Genre, Book, Job, RequestProfile, Review
 
 
 class ReviewInline(admin.StackedInline):
@@ -40,9 +48,116 @@ class BookAdmin(admin.ModelAdmin):
         ReviewInline
     ]
     exclude = ('authors', 'genres')
+    # Review aggregates are maintained automatically on review writes.
+    readonly_fields = ('num_reviews', 'avg_rating')
+
+
+class JobAdmin(admin.ModelAdmin):
+    """
+    Dashboard of background jobs: number of jobs by status, failed jobs with errors and retry action.
+    """
+    change_list_template = 'admin/book_review/job/change_list.html'
+    list_display = ('__str__', 'status', 'attempts', 'run_at', 'started_at', 'finished_at', 'worker', 'dedup_key')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'dedup_key')
+    ordering = ('-run_at',)
+    actions = ['retry_jobs']
+    readonly_fields = [field.name for field in Job._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        counts = dict(Job.objects.values_list('status').annotate(count=Count('pk')).order_by())
+        extra_context = {
+            **(extra_context or {}),
+            'status_counts': [(label, counts.get(status, 0)) for status, label in Job.STATUSES],
+        }
+        return super().changelist_view(request, extra_context=extra_context)
+
+    @admin.action(description='Retry selected failed jobs')
+    def retry_jobs(self, request, queryset):
+        retried = 0
+        for job in queryset.filter(status=Job.FAILED):
+            try:
+                with transaction.atomic():
+                    Job.objects.filter(pk=job.pk).update(status=Job.QUEUED, attempts=0, run_at=timezone.now())
+                retried += 1
+            except IntegrityError:
+                # The same job is already queued.
+                pass
+        self.message_user(request, 'Queued again {0} job(s).'.format(retried))
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    Profiles of requests made by staff users (see book_review.custom.profiling) with links to download
+    text report and pstats file. Expired profiles are hidden.
+    """
+    list_display = ('__str__', 'view_name', 'status_code', 'duration_ms', 'num_queries', 'user', 'created_at',
+                    'downloads')
+    list_filter = ('view_name',)
+    search_fields = ('path',)
+    ordering = ('-created_at',)
+    fields = ('method', 'path', 'view_name', 'status_code', 'duration_ms', 'num_queries', 'user', 'created_at',
+              'expires_at', 'downloads', 'report_text')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request).filter(expires_at__gt=timezone.now())
+        return queryset.defer('report', 'stats').annotate(stats_size=Length('stats'))
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/report/', self.admin_site.admin_view(self.download_report),
+                 name='book_review_requestprofile_report'),
+            path('<int:pk>/stats/', self.admin_site.admin_view(self.download_stats),
+                 name='book_review_requestprofile_stats'),
+        ] + super().get_urls()
+
+    @admin.display(description='Time, ms', ordering='duration')
+    def duration_ms(self, profile):
+        return round(profile.duration * 1000, 1)
+
+    @admin.display(description='Downloads')
+    def downloads(self, profile):
+        links = [('report', 'Report')] + ([('stats', 'pstats')] if profile.stats_size else [])
+        return format_html_join(' ', '<a href="{0}">{1}</a>', (
+            (reverse('admin:book_review_requestprofile_' + kind, args=[profile.pk]), label) for kind, label in links
+        ))
+
+    @admin.display(description='Report')
+    def report_text(self, profile):
+        return format_html('<pre style="white-space: pre-wrap;">{0}</pre>', profile.report)
+
+    def _get_profile(self, request, pk):
+        if not self.has_view_permission(request):
+            raise Http404
+        return get_object_or_404(self.get_queryset(request).defer(None), pk=pk)
+
+    def download_report(self, request, pk):
+        response = HttpResponse(self._get_profile(request, pk).report, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="profile-{0}.txt"'.format(pk)
+        return response
+
+    def download_stats(self, request, pk):
+        profile = self._get_profile(request, pk)
+        if not profile.stats:
+            raise Http404
+        response = HttpResponse(bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = 'attachment; filename="profile-{0}.prof"'.format(pk)
+        return response
 
 
 admin.site.register(Book, BookAdmin)
 admin.site.register(Author, AuthorAdmin)
 admin.site.register(Genre, GenreAdmin)
 admin.site.register(Review)
+admin.site.register(Job, JobAdmin)
+admin.site.register(RequestProfile, RequestProfileAdmin)
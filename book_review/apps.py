@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class BookReviewConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'book_review'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+        from . import jobs, signals  # noqa: F401
+        from .custom.metrics import instrument_templates
+        from .middleware import count_connection_queries
+
+        connection_created.connect(count_connection_queries)
+        if settings.METRICS:
+            instrument_templates()
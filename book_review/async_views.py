@@ -0,0 +1,197 @@
+"""
+Async versions of read-only views, served by ASGI application (see mysite/asgi.py and 'ASYNC_READ_VIEWS' setting).
+Views reuse querysets, templates and caching of their sync versions from book_review.views.
+Django 3.2 has no async ORM, so every query runs in a thread by sync_to_async.
+Independent queries of a page (number of books and page of books, or book, page of reviews and user's review)
+run concurrently, each in its own thread with its own database connection.
+Less common requests (cursor pagination, redirects, invalid search forms) are served by sync views in a thread.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.paginator import InvalidPage, Page
+from django.db import close_old_connections
+from django.http import Http404
+
+from . import views
+from .custom.constants import REVIEWS_PER_PAGE
+from .custom.pagination import CountedPaginator
+from .forms import SearchForm
+
+
+def _run_with_own_connection(function, *args):
+    # Thread pool threads don't get request signals, so expired connections are closed here.
+    # Queries are counted by counters of request context (see book_review.middleware.count_queries).
+    close_old_connections()
+    try:
+        return function(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_query(function, *args):
+    """
+    Runs function making database queries in a separate thread, so several functions may run concurrently.
+    """
+    return await sync_to_async(_run_with_own_connection, thread_sensitive=False)(function, *args)
+
+
+def _get_page_number(value):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise Http404('Page is not “last”, nor can it be converted to an int.')
+    if number < 1:
+        raise Http404('That page number is less than 1')
+    return number
+
+
+class AsyncReadView:
+    """
+    Base class of async read-only views.
+    Responses for anonymous users are cached the same way as sync views do (see CachedViewMixin).
+    """
+    view_class = None
+
+    @classmethod
+    def as_view(cls):
+        async def view(request, *args, **kwargs):
+            return await cls().dispatch(request, *args, **kwargs)
+
+        # Lets middleware recognize view attributes, e.g. 'read_from_replica'.
+        view.view_class = cls.view_class
+        return view
+
+    def can_run_async(self, view):
+        """
+        Returns False if request should be served by sync view.
+        """
+        return view.request.method == 'GET'
+
+    def get_cache_key(self, view):
+        if view.request.user.is_authenticated or not hasattr(view, 'get_cache_key'):
+            return None
+        return view.get_cache_key()
+
+    async def get_context_data(self, view):
+        raise NotImplementedError
+
+    async def dispatch(self, request, *args, **kwargs):
+        view = self.view_class()
+        view.setup(request, *args, **kwargs)
+        if not self.can_run_async(view):
+            return await sync_to_async(self.view_class.as_view())(request, *args, **kwargs)
+
+        # Session and user are loaded here, so views and templates don't query database in event loop.
+        cache_key = await sync_to_async(self.get_cache_key)(view)
+        if cache_key is not None:
+            response = await sync_to_async(cache.get)(cache_key)
+            if response is not None:
+                return response
+
+        context = await self.get_context_data(view)
+        response = view.render_to_response(context)
+        await sync_to_async(response.render)()
+        if cache_key is not None and response.status_code == 200:
+            await sync_to_async(cache.set)(cache_key, response, view.get_cache_timeout())
+        return response
+
+
+class AsyncListView(AsyncReadView):
+    """
+    Fetches number of objects and requested page concurrently.
+    """
+    def can_run_async(self, view):
+        page = view.request.GET.get(view.page_kwarg, '1')
+        return super().can_run_async(view) and view.cursor_kwarg not in view.request.GET and page != 'last'
+
+    async def get_context_data(self, view):
+        # Search view finds ids of books while getting queryset.
+        queryset = await run_query(view.get_queryset)
+        per_page = view.get_paginate_by(queryset)
+        number = _get_page_number(view.request.GET.get(view.page_kwarg, '1'))
+        offset = (number - 1) * per_page
+        count, objects = await asyncio.gather(
+            run_query(queryset.count),
+            run_query(list, queryset[offset:offset + per_page]),
+        )
+
+        paginator = CountedPaginator(queryset, per_page, count=count)
+        try:
+            paginator.validate_number(number)
+        except InvalidPage as e:
+            raise Http404(str(e))
+        page = Page(objects, number, paginator)
+
+        # Page is already fetched, so sync view builds its context without queries.
+        view.paginate_queryset = lambda queryset, page_size: (paginator, page, objects, page.has_other_pages())
+        view.object_list = queryset
+        return await sync_to_async(view.get_context_data)()
+
+
+class AsyncIndexView(AsyncListView):
+    view_class = views.IndexListView
+
+
+class AsyncBooksListView(AsyncListView):
+    view_class = views.BooksListView
+
+    def can_run_async(self, view):
+        # Missing order is redirected by sync view.
+        return super().can_run_async(view) and view.request.GET.get('order') is not None
+
+
+class AsyncSearchListView(AsyncListView):
+    view_class = views.SearchListView
+
+    def can_run_async(self, view):
+        # Invalid search forms are rendered by sync view.
+        return super().can_run_async(view) and SearchForm(data=view.request.GET).is_valid()
+
+
+class AsyncBookDetailView(AsyncReadView):
+    """
+    Fetches book, page of its reviews and user's review concurrently.
+    Number of reviews is taken from the book, so page out of range is fetched again when the book is known.
+    """
+    view_class = views.BookDetailView
+
+    async def get_context_data(self, view):
+        user = view.get_user()
+        reviews = view.get_reviews(user)
+        per_page = REVIEWS_PER_PAGE
+        # Same page as Paginator.get_page returns: first page for invalid number, last page for number out of range.
+        try:
+            number = int(view.request.GET.get('page', '1'))
+        except ValueError:
+            number = 1
+
+        def get_reviews_page(number):
+            if number < 1:
+                return []
+            return list(reviews[(number - 1) * per_page:number * per_page])
+
+        book, user_review, objects = await asyncio.gather(
+            run_query(view.get_object),
+            run_query(view.get_user_review, user),
+            run_query(get_reviews_page, number),
+        )
+
+        paginator = CountedPaginator(reviews, per_page, count=book.num_reviews)
+        if not 1 <= number <= paginator.num_pages:
+            number = paginator.num_pages
+            objects = await run_query(get_reviews_page, number)
+        page = Page(objects, number, paginator)
+
+        # Reviews are already fetched, so sync view builds its context without queries.
+        view.get_reviews_context = lambda book: {
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': True,
+            'reviews': reviews,
+            'user_review': user_review,
+        }
+        view.object = book
+        return await sync_to_async(view.get_context_data)(object=book)
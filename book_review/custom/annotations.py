@@ -1,37 +1,32 @@
 """
-This module provides two annotated query sets:
+This module provides two query sets:
 Annotated books and annotated authors.
-Both sets are used in search function.
-Annotated books are also needed to order books by specific value
+Books are used in search function, authors (with names) in autocomplete suggestions.
+Books are also needed to order books by specific value
 (such as average rating value of all reviews, number of reviews etc.)
 """
 
-from django.db.models import Avg, Count, Value
-from django.db.models.functions import Coalesce, Concat
+from django.db.models import Value
+from django.db.models.functions import Concat
 
 from book_review.models import Book, Author
 
 
 def get_annotated_books(books_queryset):
     """
-    Annotates Book model with 2 fields.
-    Number of reviews and average rating of all reviews on this book.
+    Number of reviews and average rating of all reviews on a book
+    are stored in Book model fields ('num_reviews' and 'avg_rating'),
+    so no aggregation over reviews is needed anymore.
     Both fields are used in sorting and displayed in book card and book details page.
     """
-    num_reviews = Count('review__id')
-    avg_rating = Coalesce(Avg('review__rating'), float(0))
-    annotated_books_queryset = books_queryset.annotate(
-        num_reviews=num_reviews,
-        avg_rating=avg_rating
-    )
-    return annotated_books_queryset
+    return books_queryset
 
 
 def get_annotated_authors(authors_queryset):
     """
     Annotates Author model with 2 fields.
     Short name (first name and last name) and full name (first name, patronymic, last name)
-    Both fields are used in search function.
+    Both fields are used by autocomplete. Search matches authors by stored Author.search_key instead.
     """
     author_full_name = Concat('first_name', Value(' '), 'patronymic', Value(' '), 'last_name')
     author_short_name = Concat('first_name', Value(' '), 'last_name')
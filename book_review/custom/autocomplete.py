@@ -0,0 +1,339 @@
+"""
+This module provides search-as-you-type suggestions of book titles, author names and genres.
+Suggestions are served from an in-process prefix index, so lookups never query database:
+every word of a name starts a term ('leo tolstoy', 'tolstoy'), terms are kept in a sorted array
+and a prefix matches a contiguous range found by binary search.
+Best suggestions (by number of reviews) of prefixes with long ranges (short or common ones) are precomputed.
+
+Index is changed incrementally when books, authors or genres are saved or deleted (see book_review.signals),
+and is reloaded periodically, since numbers of reviews change by queryset updates (see book_review.custom.memory_index).
+"""
+
+import bisect
+import heapq
+from array import array
+from itertools import chain
+
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from book_review.models import Author, Book, Genre
+from .annotations import annotated_authors
+from .memory_index import InMemoryIndex
+from .constants import (
+    AUTOCOMPLETE_CHECK_INTERVAL, AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_AGE, AUTOCOMPLETE_PREFIX_LENGTH,
+    AUTOCOMPLETE_SCAN_LIMIT,
+)
+from .text import normalize
+
+SUGGESTION_KINDS = ['book', 'author', 'genre']
+
+# Sorts after any character, so prefix + TERM_END is an upper bound of terms starting with prefix.
+TERM_END = '\U0010ffff'
+
+
+def get_terms(names):
+    """
+    Returns sorted terms of given names: every word of a name starts a term.
+    """
+    terms = set()
+    for name in names:
+        words = normalize(name)
+        terms.update(' '.join(words[i:]) for i in range(len(words)))
+    return sorted(terms)
+
+
+def get_top_prefixes(terms, crowded, crowded_length):
+    """
+    Returns prefixes of given terms, for which best suggestions are precomputed:
+    short ones and crowded ones (up to 'crowded_length' characters long).
+    """
+    prefixes = set()
+    for term in terms:
+        prefixes.update(term[:length] for length in range(1, min(len(term), AUTOCOMPLETE_PREFIX_LENGTH) + 1))
+        prefixes.update(
+            term[:length] for length in range(AUTOCOMPLETE_PREFIX_LENGTH + 1, min(len(term), crowded_length) + 1)
+            if term[:length] in crowded
+        )
+    return {prefix for prefix in prefixes if not prefix.endswith(' ')}
+
+
+def get_prefix_ranges(terms):
+    """
+    Yields (prefix, start, stop) ranges of sorted terms for prefixes up to AUTOCOMPLETE_PREFIX_LENGTH characters long
+    and for crowded longer prefixes, which start more than AUTOCOMPLETE_SCAN_LIMIT terms.
+    Only ranges of yielded prefixes are split by the next character, so a few bisections are made per prefix.
+    """
+    ranges = [(0, len(terms), 0)]
+    while ranges:
+        start, stop, length = ranges.pop()
+        position = start
+        while position < stop:
+            prefix = terms[position][:length + 1]
+            if len(prefix) <= length:
+                # Term equal to prefix of the range sorts first.
+                position += 1
+                continue
+            end = bisect.bisect_left(terms, prefix + TERM_END, position, stop)
+            if len(prefix) <= AUTOCOMPLETE_PREFIX_LENGTH or end - position > AUTOCOMPLETE_SCAN_LIMIT:
+                if not prefix.endswith(' '):
+                    yield prefix, position, end
+                ranges.append((position, end, length + 1))
+            position = end
+
+
+class Suggestion:
+    """
+    Book, author or genre suggested by autocomplete. Weight is a number of reviews of the book (or of author's books).
+    """
+    __slots__ = ['kind', 'pk', 'label', 'slug', 'weight']
+
+    def __init__(self, kind, pk, label, weight, slug=None):
+        self.kind = kind
+        self.pk = pk
+        self.label = label
+        self.weight = weight or 0
+        self.slug = slug
+
+    @property
+    def rank(self):
+        return -self.weight, self.label
+
+    def get_url(self):
+        if self.kind == 'book':
+            return reverse('book_review:book', kwargs={'pk': self.pk, 'slug': self.slug})
+        return '{0}?{1}'.format(reverse('book_review:search'), urlencode({'q': self.label, 'category': self.kind}))
+
+    def as_dict(self):
+        return {'kind': self.kind, 'label': self.label, 'url': self.get_url(), 'weight': self.weight}
+
+
+def get_book_suggestion(book):
+    return Suggestion('book', book.pk, book.title, book.num_reviews, slug=book.slug), [book.title]
+
+
+def get_author_suggestion(author, weight=0):
+    full_name = ' '.join([author.first_name, author.patronymic, author.last_name])
+    short_name = ' '.join([author.first_name, author.last_name])
+    return Suggestion('author', author.pk, ' '.join(full_name.split()), weight), [full_name, short_name]
+
+
+def get_genre_suggestion(genre, weight=0):
+    return Suggestion('genre', genre.pk, genre.name, weight), [genre.name]
+
+
+def load_suggestions():
+    """
+    Yields (suggestion, names) pairs of all books, authors and genres.
+    Authors and genres are weighted by total number of reviews of their books.
+    """
+    books = Book.objects.order_by().values_list('pk', 'title', 'slug', 'num_reviews')
+    for pk, title, slug, num_reviews in books.iterator():
+        yield Suggestion('book', pk, title, num_reviews, slug=slug), [title]
+
+    authors = annotated_authors.order_by().annotate(weight=Coalesce(Sum('book__num_reviews'), 0))
+    for pk, full_name, short_name, weight in authors.values_list('pk', 'full_name', 'short_name', 'weight').iterator():
+        yield Suggestion('author', pk, ' '.join(full_name.split()), weight), [full_name, short_name]
+
+    genres = Genre.objects.order_by().annotate(weight=Coalesce(Sum('book__num_reviews'), 0))
+    for pk, name, weight in genres.values_list('pk', 'name', 'weight').iterator():
+        yield Suggestion('genre', pk, name, weight), [name]
+
+
+class AutocompleteIndex(InMemoryIndex):
+    """
+    Prefix index of suggestions.
+    Terms are stored in a sorted list with a parallel array of entry ids, so memory is a few objects per term.
+    Best suggestions of every kind are kept in 'top' lists ordered by rank for short prefixes
+    and for prefixes crowded when index was built. Other prefixes match short ranges, which are scanned.
+    """
+    generation_name = 'autocomplete'
+    check_interval = AUTOCOMPLETE_CHECK_INTERVAL
+    max_age = AUTOCOMPLETE_MAX_AGE
+
+    def clear(self):
+        self.entries = []
+        self.entry_ids = {}
+        self.entry_terms = {}
+        self.terms = []
+        self.term_entries = array('q')
+        self.top = {}
+        self.crowded = set()
+        self.crowded_length = 0
+
+    def _rank(self, entry_id):
+        return self.entries[entry_id].rank
+
+    def _get_top_prefixes(self, terms):
+        return get_top_prefixes(terms, self.crowded, self.crowded_length)
+
+    def build(self, suggestions):
+        """
+        Replaces all suggestions by given (suggestion, names) pairs.
+        Top lists are computed from ranges of every kind's own sorted terms, so each list is one slice and one sort.
+        """
+        entries, entry_ids, entry_terms, kind_pairs = [], {}, {}, {kind: [] for kind in SUGGESTION_KINDS}
+        for suggestion, names in suggestions:
+            entry_id = len(entries)
+            entries.append(suggestion)
+            entry_ids[suggestion.kind, suggestion.pk] = entry_id
+            entry_terms[entry_id] = get_terms(names)
+            kind_pairs[suggestion.kind].extend((term, entry_id) for term in entry_terms[entry_id])
+        pairs = sorted(chain.from_iterable(kind_pairs.values()))
+        terms = [term for term, entry_id in pairs]
+        prefixes = {prefix for prefix, start, stop in get_prefix_ranges(terms)}
+        crowded = {prefix for prefix in prefixes if len(prefix) > AUTOCOMPLETE_PREFIX_LENGTH}
+
+        # Positions of entries ordered by rank make a cheap sort key.
+        positions = [0] * len(entries)
+        for position, entry_id in enumerate(sorted(range(len(entries)), key=lambda entry_id: entries[entry_id].rank)):
+            positions[entry_id] = position
+        top = {}
+        for kind, pairs_of_kind in kind_pairs.items():
+            pairs_of_kind.sort()
+            kind_terms = [term for term, entry_id in pairs_of_kind]
+            kind_entries = [entry_id for term, entry_id in pairs_of_kind]
+            for prefix in prefixes:
+                start = bisect.bisect_left(kind_terms, prefix)
+                stop = bisect.bisect_left(kind_terms, prefix + TERM_END, start)
+                if start < stop:
+                    best = sorted(set(kind_entries[start:stop]), key=positions.__getitem__)
+                    top[kind, prefix] = best[:AUTOCOMPLETE_LIMIT]
+
+        with self.lock:
+            self.entries, self.entry_ids, self.entry_terms, self.top = entries, entry_ids, entry_terms, top
+            self.crowded, self.crowded_length = crowded, max(map(len, crowded), default=0)
+            self.terms = terms
+            self.term_entries = array('q', (entry_id for term, entry_id in pairs))
+
+    def _get_range(self, prefix):
+        return bisect.bisect_left(self.terms, prefix), bisect.bisect_left(self.terms, prefix + TERM_END)
+
+    def _scan(self, prefix, kinds):
+        start, stop = self._get_range(prefix)
+        return {entry_id for entry_id in self.term_entries[start:stop] if self.entries[entry_id].kind in kinds}
+
+    def lookup(self, q, kinds=SUGGESTION_KINDS, limit=AUTOCOMPLETE_LIMIT):
+        """
+        Returns up to 'limit' suggestions of given kinds with names containing a word starting with q,
+        ordered by weight and label.
+        """
+        prefix = ' '.join(normalize(q))
+        if not prefix or limit < 1:
+            return []
+        with self.lock:
+            if len(prefix) <= AUTOCOMPLETE_PREFIX_LENGTH or prefix in self.crowded:
+                candidates = set(chain.from_iterable(self.top.get((kind, prefix), ()) for kind in kinds))
+            else:
+                candidates = self._scan(prefix, kinds)
+            return [self.entries[entry_id] for entry_id in heapq.nsmallest(limit, candidates, key=self._rank)]
+
+    def get_weight(self, kind, pk):
+        with self.lock:
+            entry_id = self.entry_ids.get((kind, pk))
+            return 0 if entry_id is None else self.entries[entry_id].weight
+
+    def _insert_term(self, term, entry_id):
+        position = bisect.bisect_right(self.terms, term)
+        self.terms.insert(position, term)
+        self.term_entries.insert(position, entry_id)
+
+    def _remove_term(self, term, entry_id):
+        start, stop = bisect.bisect_left(self.terms, term), bisect.bisect_right(self.terms, term)
+        for position in range(start, stop):
+            if self.term_entries[position] == entry_id:
+                del self.terms[position]
+                del self.term_entries[position]
+                return
+
+    def _rebuild_top(self, kind, prefix):
+        best = heapq.nsmallest(AUTOCOMPLETE_LIMIT, self._scan(prefix, [kind]), key=self._rank)
+        if best:
+            self.top[kind, prefix] = best
+        else:
+            self.top.pop((kind, prefix), None)
+
+    def _promote(self, kind, prefix, entry_id):
+        best = self.top.setdefault((kind, prefix), [])
+        if entry_id not in best:
+            best.append(entry_id)
+        best.sort(key=self._rank)
+        del best[AUTOCOMPLETE_LIMIT:]
+
+    def put(self, suggestion, names):
+        """
+        Adds suggestion or replaces suggestion of the same object.
+        Top lists are recomputed only if replaced suggestion was in them and got worse rank or lost a prefix.
+        """
+        kind = suggestion.kind
+        terms = get_terms(names)
+        with self.lock:
+            entry_id = self.entry_ids.get((kind, suggestion.pk))
+            if entry_id is None:
+                entry_id = len(self.entries)
+                self.entries.append(suggestion)
+                self.entry_ids[kind, suggestion.pk] = entry_id
+                old_terms, demoted = [], False
+            else:
+                old_terms, demoted = self.entry_terms[entry_id], suggestion.rank > self.entries[entry_id].rank
+                self.entries[entry_id] = suggestion
+            self.entry_terms[entry_id] = terms
+
+            for term in set(old_terms) - set(terms):
+                self._remove_term(term, entry_id)
+            for term in set(terms) - set(old_terms):
+                self._insert_term(term, entry_id)
+
+            old_prefixes, prefixes = self._get_top_prefixes(old_terms), self._get_top_prefixes(terms)
+            for prefix in old_prefixes - prefixes:
+                if entry_id in self.top.get((kind, prefix), ()):
+                    self._rebuild_top(kind, prefix)
+            for prefix in prefixes:
+                if demoted and entry_id in self.top.get((kind, prefix), ()):
+                    self._rebuild_top(kind, prefix)
+                else:
+                    self._promote(kind, prefix, entry_id)
+
+    def remove(self, kind, pk):
+        with self.lock:
+            entry_id = self.entry_ids.pop((kind, pk), None)
+            if entry_id is None:
+                return
+            terms = self.entry_terms.pop(entry_id)
+            for term in terms:
+                self._remove_term(term, entry_id)
+            for prefix in self._get_top_prefixes(terms):
+                if entry_id in self.top.get((kind, prefix), ()):
+                    self._rebuild_top(kind, prefix)
+            self.entries[entry_id] = None
+
+    def build_from_database(self):
+        self.build(load_suggestions())
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+def get_suggestions(q, kinds=SUGGESTION_KINDS, limit=AUTOCOMPLETE_LIMIT):
+    autocomplete_index.refresh()
+    return autocomplete_index.lookup(q, kinds, limit)
+
+
+def update_suggestion(instance):
+    """
+    Updates suggestion of saved book, author or genre. Weights of authors and genres are kept until next reload.
+    """
+    if isinstance(instance, Book):
+        suggestion, names = get_book_suggestion(instance)
+    elif isinstance(instance, Author):
+        suggestion, names = get_author_suggestion(instance, autocomplete_index.get_weight('author', instance.pk))
+    else:
+        suggestion, names = get_genre_suggestion(instance, autocomplete_index.get_weight('genre', instance.pk))
+    autocomplete_index.apply(lambda index: index.put(suggestion, names))
+
+
+def remove_suggestion(instance):
+    kind, pk = type(instance).__name__.lower(), instance.pk
+    autocomplete_index.apply(lambda index: index.remove(kind, pk))
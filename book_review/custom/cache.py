@@ -0,0 +1,133 @@
+"""
+This module provides response caching of read-heavy views.
+Cached responses are invalidated by generation counters instead of deleting keys:
+every cache key contains current generations of data the page depends on,
+so bumping a generation makes all dependent keys unreachable and they simply expire.
+Generations are bumped by model signals (see book_review.signals).
+Only cache API calls supported by every backend (get_many, add, incr, set) are used,
+so it works with locmem, file and Redis-compatible backends.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpRequest
+
+from ..routers import reads_from_replica
+from .constants import VIEW_CACHE_TIMEOUT
+from .dates import get_today
+
+# Generation of every list of books (index, published books lists).
+BOOKS_GENERATION = 'books'
+
+
+def get_book_generation_name(book_id):
+    return 'book:{0}'.format(book_id)
+
+
+def _get_generation_key(name):
+    return 'generation:{0}'.format(name)
+
+
+def _get_initial_generation():
+    # Evicted counter must not start from value used before, otherwise stale pages become reachable again.
+    return time.time_ns()
+
+
+def get_generations(names):
+    """
+    Returns current generations of given names as a list.
+    """
+    keys = [_get_generation_key(name) for name in names]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _get_initial_generation(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generations(names):
+    """
+    Invalidates every cached response depending on given generations. Returns new generations as a list.
+    """
+    generations = []
+    for name in names:
+        key = _get_generation_key(name)
+        try:
+            generations.append(cache.incr(key))
+        except ValueError:
+            generations.append(_get_initial_generation())
+            cache.set(key, generations[-1], timeout=None)
+    return generations
+
+
+def invalidate_books(book_ids):
+    """
+    Invalidates lists of books and detail pages of given books after current transaction is committed.
+    Invalidating earlier would let concurrent request cache a page built from not yet committed data.
+    """
+    names = [BOOKS_GENERATION] + [get_book_generation_name(book_id) for book_id in set(book_ids)]
+    transaction.on_commit(lambda: bump_generations(names))
+
+
+def get_anonymous_request(path):
+    """
+    Returns GET request of a given path, as anonymous visitor without cookies reaches a view after middleware.
+    It lets cached views render their pages outside of requests (see warm_book_views job).
+    """
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = path
+    request.user = AnonymousUser()
+    return request
+
+
+class CachedViewMixin:
+    """
+    Caches rendered responses of anonymous GET requests.
+    Cache key consists of view name, current date, generations returned by 'get_cache_generations',
+    and full path with url arguments (ordering, page, cursor, etc.).
+    Current date makes cached pages roll over at midnight, when anticipated books become published.
+    Authenticated users always get fresh responses, since pages contain their personal data.
+    Page rendered from a lagging replica may miss changes which already bumped generations,
+    so it is cached only for 'REPLICA_STICKINESS' seconds, until replica catches up.
+    """
+    cache_timeout = VIEW_CACHE_TIMEOUT
+
+    def get_cache_timeout(self):
+        if reads_from_replica():
+            return min(self.cache_timeout, settings.REPLICA_STICKINESS)
+        return self.cache_timeout
+
+    def get_cache_generations(self):
+        return [BOOKS_GENERATION]
+
+    def get_cache_key(self):
+        generations = get_generations(self.get_cache_generations())
+        path = hashlib.md5(self.request.get_full_path().encode()).hexdigest()
+        return 'view:{0}:{1}:{2}:anonymous:{3}'.format(
+            type(self).__name__, get_today().isoformat(), '.'.join(str(generation) for generation in generations), path
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+
+        cache_key = self.get_cache_key()
+        response = cache.get(cache_key)
+        if response is not None:
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200:
+            timeout = self.get_cache_timeout()
+            if hasattr(response, 'render') and callable(response.render):
+                response.add_post_render_callback(lambda r: cache.set(cache_key, r, timeout))
+            else:
+                cache.set(cache_key, response, timeout)
+        return response
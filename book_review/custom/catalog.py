@@ -0,0 +1,107 @@
+"""
+This module describes catalog exchange format used by 'import_catalog' and 'export_catalog' commands.
+One record describes one book together with its authors and genres.
+In JSONL authors are objects and genres are a list of names.
+In CSV authors and genres are semicolon separated, every author is written as "Full Name (YYYY-MM-DD)",
+so exported catalog can be imported back.
+"""
+
+import csv
+import datetime
+import json
+import re
+
+BOOK_FIELDS = ['title', 'original_title', 'pub_date', 'language', 'country', 'description', 'pages']
+CSV_FIELDS = BOOK_FIELDS + ['authors', 'genres']
+CSV_LIST_SEPARATOR = ';'
+
+AUTHOR_RE = re.compile(r'^(?P<name>.+?)\s*\((?P<born>\d{4}-\d{2}-\d{2})\)$')
+
+
+class CatalogFormatError(ValueError):
+    pass
+
+
+def format_author(author):
+    """
+    Returns author written as "Full Name (YYYY-MM-DD)".
+    """
+    return '{0} ({1})'.format(author, author.born.isoformat())
+
+
+def parse_author(value):
+    """
+    Returns (first name, patronymic, last name, born) tuple from "Full Name (YYYY-MM-DD)" string.
+    Name of two words has no patronymic, all middle words of longer name are patronymic.
+    """
+    match = AUTHOR_RE.match(value.strip())
+    if match is None or len(match.group('name').split()) < 2:
+        raise CatalogFormatError('Author must be written as "First [Patronymic] Last (YYYY-MM-DD)": {0}'.format(value))
+    names = match.group('name').split()
+    born = datetime.date.fromisoformat(match.group('born'))
+    return names[0], ' '.join(names[1:-1]), names[-1], born
+
+
+def get_author_key(author):
+    """
+    Returns natural key of author dict or tuple (unique together fields).
+    """
+    if isinstance(author, dict):
+        born = author['born']
+        if isinstance(born, str):
+            born = datetime.date.fromisoformat(born)
+        return author['first_name'], author.get('patronymic') or '', author['last_name'], born
+    return author
+
+
+def normalize_record(record):
+    """
+    Converts raw CSV or JSONL record into a dict with book fields, 'authors' keys and 'genres' names.
+    """
+    try:
+        title = record['title'].strip()
+        pub_date = datetime.date.fromisoformat(str(record['pub_date']).strip())
+    except (KeyError, AttributeError, ValueError) as e:
+        raise CatalogFormatError('Book must have title and pub_date (YYYY-MM-DD): {0}'.format(e))
+    if not title:
+        raise CatalogFormatError('Book title is empty.')
+
+    authors, genres = record.get('authors') or [], record.get('genres') or []
+    if isinstance(authors, str):
+        authors = [parse_author(author) for author in authors.split(CSV_LIST_SEPARATOR) if author.strip()]
+    if isinstance(genres, str):
+        genres = genres.split(CSV_LIST_SEPARATOR)
+    pages = record.get('pages')
+
+    try:
+        return {
+            'title': title,
+            'original_title': (record.get('original_title') or '').strip(),
+            'pub_date': pub_date,
+            'language': (record.get('language') or '').strip(),
+            'country': (record.get('country') or '').strip(),
+            'description': record.get('description') or '',
+            'pages': int(pages) if pages not in (None, '') else None,
+            'authors': [get_author_key(author) for author in authors],
+            'genres': [genre.strip() for genre in genres if genre.strip()],
+        }
+    except (KeyError, ValueError) as e:
+        raise CatalogFormatError('Invalid book record: {0}'.format(e))
+
+
+def read_records(file, file_format):
+    """
+    Yields normalized records from CSV or JSONL file one by one.
+    Errors are reported with line number.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(file)
+        rows = ((reader.line_num, row) for row in reader)
+    else:
+        rows = ((line_num, line) for line_num, line in enumerate(file, start=1) if line.strip())
+
+    for line_num, row in rows:
+        try:
+            yield normalize_record(row if file_format == 'csv' else json.loads(row))
+        except (CatalogFormatError, json.JSONDecodeError) as e:
+            raise CatalogFormatError('Line {0}: {1}'.format(line_num, e))
@@ -9,5 +9,78 @@ RATINGS = [(i, i) for i in range(1, 6)]
 BOOKS_PER_PAGE = 5
 REVIEWS_PER_PAGE = 5
 
+# Widths (in pixels) of book cover derivatives built from uploaded image.
+# Book cards show covers 11.5rem (184px) wide, larger widths are used by high density screens and detail page.
+BOOK_IMAGE_WIDTHS = [184, 368, 552]
+
 # Search constants are used by SearchListView class.
 SEARCH_CATEGORIES = ['book', 'author', 'genre', 'year', 'any']
+
+# Fuzzy search is tried in these categories if exact search finds less than FUZZY_SEARCH_MIN_RESULTS books.
+# It returns at most FUZZY_SEARCH_LIMIT most similar books.
+FUZZY_SEARCH_CATEGORIES = ['book', 'author', 'any']
+FUZZY_SEARCH_MIN_RESULTS = 3
+FUZZY_SEARCH_LIMIT = 100
+
+# Every process caches ordered ids of found books, up to SEARCH_CACHE_MAX_IDS ids in total
+# (8 bytes each) and up to SEARCH_CACHE_MAX_RESULTS ids per query, for SEARCH_CACHE_TIMEOUT seconds.
+# Query finding more books is paged by database, so a miss never loads more than SEARCH_CACHE_MAX_RESULTS + 1 ids.
+# Changes of other processes are noticed within SEARCH_CACHE_CHECK_INTERVAL seconds.
+SEARCH_CACHE_MAX_IDS = 1000000
+SEARCH_CACHE_MAX_RESULTS = 10000
+SEARCH_CACHE_TIMEOUT = 5 * 60
+SEARCH_CACHE_CHECK_INTERVAL = 5
+
+# Autocomplete returns at most AUTOCOMPLETE_LIMIT suggestions, best ones are precomputed for short prefixes
+# and for longer prefixes matching more than AUTOCOMPLETE_SCAN_LIMIT terms.
+# Every process checks once per AUTOCOMPLETE_CHECK_INTERVAL seconds whether other processes changed suggestions,
+# and reloads its index if so, or if index is older than AUTOCOMPLETE_MAX_AGE seconds (review counts change often).
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_PREFIX_LENGTH = 3
+AUTOCOMPLETE_SCAN_LIMIT = 200
+AUTOCOMPLETE_CHECK_INTERVAL = 5
+AUTOCOMPLETE_MAX_AGE = 60 * 60
+
+# Maximum number of database queries per request of each view (by url name).
+# Budgets include 2 queries of authenticated user session (session is usually read from cache, user is not).
+# Used by QueryBudgetMiddleware and view tests. Views missing here are not limited.
+# Search makes one more query if exact search finds too few books and fuzzy search is tried.
+QUERY_BUDGETS = {
+    'book_review:index': 5,
+    'book_review:books_list': 5,
+    'book_review:book': 8,
+    'book_review:search': 6,
+    'book_review:my_reviews': 5,
+    'book_review:add_review': 7,
+    'book_review:edit_review': 8,
+    'book_review:delete_review': 5,
+}
+
+# Background jobs are retried with exponentially growing delay (in seconds) until attempts are exhausted.
+# Running job is considered lost (e.g. worker was killed) after stale timeout and is queued again.
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_MAX_RETRY_DELAY = 60 * 60
+JOB_STALE_TIMEOUT = 30 * 60
+
+# Bounds (seconds) of request latency histogram buckets.
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Slow query log keeps SLOW_QUERY_LOG_SIZE slowest distinct statements of every process.
+# Parameters are shown shortened to SLOW_QUERY_MAX_PARAMS_LENGTH characters.
+SLOW_QUERY_LOG_SIZE = 50
+SLOW_QUERY_MAX_PARAMS_LENGTH = 1000
+
+# Request profiles expire after PROFILE_TIMEOUT seconds, at most PROFILE_MAX_COUNT latest ones are kept.
+# Report keeps PROFILE_MAX_QUERIES queries and PROFILE_MAX_FUNCTIONS functions and is cut to PROFILE_MAX_REPORT_SIZE
+# characters, statistics file larger than PROFILE_MAX_STATS_SIZE bytes is not kept.
+PROFILE_TIMEOUT = 7 * 24 * 60 * 60
+PROFILE_MAX_COUNT = 100
+PROFILE_MAX_QUERIES = 500
+PROFILE_MAX_FUNCTIONS = 100
+PROFILE_MAX_REPORT_SIZE = 1024 * 1024
+PROFILE_MAX_STATS_SIZE = 5 * 1024 * 1024
+
+# Cached responses of book lists and details live at most this number of seconds.
+# Normally they are invalidated much earlier by data changes.
+VIEW_CACHE_TIMEOUT = 60 * 60
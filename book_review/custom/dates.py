@@ -0,0 +1,50 @@
+"""
+This module provides current date in TIME_ZONE, which splits books into anticipated and published.
+Date and the next midnight are computed once a day and kept in process memory,
+so views and templates don't repeat timezone conversions on every call.
+It also parses publication years and ranges of years used by search and book lists.
+"""
+
+import datetime
+import re
+
+from django.utils import timezone
+
+# '1869', '1950-1960' (any dash, spaces allowed) or '1860s'.
+YEAR_RANGE_RE = re.compile(r'^\s*(\d{1,4})(?:\s*[-\u2013\u2014]\s*(\d{1,4})|(0s))?\s*$')
+
+_today = None
+_next_midnight = None
+
+
+def get_today():
+    """
+    Returns current date in TIME_ZONE.
+    """
+    global _today, _next_midnight
+
+    now = timezone.now()
+    if _next_midnight is None or now >= _next_midnight:
+        _today = timezone.localdate(now)
+        _next_midnight = timezone.make_aware(
+            datetime.datetime.combine(_today + datetime.timedelta(days=1), datetime.time.min)
+        )
+    return _today
+
+
+def parse_year_range(text):
+    """
+    Returns (first year, last year) tuple of a year, range of years or decade, or None if text is not one of them.
+    """
+    match = YEAR_RANGE_RE.match(str(text or ''))
+    if match is None:
+        return None
+    first, last, decade = match.groups()
+    if decade:
+        first = int(first) * 10
+        return first, first + 9
+    first = int(first)
+    last = int(last) if last else first
+    if not 1 <= first <= last:
+        return None
+    return first, last
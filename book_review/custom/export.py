@@ -0,0 +1,147 @@
+"""
+This module provides streaming export of books and reviews as CSV or JSONL.
+Export functions are generators of text lines, so the same code writes to a file
+in 'export_catalog' management command and to StreamingHttpResponse in CatalogExportView.
+Rows are read by server-side cursor ('iterator' with chunk size),
+and authors and genres are loaded per chunk of books, so memory use doesn't depend on number of rows.
+Book records use catalog format (see book_review.custom.catalog) extended with review aggregates,
+so exported books can be imported back by 'import_catalog' command.
+"""
+
+import csv
+import itertools
+import json
+from collections import defaultdict
+
+from book_review.models import Book, Review
+from book_review.custom.catalog import BOOK_FIELDS, CSV_FIELDS, CSV_LIST_SEPARATOR, format_author
+from book_review.custom.search import search
+
+EXPORT_KINDS = ['books', 'reviews']
+EXPORT_FORMATS = ['csv', 'jsonl']
+EXPORT_CHUNK_SIZE = 2000
+
+BOOK_EXPORT_FIELDS = CSV_FIELDS + ['num_reviews', 'avg_rating']
+REVIEW_EXPORT_FIELDS = ['book_title', 'book_pub_date', 'owner', 'rating', 'title', 'text', 'pub_date']
+
+
+class Echo:
+    """
+    File-like object returning written value instead of storing it, used to get CSV lines one by one.
+    """
+    def write(self, value):
+        return value
+
+
+def get_export_books(q=None, category=None):
+    """
+    Returns books to export. Books matched by search if query is provided, all books otherwise.
+    """
+    if q:
+        return search(q, category)
+    return Book.objects.order_by('pk')
+
+
+def get_export_reviews(q=None, category=None):
+    """
+    Returns reviews to export. Reviews of books matched by search if query is provided, all reviews otherwise.
+    """
+    reviews = Review.objects.select_related('book', 'owner').order_by('pk')
+    if q:
+        reviews = reviews.filter(book__in=search(q, category).values('pk'))
+    return reviews
+
+
+def iter_books_with_relations(books, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields (book, authors, genres) tuples.
+    Authors and genres are fetched by one query each per chunk of books.
+    """
+    books = books.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(itertools.islice(books, chunk_size))
+        if not chunk:
+            return
+        book_ids = [book.pk for book in chunk]
+        authors, genres = defaultdict(list), defaultdict(list)
+        for link in Book.authors.through.objects.filter(book_id__in=book_ids).select_related('author').order_by('pk'):
+            authors[link.book_id].append(link.author)
+        for link in Book.genres.through.objects.filter(book_id__in=book_ids).select_related('genre').order_by('pk'):
+            genres[link.book_id].append(link.genre)
+        for book in chunk:
+            yield book, authors[book.pk], genres[book.pk]
+
+
+def get_book_record(book, authors, genres):
+    record = {field: getattr(book, field) for field in BOOK_FIELDS}
+    record.update({
+        'pub_date': book.pub_date.isoformat(),
+        'authors': [
+            {
+                'first_name': author.first_name,
+                'patronymic': author.patronymic,
+                'last_name': author.last_name,
+                'born': author.born.isoformat(),
+            }
+            for author in authors
+        ],
+        'genres': [genre.name for genre in genres],
+        'num_reviews': book.num_reviews,
+        'avg_rating': book.avg_rating,
+    })
+    return record
+
+
+def get_review_record(review):
+    return {
+        'book_title': review.book.title,
+        'book_pub_date': review.book.pub_date.isoformat(),
+        'owner': review.owner.username,
+        'rating': review.rating,
+        'title': review.title,
+        'text': review.text,
+        'pub_date': review.pub_date.isoformat(),
+    }
+
+
+def export_books(books, file_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields books as CSV or JSONL lines.
+    """
+    writer = csv.writer(Echo())
+    if file_format == 'csv':
+        yield writer.writerow(BOOK_EXPORT_FIELDS)
+
+    for book, authors, genres in iter_books_with_relations(books, chunk_size):
+        if file_format == 'jsonl':
+            yield json.dumps(get_book_record(book, authors, genres), ensure_ascii=False) + '\n'
+            continue
+        record = get_book_record(book, authors, genres)
+        record['authors'] = CSV_LIST_SEPARATOR.join(format_author(author) for author in authors)
+        record['genres'] = CSV_LIST_SEPARATOR.join(record['genres'])
+        yield writer.writerow([record[field] if record[field] is not None else '' for field in BOOK_EXPORT_FIELDS])
+
+
+def export_reviews(reviews, file_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields reviews as CSV or JSONL lines.
+    """
+    writer = csv.writer(Echo())
+    if file_format == 'csv':
+        yield writer.writerow(REVIEW_EXPORT_FIELDS)
+
+    for review in reviews.iterator(chunk_size=chunk_size):
+        record = get_review_record(review)
+        if file_format == 'jsonl':
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+        else:
+            yield writer.writerow([record[field] for field in REVIEW_EXPORT_FIELDS])
+
+
+def export(kind, file_format, q=None, category=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields lines of requested export.
+    """
+    if kind == 'reviews':
+        return export_reviews(get_export_reviews(q, category), file_format, chunk_size)
+    return export_books(get_export_books(q, category), file_format, chunk_size)
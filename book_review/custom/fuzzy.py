@@ -0,0 +1,159 @@
+"""
+This module provides fuzzy search of books by similar words of titles and author names,
+so misspelled queries ('Tolstoi', 'Dostoevski') still find books.
+It is used by search backends without trigram support in database (PostgreSQL uses pg_trgm instead).
+
+Words of search documents are split into trigrams as pg_trgm does, and every trigram points to words containing it.
+Query word is similar to a document word if share of their common trigrams is at least the threshold.
+Index is changed incrementally when search documents change (see book_review.custom.search_backends)
+and reloaded by other processes (see book_review.custom.memory_index).
+"""
+
+import heapq
+from collections import Counter, defaultdict
+
+from django.db import connection
+
+from book_review.models import BookSearchDocument
+from .constants import FUZZY_SEARCH_LIMIT
+from .memory_index import InMemoryIndex
+from .text import get_trigrams, normalize
+
+FUZZY_FIELDS = ['title', 'authors']
+
+
+class FuzzyIndex(InMemoryIndex):
+    """
+    Trigram index of distinct words with postings of books for every field.
+    """
+    generation_name = 'fuzzy_search'
+
+    def clear(self):
+        self.word_ids = {}
+        self.trigram_counts = []
+        self.trigram_words = defaultdict(set)
+        self.postings = {field: defaultdict(set) for field in FUZZY_FIELDS}
+        self.documents = {}
+
+    def _get_word_id(self, word):
+        word_id = self.word_ids.get(word)
+        if word_id is None:
+            word_id = self.word_ids[word] = len(self.trigram_counts)
+            trigrams = get_trigrams(word)
+            self.trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self.trigram_words[trigram].add(word_id)
+        return word_id
+
+    def _add(self, book_id, texts):
+        document = {}
+        for field, text in zip(FUZZY_FIELDS, texts):
+            document[field] = {self._get_word_id(word) for word in normalize(text)}
+            for word_id in document[field]:
+                self.postings[field][word_id].add(book_id)
+        self.documents[book_id] = document
+
+    def build(self, documents):
+        """
+        Replaces all documents by given (book id, title, authors) tuples.
+        New data is built aside, so searches are not blocked while index is reloaded.
+        """
+        built = type(self)()
+        for book_id, *texts in documents:
+            built._add(book_id, texts)
+        with self.lock:
+            self.word_ids, self.trigram_counts, self.trigram_words = (
+                built.word_ids, built.trigram_counts, built.trigram_words
+            )
+            self.postings, self.documents = built.postings, built.documents
+
+    def put(self, book_id, title, authors):
+        """
+        Adds document of a book or replaces it.
+        """
+        with self.lock:
+            self.remove(book_id)
+            self._add(book_id, [title, authors])
+
+    def remove(self, book_id):
+        with self.lock:
+            document = self.documents.pop(book_id, None)
+            if document is None:
+                return
+            for field, word_ids in document.items():
+                postings = self.postings[field]
+                for word_id in word_ids:
+                    postings[word_id].discard(book_id)
+                    if not postings[word_id]:
+                        del postings[word_id]
+
+    def _get_similar_words(self, word, threshold):
+        trigrams = get_trigrams(word)
+        common = Counter()
+        for trigram in trigrams:
+            common.update(self.trigram_words.get(trigram, ()))
+        for word_id, count in common.items():
+            similarity = count / (len(trigrams) + self.trigram_counts[word_id] - count)
+            if similarity >= threshold:
+                yield word_id, similarity
+
+    def search(self, q, fields=FUZZY_FIELDS, threshold=0.6, limit=FUZZY_SEARCH_LIMIT):
+        """
+        Returns up to 'limit' (book id, similarity) pairs of books having a similar word in given fields
+        for every word of query, ordered by similarity. Similarity of a book is mean of its best word similarities.
+        """
+        words = normalize(q)
+        if not words:
+            return []
+        scores = None
+        with self.lock:
+            for word in words:
+                word_scores = {}
+                for word_id, similarity in self._get_similar_words(word, threshold):
+                    for field in fields:
+                        for book_id in self.postings[field].get(word_id, ()):
+                            if similarity > word_scores.get(book_id, 0):
+                                word_scores[book_id] = similarity
+                if scores is not None:
+                    word_scores = {
+                        book_id: scores[book_id] + similarity
+                        for book_id, similarity in word_scores.items() if book_id in scores
+                    }
+                scores = word_scores
+                if not scores:
+                    return []
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(book_id, score / len(words)) for book_id, score in best]
+
+    def preload(self):
+        # PostgreSQL search backend matches similar words by pg_trgm, so index is only loaded if it's used.
+        if connection.vendor != 'postgresql':
+            super().preload()
+
+    def build_from_database(self):
+        documents = BookSearchDocument.objects.order_by().values_list('book_id', 'title', 'authors')
+        self.build(documents.iterator())
+
+
+fuzzy_index = FuzzyIndex()
+
+
+def get_similar_books(q, fields, threshold, limit=FUZZY_SEARCH_LIMIT):
+    fuzzy_index.refresh()
+    return fuzzy_index.search(q, fields, threshold, limit)
+
+
+def update_fuzzy_documents(documents, removed_ids=()):
+    """
+    Puts given (book id, title, authors) tuples to index and removes documents of given books,
+    after current transaction is committed.
+    """
+    documents, removed_ids = list(documents), list(removed_ids)
+
+    def change(index):
+        for book_id in removed_ids:
+            index.remove(book_id)
+        for document in documents:
+            index.put(*document)
+
+    fuzzy_index.apply(change)
@@ -0,0 +1,96 @@
+"""
+This module builds responsive derivatives of book cover image.
+One uploaded original (Book.full_img) is resized to every width from BOOK_IMAGE_WIDTHS
+and saved as WebP and JPEG. File names contain hash of file content,
+so derivatives may be cached by browsers forever and identical images are stored once.
+Derivatives are saved with the storage of image field, so both FileSystemStorage and Cloudinary storage work.
+Description of built derivatives is stored in Book.images and rendered by 'book_picture' template tag.
+"""
+
+import hashlib
+import io
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from book_review.models import Book
+from book_review.custom.cache import invalidate_books
+from book_review.custom.constants import BOOK_IMAGE_WIDTHS
+
+DERIVATIVES_DIR = 'img/book_img/derivatives/'
+
+# Pillow format name, file extension, mime type and save options of each derivative format.
+# WebP goes first, since browsers pick the first <source> they support.
+IMAGE_FORMATS = [
+    ('WEBP', 'webp', 'image/webp', {'quality': 80, 'method': 6}),
+    ('JPEG', 'jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+]
+
+
+def open_image(image_file):
+    """
+    Returns RGB image read from field file, rotated according to EXIF orientation.
+    """
+    with image_file.open('rb'):
+        image = Image.open(image_file)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    return image.convert('RGB')
+
+
+def save_content_hashed(storage, content, width, extension):
+    """
+    Saves content under name containing its hash. Existing file with the same content is reused.
+    """
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    name = '{0}{1}-{2}w.{3}'.format(DERIVATIVES_DIR, digest, width, extension)
+    if storage.exists(name):
+        return name
+    return storage.save(name, ContentFile(content))
+
+
+def build_image_derivatives(image_file, widths=BOOK_IMAGE_WIDTHS):
+    """
+    Builds derivatives of image and returns their description:
+    {'source': original name, 'formats': [{'type': mime type, 'images': [{'name', 'width', 'height'}, ...]}, ...]}
+    Images are never upscaled, so widths larger than original are replaced with original width.
+    """
+    image = open_image(image_file)
+    widths = sorted({min(width, image.width) for width in widths})
+
+    formats = [{'type': mime_type, 'images': []} for _, _, mime_type, _ in IMAGE_FORMATS]
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        for (pillow_format, extension, _, options), derivatives in zip(IMAGE_FORMATS, formats):
+            buffer = io.BytesIO()
+            resized.save(buffer, format=pillow_format, **options)
+            name = save_content_hashed(image_file.storage, buffer.getvalue(), width, extension)
+            derivatives['images'].append({'name': name, 'width': width, 'height': height})
+
+    return {'source': image_file.name, 'formats': formats}
+
+
+def update_book_images(books, cache=None):
+    """
+    Builds derivatives of books which images are missing or outdated. Returns number of updated books.
+    Derivatives are built once per original file, so books sharing default cover are cheap.
+    Unreadable originals are skipped, such books are rendered with original image.
+    """
+    cache = {} if cache is None else cache
+    updated = []
+    for book in books:
+        name = book.full_img.name
+        if not name or book.images.get('source') == name:
+            continue
+        if name not in cache:
+            try:
+                cache[name] = build_image_derivatives(book.full_img)
+            except (OSError, ValueError):
+                cache[name] = {}
+        if cache[name]:
+            Book.objects.filter(pk=book.pk).update(images=cache[name])
+            book.images = cache[name]
+            updated.append(book.pk)
+    invalidate_books(updated)
+    return len(updated)
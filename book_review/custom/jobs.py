@@ -0,0 +1,148 @@
+"""
+This module provides a small background job queue stored in database, so it needs nothing but the database.
+Jobs are plain functions registered by name with 'register_job' (see book_review.jobs)
+and enqueued with keyword arguments serializable to JSON.
+Enqueued job becomes visible to workers only when enqueueing transaction is committed,
+so job never sees data older than the write which enqueued it.
+Workers claim jobs by conditional UPDATE, so every job is run by one worker on any database.
+Failed jobs are retried with exponential backoff until attempts are exhausted.
+"""
+
+import datetime
+import os
+import socket
+import time
+import traceback
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from book_review.models import Job
+from book_review.custom.constants import JOB_MAX_RETRY_DELAY, JOB_RETRY_DELAY, JOB_STALE_TIMEOUT
+
+# Registered job functions by name.
+JOBS = {}
+
+# Number of due jobs read at once while claiming, others may be claimed concurrently by other workers.
+CLAIM_CANDIDATES = 10
+
+
+def register_job(name):
+    """
+    Registers decorated function as a job with a given name.
+    """
+    def decorator(function):
+        JOBS[name] = function
+        return function
+    return decorator
+
+
+def enqueue(name, dedup_key=None, delay=0, **kwargs):
+    """
+    Adds job to queue and returns it.
+    If a job with the same deduplication key is already queued, nothing is added and None is returned.
+    """
+    if name not in JOBS:
+        raise ValueError('Unknown job: {0}.'.format(name))
+    run_at = timezone.now() + datetime.timedelta(seconds=delay)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(name=name, kwargs=kwargs, dedup_key=dedup_key, run_at=run_at)
+    except IntegrityError:
+        return None
+
+
+def get_retry_delay(attempts):
+    """
+    Returns delay in seconds before next attempt: 10s, 20s, 40s... but at most JOB_MAX_RETRY_DELAY.
+    """
+    return min(JOB_RETRY_DELAY * 2 ** (attempts - 1), JOB_MAX_RETRY_DELAY)
+
+
+def get_worker_name():
+    return '{0}:{1}'.format(socket.gethostname(), os.getpid())
+
+
+def claim_job(worker):
+    """
+    Marks the earliest due job as running by a given worker and returns it. Returns None if there are no due jobs.
+    """
+    now = timezone.now()
+    candidates = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by('run_at', 'pk')
+    for job in candidates[:CLAIM_CANDIDATES]:
+        claimed = Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, started_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            job.status, job.worker, job.started_at, job.attempts = Job.RUNNING, worker, now, job.attempts + 1
+            return job
+    return None
+
+
+def _finish_job(job, **fields):
+    try:
+        with transaction.atomic():
+            Job.objects.filter(pk=job.pk).update(**fields)
+    except IntegrityError:
+        # Job can't be queued again, since the same job was enqueued while it was running.
+        # Queued one will do the work.
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, finished_at=timezone.now(), last_error=fields['last_error'])
+
+
+def run_job(job):
+    """
+    Runs claimed job. Failed job is queued again with a delay or marked as failed when attempts are exhausted.
+    Returns True if job succeeded.
+    """
+    try:
+        JOBS[job.name](**job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            run_at = timezone.now() + datetime.timedelta(seconds=get_retry_delay(job.attempts))
+            _finish_job(job, status=Job.QUEUED, run_at=run_at, worker='', last_error=error)
+        else:
+            _finish_job(job, status=Job.FAILED, finished_at=timezone.now(), last_error=error)
+        return False
+
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, finished_at=timezone.now())
+    return True
+
+
+def requeue_stale_jobs(timeout=JOB_STALE_TIMEOUT):
+    """
+    Queues again jobs which are running longer than timeout, since their workers are most likely dead.
+    Returns number of requeued jobs.
+    """
+    started_before = timezone.now() - datetime.timedelta(seconds=timeout)
+    requeued = 0
+    for job in Job.objects.filter(status=Job.RUNNING, started_at__lt=started_before):
+        _finish_job(job, status=Job.QUEUED, run_at=timezone.now(), worker='', last_error='Worker was lost.')
+        requeued += 1
+    return requeued
+
+
+def work(burst=False, poll_interval=1.0):
+    """
+    Runs jobs one by one. Waits for new jobs if queue is empty, or returns if 'burst' is set.
+    Returns number of run jobs.
+    """
+    worker = get_worker_name()
+    processed = 0
+    while True:
+        job = claim_job(worker)
+        if job is None:
+            if burst:
+                return processed
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+        processed += 1
+
+
+def run_queued_jobs():
+    """
+    Runs every due job in current process and returns their number.
+    """
+    return work(burst=True)
@@ -0,0 +1,123 @@
+"""
+This module provides a base of in-process indexes loaded from database (autocomplete, fuzzy search).
+Index is loaded on process start (see mysite/wsgi.py) or on first use,
+and is changed incrementally by the process which changed data, after transaction is committed.
+Other processes learn about changes by cache generation of the index and reload their indexes in background.
+"""
+
+import logging
+import threading
+import time
+
+from django.db import DatabaseError, connection, transaction
+
+from .cache import bump_generations, get_generations
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryIndex:
+    """
+    Subclasses set 'generation_name' and implement 'clear' and 'build_from_database'.
+    Loaded index is checked for changes of other processes once per 'check_interval' seconds,
+    and is reloaded if it is older than 'max_age' seconds (None means never).
+    """
+    generation_name = None
+    check_interval = 5
+    max_age = None
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.load_lock = threading.Lock()
+        self.reloading = False
+        self.reset()
+
+    def clear(self):
+        """
+        Empties index data structures.
+        """
+        raise NotImplementedError
+
+    def build_from_database(self):
+        """
+        Replaces index data by data loaded from database.
+        """
+        raise NotImplementedError
+
+    def reset(self):
+        """
+        Forgets all data, so index is loaded again on next use.
+        """
+        with self.lock:
+            self.loaded = False
+            self.generation = None
+            self.loaded_at = self.checked_at = 0
+            self.clear()
+
+    def load(self):
+        """
+        Loads index from database.
+        Generation is read first, so changes made during loading make index reload again.
+        """
+        generation = get_generations([self.generation_name])[0]
+        self.build_from_database()
+        with self.lock:
+            self.generation = generation
+            self.loaded_at = self.checked_at = time.monotonic()
+            self.loaded = True
+
+    def _reload(self):
+        try:
+            self.load()
+        except DatabaseError:
+            logger.exception('%s reload failed.', type(self).__name__)
+        finally:
+            self.reloading = False
+            connection.close()
+
+    def refresh(self):
+        """
+        Loads index on first use. Loaded index is reloaded in background thread
+        if another process changed data or index is too old.
+        """
+        if not self.loaded:
+            with self.load_lock:
+                if not self.loaded:
+                    self.load()
+            return
+
+        now = time.monotonic()
+        if self.reloading or now - self.checked_at < self.check_interval:
+            return
+        self.checked_at = now
+        generation = get_generations([self.generation_name])[0]
+        if generation != self.generation or (self.max_age is not None and now - self.loaded_at > self.max_age):
+            self.reloading = True
+            threading.Thread(target=self._reload, daemon=True).start()
+
+    def preload(self):
+        """
+        Loads index on process start, so first lookups are fast. Missing tables (e.g. before migrations) are skipped.
+        """
+        try:
+            self.refresh()
+        except DatabaseError:
+            logger.warning('%s is not preloaded, it will be loaded on first use.', type(self).__name__)
+        finally:
+            connection.close()
+
+    def apply(self, change):
+        """
+        Applies change (function of index) to loaded index after current transaction is committed,
+        and notifies other processes.
+        """
+        def apply_change():
+            with self.lock:
+                if self.loaded:
+                    change(self)
+                generation = bump_generations([self.generation_name])[0]
+                # Index is up to date, unless another process changed data since index was loaded.
+                if self.loaded and generation == self.generation + 1:
+                    self.generation = generation
+
+        transaction.on_commit(apply_change)
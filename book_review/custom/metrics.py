@@ -0,0 +1,222 @@
+"""
+This module collects performance metrics of requests served by this process
+and renders them in Prometheus text format (see MetricsView):
+latency histogram, number and time of database queries and template render time of every url name,
+render time of every template (including cards rendered by {% include %} in loops) and of custom template tags.
+
+Timings of a request are gathered in its own state without locking and merged into registry once,
+when request is finished, so recording costs a few microseconds per request, template and tag.
+Metrics are kept in memory of every process, i.e. a scrape returns metrics of the worker which served it.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.template.base import Template
+
+from .constants import METRICS_LATENCY_BUCKETS
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Url name of requests not matched by any url pattern.
+UNRESOLVED_VIEW = 'unresolved'
+
+# Label values of request methods. Clients may send any method, other methods share one label,
+# so number of latency series stays bounded.
+METHODS = frozenset(['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'])
+OTHER_METHOD = 'other'
+
+
+class Histogram:
+    """
+    Cumulative histogram of observed values: bucket counts values less than or equal to its bound.
+    """
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def get_cumulative_counts(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+
+class Summary:
+    """
+    Count and sum of observed values.
+    """
+    def __init__(self):
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value, count=1):
+        self.count += count
+        self.sum += value
+
+
+class RequestMetrics:
+    """
+    Timings of templates and tags rendered by a single request.
+    """
+    def __init__(self):
+        self.depth = 0
+        self.template_seconds = 0
+        self.templates = defaultdict(Summary)
+        self.tags = defaultdict(Summary)
+
+
+_request_metrics = ContextVar('request_metrics', default=None)
+
+
+@contextmanager
+def request_metrics():
+    """
+    Collects timings of templates and tags rendered in this context.
+    """
+    state = RequestMetrics()
+    token = _request_metrics.set(state)
+    try:
+        yield state
+    finally:
+        _request_metrics.reset(token)
+
+
+def _format_labels(labels):
+    return ','.join(
+        '{0}="{1}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels
+    )
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Metrics of finished requests by url name, and of rendered templates and tags by their names.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.latency = defaultdict(Histogram)
+            self.queries = defaultdict(Summary)
+            self.query_seconds = defaultdict(Summary)
+            self.template_seconds = defaultdict(Summary)
+            self.templates = defaultdict(Summary)
+            self.tags = defaultdict(Summary)
+
+    def record_request(self, view_name, method, seconds, queries=0, query_seconds=0, state=None):
+        view_name = view_name or UNRESOLVED_VIEW
+        method = method if method in METHODS else OTHER_METHOD
+        with self.lock:
+            self.latency[(view_name, method)].observe(seconds)
+            self.queries[view_name].observe(queries)
+            self.query_seconds[view_name].observe(query_seconds)
+            if state is not None:
+                self.template_seconds[view_name].observe(state.template_seconds)
+                for registry_summaries, summaries in [(self.templates, state.templates), (self.tags, state.tags)]:
+                    for name, summary in summaries.items():
+                        registry_summaries[name].observe(summary.sum, summary.count)
+
+    def render(self):
+        """
+        Returns all metrics in Prometheus text exposition format.
+        """
+        lines = []
+
+        def add_summaries(name, help_text, label_name, summaries):
+            lines.extend(['# HELP {0} {1}'.format(name, help_text), '# TYPE {0} summary'.format(name)])
+            for label, summary in sorted(summaries.items()):
+                labels = _format_labels([(label_name, label)])
+                lines.append('{0}_count{{{1}}} {2}'.format(name, labels, summary.count))
+                lines.append('{0}_sum{{{1}}} {2}'.format(name, labels, _format_value(summary.sum)))
+
+        with self.lock:
+            name = 'book_review_request_duration_seconds'
+            lines.extend(['# HELP {0} Request latency by url name.'.format(name), '# TYPE {0} histogram'.format(name)])
+            for (view_name, method), histogram in sorted(self.latency.items()):
+                labels = [('view', view_name), ('method', method)]
+                bounds = [str(bound) for bound in histogram.buckets] + ['+Inf']
+                for bound, count in zip(bounds, histogram.get_cumulative_counts()):
+                    lines.append('{0}_bucket{{{1}}} {2}'.format(name, _format_labels(labels + [('le', bound)]), count))
+                lines.append('{0}_count{{{1}}} {2}'.format(name, _format_labels(labels), sum(histogram.counts)))
+                lines.append('{0}_sum{{{1}}} {2}'.format(name, _format_labels(labels), _format_value(histogram.sum)))
+
+            add_summaries('book_review_request_queries', 'Database queries per request by url name.',
+                          'view', self.queries)
+            add_summaries('book_review_request_query_seconds', 'Database query time per request by url name.',
+                          'view', self.query_seconds)
+            add_summaries('book_review_request_template_seconds', 'Template render time per request by url name.',
+                          'view', self.template_seconds)
+            add_summaries('book_review_template_render_seconds',
+                          'Render time of templates, including templates they include.', 'template', self.templates)
+            add_summaries('book_review_template_tag_seconds', 'Time of custom template tags.', 'tag', self.tags)
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def _timed_render(render):
+    @functools.wraps(render)
+    def timed_render(self, context):
+        state = _request_metrics.get()
+        if state is None:
+            return render(self, context)
+
+        started = time.perf_counter()
+        state.depth += 1
+        try:
+            return render(self, context)
+        finally:
+            seconds = time.perf_counter() - started
+            state.depth -= 1
+            state.templates[self.name or '<string>'].observe(seconds)
+            if state.depth == 0:
+                state.template_seconds += seconds
+
+    timed_render.instrumented = True
+    return timed_render
+
+
+def instrument_templates():
+    """
+    Makes Django templates record their render time into metrics of current request.
+    Included templates are rendered by the same method, so cards rendered in loops are recorded as well.
+    """
+    if not getattr(Template.render, 'instrumented', False):
+        Template.render = _timed_render(Template.render)
+
+
+def timed_tag(function):
+    """
+    Records time of a template tag function into metrics of current request.
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        state = _request_metrics.get()
+        if state is None:
+            return function(*args, **kwargs)
+
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            state.tags[function.__name__].observe(time.perf_counter() - started)
+
+    return wrapper
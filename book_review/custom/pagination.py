@@ -0,0 +1,200 @@
+"""
+This module provides keyset (cursor) pagination for book lists.
+Unlike Django Paginator it doesn't run COUNT(*) and doesn't use OFFSET:
+every page is fetched by filtering on the last (or first) row ordering values of the neighbour page,
+so deep pages cost the same as the first one.
+Position is passed between pages in an opaque url-safe token.
+"""
+
+import base64
+import collections.abc
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from django.http import Http404
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator taking number of objects from already known value (e.g. denormalized counter),
+    so no COUNT query is made.
+    """
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class CursorPaginator:
+    """
+    Paginates queryset ordered by model fields or annotations.
+    Primary key is appended to ordering as a tiebreaker, so every row has a unique position.
+    Ordering fields must not be nullable.
+    Total number of objects is not counted, so 'count' and 'num_pages' are None.
+    """
+    count = None
+    num_pages = None
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.model = object_list.model
+        self.ordering = self._get_ordering(object_list)
+
+    def _get_ordering(self, queryset):
+        """
+        Returns list of (field name, descending) tuples.
+        """
+        order_by = list(queryset.query.order_by) or list(self.model._meta.ordering)
+        ordering = []
+        for field in order_by:
+            if not isinstance(field, str):
+                raise ValueError('Only ordering by model fields is supported by CursorPaginator.')
+            descending = field.startswith('-')
+            name = field.lstrip('-')
+            ordering.append((self.model._meta.pk.name if name == 'pk' else name, descending))
+
+        if self.model._meta.pk.name not in [name for name, descending in ordering]:
+            ordering.append((self.model._meta.pk.name, False))
+        return ordering
+
+    def _get_key(self, obj):
+        return [getattr(obj, name) for name, descending in self.ordering]
+
+    def encode_cursor(self, obj, backwards=False):
+        """
+        Returns token pointing after given object (or before it, if backwards is True).
+        """
+        key = [value.isoformat() if hasattr(value, 'isoformat') else value for value in self._get_key(obj)]
+        data = json.dumps({'k': key, 'b': backwards}, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Returns (key, backwards) tuple stored in token.
+        """
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            raw_key, backwards = data['k'], bool(data['b'])
+            if len(raw_key) != len(self.ordering):
+                raise ValueError
+            key = [self._to_python(name, value) for (name, descending), value in zip(self.ordering, raw_key)]
+        except Exception:
+            raise InvalidCursor('Invalid cursor.')
+        return key, backwards
+
+    def _to_python(self, name, value):
+        """
+        Converts decoded value to model field type. Annotation values (such as search rank) are kept as is.
+        """
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            if not isinstance(value, (int, float, str)):
+                raise ValueError
+            return value
+        return field.to_python(value)
+
+    def _get_keyset_filter(self, key, backwards):
+        """
+        Returns condition selecting rows positioned after key (or before it, if backwards is True).
+        For ordering (a, b, c) it is: a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z),
+        with comparison flipped for descending fields.
+        """
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self.ordering, key):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= Q(**equal, **{'{0}__{1}'.format(name, lookup): value})
+            equal[name] = value
+        return condition
+
+    def page(self, cursor):
+        """
+        Returns page positioned by a given cursor. Empty cursor means first page.
+        """
+        queryset = self.object_list.order_by(
+            *['{0}{1}'.format('-' if descending else '', name) for name, descending in self.ordering]
+        )
+        if not cursor:
+            objects = list(queryset[:self.per_page + 1])
+            return CursorPage(objects[:self.per_page], self, has_next=len(objects) > self.per_page)
+
+        key, backwards = self.decode_cursor(cursor)
+        queryset = queryset.filter(self._get_keyset_filter(key, backwards))
+        if backwards:
+            objects = list(queryset.reverse()[:self.per_page + 1])
+            has_previous = len(objects) > self.per_page
+            return CursorPage(objects[:self.per_page][::-1], self, has_next=True, has_previous=has_previous)
+
+        objects = list(queryset[:self.per_page + 1])
+        return CursorPage(objects[:self.per_page], self, has_next=len(objects) > self.per_page, has_previous=True)
+
+
+class CursorPage(collections.abc.Sequence):
+    """
+    Page of CursorPaginator.
+    Mimics Django Page interface, but neighbour pages are addressed by cursors instead of numbers.
+    """
+    number = None
+
+    def __init__(self, object_list, paginator, has_next=False, has_previous=False):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page of {0} objects>'.format(len(self))
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        """
+        Returns cursor of next page.
+        """
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    def previous_page_number(self):
+        """
+        Returns cursor of previous page.
+        """
+        return self.paginator.encode_cursor(self.object_list[0], backwards=True)
+
+
+class CursorPaginationMixin:
+    """
+    Opt-in cursor pagination for ListView.
+    Request with 'cursor' url argument (may be empty for the first page)
+    is paginated by CursorPaginator, any other request by regular Paginator.
+    """
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.cursor_kwarg not in self.request.GET:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidPage as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,119 @@
+"""
+This module profiles single requests on demand of staff users (see ProfilerMiddleware):
+request runs under cProfile, its SQL queries are recorded, and both are saved as RequestProfile.
+Profile has a text report (queries, functions by cumulative time and their callees)
+and pstats file for tools like snakeviz, both are downloadable from admin.
+Profiles are capped in size and number, and expire after PROFILE_TIMEOUT seconds.
+"""
+
+import io
+import marshal
+import pstats
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from book_review.models import RequestProfile
+from .constants import (
+    PROFILE_MAX_COUNT, PROFILE_MAX_FUNCTIONS, PROFILE_MAX_QUERIES, PROFILE_MAX_REPORT_SIZE, PROFILE_MAX_STATS_SIZE,
+)
+
+# Url argument and header (X-Profile) requesting a profile.
+PROFILE_ARGUMENT = 'profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+
+
+def is_profile_asked(request):
+    """
+    Returns True if request asks for a profile. User is not checked, so no queries are made.
+    """
+    return PROFILE_ARGUMENT in request.GET or PROFILE_HEADER in request.META
+
+
+def is_profile_requested(request):
+    """
+    Returns True if staff user asked to profile a request. User is only loaded if request asks for it.
+    """
+    return is_profile_asked(request) and request.user.is_staff
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper recording SQL, parameters and time of queries.
+    """
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            if len(self.queries) < PROFILE_MAX_QUERIES:
+                self.queries.append((time.perf_counter() - started, context['connection'].alias, sql, params))
+
+
+def _truncate(text, size):
+    if len(text) <= size:
+        return text
+    return text[:size] + '\n... cut to {0} characters.\n'.format(size)
+
+
+def get_report(request, response, profiler, recorder, duration):
+    """
+    Returns text report of a profiled request.
+    """
+    report = io.StringIO()
+    view_name = request.resolver_match.view_name if request.resolver_match else '-'
+    report.write('{0} {1}\n'.format(request.method, request.get_full_path()))
+    report.write('View: {0}, status: {1}, time: {2:.1f} ms, queries: {3} ({4:.1f} ms)\n\n'.format(
+        view_name, response.status_code, duration * 1000, recorder.count,
+        sum(query[0] for query in recorder.queries) * 1000,
+    ))
+
+    report.write('SQL queries:\n')
+    for number, (query_duration, alias, sql, params) in enumerate(recorder.queries, start=1):
+        report.write('{0}. {1:.1f} ms [{2}] {3}\n   params: {4!r}\n'.format(
+            number, query_duration * 1000, alias, sql, tuple(params or ())
+        ))
+    if recorder.count > len(recorder.queries):
+        report.write('... {0} more queries.\n'.format(recorder.count - len(recorder.queries)))
+
+    stats = pstats.Stats(profiler, stream=report)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    report.write('\nFunctions by cumulative time:\n')
+    stats.print_stats(PROFILE_MAX_FUNCTIONS)
+    report.write('Call tree (callees of functions by cumulative time):\n')
+    stats.print_callees(PROFILE_MAX_FUNCTIONS)
+    return _truncate(report.getvalue(), PROFILE_MAX_REPORT_SIZE)
+
+
+def save_profile(request, response, profiler, recorder, duration):
+    """
+    Saves profile of a request, and deletes expired and the oldest profiles above PROFILE_MAX_COUNT.
+    Statistics larger than PROFILE_MAX_STATS_SIZE are dropped, report is still kept.
+    """
+    profiler.create_stats()
+    stats = marshal.dumps(profiler.stats)
+    if len(stats) > PROFILE_MAX_STATS_SIZE:
+        stats = b''
+
+    with transaction.atomic():
+        profile = RequestProfile.objects.create(
+            method=request.method,
+            path=request.get_full_path(),
+            view_name=request.resolver_match.view_name if request.resolver_match else '',
+            user=request.user,
+            status_code=response.status_code,
+            duration=duration,
+            num_queries=recorder.count,
+            report=get_report(request, response, profiler, recorder, duration),
+            stats=stats,
+        )
+        RequestProfile.objects.filter(expires_at__lte=timezone.now()).delete()
+        kept = RequestProfile.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)[:PROFILE_MAX_COUNT]
+        RequestProfile.objects.exclude(pk__in=list(kept)).delete()
+    return profile
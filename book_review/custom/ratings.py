@@ -0,0 +1,83 @@
+"""
+This module maintains denormalized review aggregates stored on Book model:
+number of reviews, sum of ratings and average rating.
+Aggregates are changed incrementally by single UPDATE with F-expressions on every review write,
+so concurrent writes never overwrite each other and no recount is needed.
+Full rebuild is only used to fix drift (see 'rebuild_book_ratings' management command).
+"""
+
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from book_review.models import Book, Review
+
+
+def get_avg_rating(num_reviews, rating_sum):
+    """
+    Returns average rating expression. Book without reviews has 0 average rating.
+    """
+    return Coalesce(Cast(rating_sum, FloatField()) / NullIf(num_reviews, 0), Value(float(0)))
+
+
+def change_book_rating(book_id, num_reviews_delta, rating_sum_delta):
+    """
+    Adds deltas to book aggregates in one UPDATE statement.
+    All expressions on the right side refer to values before update,
+    so average rating is calculated from already changed number of reviews and sum of ratings.
+    """
+    if not num_reviews_delta and not rating_sum_delta:
+        return
+    num_reviews = F('num_reviews') + num_reviews_delta
+    rating_sum = F('rating_sum') + rating_sum_delta
+    Book.objects.filter(pk=book_id).update(
+        num_reviews=num_reviews,
+        rating_sum=rating_sum,
+        avg_rating=get_avg_rating(num_reviews, rating_sum),
+    )
+
+
+def get_recount_expressions():
+    """
+    Returns number of reviews and sum of ratings expressions recounted from reviews table.
+    Correlated subqueries are used instead of join with GROUP BY,
+    so expressions may be used in UPDATE statement.
+    """
+    reviews = Review.objects.filter(book=OuterRef('pk')).order_by().values('book')
+    num_reviews = Coalesce(
+        Subquery(reviews.annotate(count=Count('id')).values('count')), Value(0), output_field=IntegerField()
+    )
+    rating_sum = Coalesce(
+        Subquery(reviews.annotate(sum=Sum('rating')).values('sum')), Value(0), output_field=IntegerField()
+    )
+    return num_reviews, rating_sum
+
+
+def get_drifted_books(books_queryset=None):
+    """
+    Returns books which stored aggregates differ from recounted ones.
+    Recounted values are available as 'real_num_reviews' and 'real_rating_sum' annotations.
+    """
+    if books_queryset is None:
+        books_queryset = Book.objects.all()
+    real_num_reviews, real_rating_sum = get_recount_expressions()
+    return books_queryset.annotate(
+        real_num_reviews=real_num_reviews,
+        real_rating_sum=real_rating_sum,
+    ).filter(
+        ~Q(num_reviews=F('real_num_reviews')) | ~Q(rating_sum=F('real_rating_sum'))
+    )
+
+
+def rebuild_book_ratings(books_queryset=None):
+    """
+    Recounts aggregates of given books (all books by default) from reviews table.
+    Returns number of updated books.
+    """
+    if books_queryset is None:
+        books_queryset = Book.objects.all()
+    num_reviews, rating_sum = get_recount_expressions()
+    return books_queryset.update(
+        num_reviews=num_reviews,
+        rating_sum=rating_sum,
+        avg_rating=get_avg_rating(num_reviews, rating_sum),
+    )
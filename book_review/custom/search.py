@@ -1,10 +1,19 @@
-from django.db.models import Q
-from book_review.custom.annotations import annotated_books, annotated_authors
+from django.conf import settings
+from django.db.models import Case, IntegerField, Value, When
+
+from book_review.custom.annotations import annotated_books
+from book_review.custom.constants import FUZZY_SEARCH_CATEGORIES, FUZZY_SEARCH_MIN_RESULTS, SEARCH_CATEGORIES
+from book_review.custom.search_backends import get_search_backend
+from book_review.custom.search_cache import TOO_MANY_RESULTS, get_search_key, search_results_cache
+
+
+def uses_fuzzy_search(category):
+    return settings.FUZZY_SEARCH and category in FUZZY_SEARCH_CATEGORIES
 
 
 def search(q, category):
     """
-    Return queryset of books by a given query. Books are sorted by average reviews rating and title.
+    Return queryset of books by a given query. Books are sorted by relevance and title.
     Categories are needed for cases if 'author', 'genre' or 'year' links are pressed.
     For example, if some books are published in 1984 year, and year link in book details page is pressed,
     only books with 1984 year publishing will be returned. G. Orwell '1984' titled book will not be in results.
@@ -12,33 +21,92 @@ def search(q, category):
     If 1984 is entered in search bar, both - books with 1984 publishing year and Orwell's '1984' will be shown.
     For anything entered in search bar category is 'any'.
     This system allows user to filter search results.
+    Actual matching is done by search backend (see book_review.custom.search_backends).
+    If exact search finds too few books by title or author, books with similar words are added ('Tolstoi' finds
+    Tolstoy), ranked by similarity after exact matches.
     """
+    if category not in SEARCH_CATEGORIES:
+        return annotated_books.none()
 
-    if category == 'book':
-        results = annotated_books.filter(title__icontains=q)
+    backend = get_search_backend()
+    results = backend.search(q, category)
+    if not uses_fuzzy_search(category):
+        return results
+
+    exact_ids = list(results.values_list('pk', flat=True)[:FUZZY_SEARCH_MIN_RESULTS])
+    if len(exact_ids) == FUZZY_SEARCH_MIN_RESULTS:
+        return results
+    return backend.fuzzy_search(q, category, exact_ids)
+
+
+def get_search_ids(q, category, limit):
+    """
+    Returns list of ids of books found by search function, in the same order, up to 'limit' ids.
+    Ids of exact search decide whether fuzzy search is needed, so no extra query is made.
+    """
+    backend = get_search_backend()
+    ids = list(backend.search(q, category).values_list('pk', flat=True)[:limit])
+    if len(ids) < FUZZY_SEARCH_MIN_RESULTS and uses_fuzzy_search(category):
+        ids = list(backend.fuzzy_search(q, category, ids).values_list('pk', flat=True)[:limit])
+    return ids
 
-    elif category == 'author':
-        results = annotated_books.filter(
-            Q(authors__in=annotated_authors.filter(full_name__icontains=q)) |
-            Q(authors__in=annotated_authors.filter(short_name__icontains=q))
-        )
 
-    elif category == 'genre':
-        results = annotated_books.filter(genres__name__icontains=q)
+class SearchResults:
+    """
+    Books found by search, represented by their ordered ids.
+    Supports counting, slicing and prefetching as queryset does, so it's paginated the same way,
+    but number of books is known without a query and every page is fetched by primary keys.
+    """
+    ordered = True
+
+    def __init__(self, ids, queryset=annotated_books):
+        self.ids = ids
+        self.queryset = queryset
+
+    def __len__(self):
+        return len(self.ids)
+
+    def count(self):
+        return len(self.ids)
 
-    elif category == 'year':
-        results = annotated_books.filter(pub_date__year__icontains=q)
+    def prefetch_related(self, *lookups):
+        return SearchResults(self.ids, self.queryset.prefetch_related(*lookups))
 
-    elif category == 'any':
-        results = annotated_books.filter(
-            Q(title__icontains=q) |
-            Q(authors__in=annotated_authors.filter(full_name__icontains=q)) |
-            Q(authors__in=annotated_authors.filter(short_name__icontains=q)) |
-            Q(genres__name__icontains=q) |
-            Q(pub_date__year__icontains=q)
+    def get_books(self, ids):
+        """
+        Returns queryset of books with given ids, ordered as ids are.
+        """
+        if not ids:
+            return self.queryset.none()
+        position = Case(
+            *[When(pk=pk, then=Value(number)) for number, pk in enumerate(ids)], output_field=IntegerField()
         )
+        return self.queryset.filter(pk__in=ids).order_by(position)
 
-    else:
-        results = annotated_books.none()
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.get_books(list(self.ids[index]))
+        return self.get_books([self.ids[index]]).get()
+
+
+def cached_search(q, category):
+    """
+    Returns the same books as search function does, as SearchResults.
+    Ids of found books are cached (see book_review.custom.search_cache).
+    Query finding too many books to be cached returns search queryset, which is counted and paged by database.
+    """
+    if category not in SEARCH_CATEGORIES:
+        return SearchResults([])
 
-    return results.order_by('-avg_rating', 'title')
+    key = get_search_key(q, category)
+    ids = search_results_cache.get(key)
+    if ids is None:
+        generation = search_results_cache.get_generation()
+        # One extra id tells that results are too long, without loading all of them.
+        ids = get_search_ids(q, category, search_results_cache.max_results + 1)
+        search_results_cache.set(key, ids, generation)
+        if search_results_cache.is_too_long(ids):
+            ids = TOO_MANY_RESULTS
+    if ids is TOO_MANY_RESULTS:
+        return search(q, category)
+    return SearchResults(ids)
@@ -0,0 +1,330 @@
+"""
+This module provides pluggable search backends used by search function.
+Every backend returns queryset of books matched by a query in a given category,
+ranked by relevance and de-duplicated in SQL (full-text data is joined to books one-to-one).
+Years are not matched as text, but by indexed Book.pub_year column (exactly or by range).
+Backends also provide fuzzy search ranked by trigram similarity of words, used when exact search finds too few books:
+PostgreSQL uses pg_trgm GIN indexes, other databases use in-process index (see book_review.custom.fuzzy).
+
+PostgresSearchBackend uses tsvector built from BookSearchDocument with GIN expression index.
+SQLiteSearchBackend uses FTS5 virtual table synced with BookSearchDocument by triggers.
+IcontainsSearchBackend is a fallback for databases without full-text search support.
+Backend is chosen by database vendor, or by 'BOOK_SEARCH_BACKEND' setting (dotted path) if provided.
+"""
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import BooleanField, Case, FloatField, OuterRef, Q, Subquery, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from book_review.models import Author, Book, BookSearchDocument
+from book_review.custom.annotations import annotated_books
+from book_review.custom.dates import parse_year_range
+from book_review.custom.fuzzy import get_similar_books, update_fuzzy_documents
+from book_review.custom.search_cache import search_results_cache
+from book_review.custom.text import get_query_tokens, normalize
+
+
+def create_search_document(book):
+    """
+    Creates search document of a just created book, which has no authors and genres yet.
+    """
+    BookSearchDocument.objects.create(book=book, title=book.title, year=str(book.pub_date.year))
+    update_fuzzy_documents([(book.pk, book.title, '')])
+    search_results_cache.invalidate()
+
+
+def update_search_documents(book_ids):
+    """
+    Rebuilds search documents of given books in a constant number of queries.
+    Database specific index is updated by database itself (expression index or triggers).
+    """
+    book_ids = list(book_ids)
+    books = Book.objects.filter(pk__in=book_ids).prefetch_related('authors', 'genres')
+    documents = [
+        BookSearchDocument(
+            book=book,
+            title=book.title,
+            authors='\n'.join(str(author) for author in book.authors.all()),
+            genres='\n'.join(genre.name for genre in book.genres.all()),
+            year=str(book.pub_date.year),
+        )
+        for book in books
+    ]
+    with transaction.atomic():
+        BookSearchDocument.objects.filter(book__in=[document.book_id for document in documents]).delete()
+        BookSearchDocument.objects.bulk_create(documents)
+    update_fuzzy_documents(
+        [(document.book_id, document.title, document.authors) for document in documents],
+        removed_ids=set(book_ids) - {document.book_id for document in documents},
+    )
+    search_results_cache.invalidate()
+
+
+def remove_search_document(book_id):
+    """
+    Forgets deleted book in search indexes kept outside of database. Search document is deleted by cascade.
+    """
+    update_fuzzy_documents([], removed_ids=[book_id])
+    search_results_cache.invalidate()
+
+
+class BaseSearchBackend:
+    """
+    Search backend interface.
+    Fuzzy search uses in-process trigram index by default.
+    """
+    fuzzy_fields = {
+        'book': ['title'],
+        'author': ['authors'],
+        'any': ['title', 'authors'],
+    }
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def search(self, q, category):
+        """
+        Returns queryset of books matched by query in a given category.
+        Years are matched exactly or by range ('1869', '1950-1960', '1860s') by indexed pub_year column,
+        in 'any' category books matched by text go first, in order of text search, then books matched by year only.
+        """
+        year_range = parse_year_range(q) if category in ('year', 'any') else None
+        if category == 'year':
+            if year_range is None:
+                return annotated_books.none()
+            return annotated_books.filter(pub_year__range=year_range).order_by('pub_year', 'title')
+
+        results = self.search_text(q, category)
+        if year_range is None:
+            return results
+
+        matched_by_text = Q(pk__in=results.values('pk'))
+        if 'rank' in results.query.annotations:
+            # Text rank is never negative, so books matched by year only get rank below every text match.
+            # Text rank is computed for text matches only, books are matched by uncorrelated subquery.
+            text_rank = self.get_text_rank(q, category, results)
+            rank = Case(When(matched_by_text, then=text_rank), default=Value(-1.0), output_field=FloatField())
+            ordering = ['-rank', 'title']
+        else:
+            rank = Case(When(matched_by_text, then=Value(1.0)), default=Value(0.0), output_field=FloatField())
+            ordering = ['-rank', *results.query.order_by]
+        return annotated_books.filter(
+            matched_by_text | Q(pub_year__range=year_range)
+        ).annotate(rank=rank).order_by(*ordering)
+
+    def search_text(self, q, category):
+        """
+        Returns queryset of books matched by query in a given text category ('book', 'author', 'genre' or 'any').
+        """
+        raise NotImplementedError
+
+    def get_text_rank(self, q, category, results):
+        """
+        Returns expression of rank, which text search results (annotated with 'rank') give to a book of outer query.
+        """
+        return Subquery(results.filter(pk=OuterRef('pk')).order_by().values('rank')[:1])
+
+    def fuzzy_search(self, q, category, exact_ids=()):
+        """
+        Returns queryset of books with words similar to query words in a given category, ranked by similarity.
+        Books of exact search (exact_ids) are kept and ranked first.
+        """
+        similar = get_similar_books(q, self.fuzzy_fields[category], settings.FUZZY_SEARCH_THRESHOLD)
+        ranks = dict.fromkeys(exact_ids, 2.0)
+        for book_id, similarity in similar:
+            ranks.setdefault(book_id, similarity)
+        if not ranks:
+            return annotated_books.none()
+
+        rank = Case(
+            *[When(pk=book_id, then=Value(value)) for book_id, value in ranks.items()], output_field=FloatField()
+        )
+        return annotated_books.filter(pk__in=list(ranks)).annotate(rank=rank).order_by('-rank', 'title')
+
+
+class IcontainsSearchBackend(BaseSearchBackend):
+    """
+    Substring search. Books are sorted by average reviews rating and title.
+    Authors are matched by their stored search key (see Author.get_search_key). Only PostgreSQL has an index
+    for it (pg_trgm GIN), which serves this backend alone, since PostgreSQL uses PostgresSearchBackend by default.
+    Other databases scan all search keys.
+    """
+    def get_matched_authors(self, q):
+        key = ' '.join(normalize(q))
+        if not key:
+            return Author.objects.none()
+        return Author.objects.filter(search_key__contains=key)
+
+    def search_text(self, q, category):
+        if category == 'book':
+            matched = Book.objects.filter(title__icontains=q)
+
+        elif category == 'author':
+            matched = Book.objects.filter(authors__in=self.get_matched_authors(q))
+
+        elif category == 'genre':
+            matched = Book.objects.filter(genres__name__icontains=q)
+
+        else:
+            matched = Book.objects.filter(
+                Q(title__icontains=q) |
+                Q(authors__in=self.get_matched_authors(q)) |
+                Q(genres__name__icontains=q)
+            )
+
+        return annotated_books.filter(pk__in=matched.values('pk')).order_by('-avg_rating', 'title')
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL full-text search.
+    Document columns get different weights, so category is a weight filter in tsquery.
+    Vector expression must be identical to the one in GIN index created by migration,
+    otherwise index is not used.
+    """
+    vector = (
+        "setweight(to_tsvector('simple', {0}.title), 'A') || "
+        "setweight(to_tsvector('simple', {0}.authors), 'B') || "
+        "setweight(to_tsvector('simple', {0}.genres), 'C') || "
+        "setweight(to_tsvector('simple', {0}.year), 'D')"
+    ).format(BookSearchDocument._meta.db_table)
+    category_weights = {
+        'book': 'A',
+        'author': 'B',
+        'genre': 'C',
+        'any': 'ABC',
+    }
+
+    def search_text(self, q, category):
+        tokens = get_query_tokens(q)
+        if not tokens:
+            return annotated_books.none()
+
+        weights = self.category_weights[category]
+        tsquery = ' & '.join("{0}:*{1}".format(token, weights) for token in tokens)
+        # Search documents are joined one-to-one, so every book is matched and ranked once in one query.
+        matched = RawSQL(
+            "({0}) @@ to_tsquery('simple', %s)".format(self.vector), [tsquery], output_field=BooleanField()
+        )
+        rank = RawSQL("ts_rank({0}, to_tsquery('simple', %s))".format(self.vector), [tsquery])
+        return annotated_books.filter(
+            matched, search_document__isnull=False
+        ).annotate(rank=rank).order_by('-rank', 'title')
+
+    def fuzzy_search(self, q, category, exact_ids=()):
+        # Every query word must be similar to a word of any of category columns ('<%' uses GIN trigram indexes).
+        words = get_query_tokens(q)
+        if not words:
+            return annotated_books.none()
+
+        columns = ['{0}.{1}'.format(BookSearchDocument._meta.db_table, field) for field in self.fuzzy_fields[category]]
+        conditions, condition_params, similarities, similarity_params = [], [], [], []
+        for word in words:
+            conditions.append('({0})'.format(' OR '.join('%s <%% {0}'.format(column) for column in columns)))
+            condition_params.extend([word] * len(columns))
+            similarities.append('GREATEST({0})'.format(
+                ', '.join('word_similarity(%s, {0})'.format(column) for column in columns)
+            ))
+            similarity_params.extend([word] * len(columns))
+        matched = RawSQL(' AND '.join(conditions), condition_params, output_field=BooleanField())
+        similarity = RawSQL(
+            '({0}) / {1}'.format(' + '.join(similarities), len(words)), similarity_params, output_field=FloatField()
+        )
+        rank = Case(When(pk__in=list(exact_ids), then=Value(2.0)), default=similarity, output_field=FloatField())
+        # Exact matches are joined by the same (outer) join of search documents, which similarity refers to.
+        return annotated_books.filter(
+            Q(pk__in=list(exact_ids)) | Q(matched, search_document__isnull=False)
+        ).annotate(rank=rank).order_by('-rank', 'title')
+
+
+def set_trigram_threshold(sender, connection, **kwargs):
+    """
+    Sets pg_trgm threshold of '<%' operator on every new PostgreSQL connection.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)",
+                [str(settings.FUZZY_SEARCH_THRESHOLD)],
+            )
+
+
+connection_created.connect(set_trigram_threshold)
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 full-text search for local and development use.
+    Category is an FTS5 column filter. Rank is negated bm25 value, so higher rank is better.
+    """
+    fts_table = 'book_review_booksearch_fts'
+    # bm25 weights of title, authors, genres and year columns.
+    column_weights = (10.0, 5.0, 2.0, 1.0)
+    category_columns = {
+        'book': 'title',
+        'author': 'authors',
+        'genre': 'genres',
+        'any': '{title authors genres}',
+    }
+    _available = None
+
+    @classmethod
+    def is_available(cls):
+        # FTS5 table is not created by migration if SQLite is compiled without FTS5.
+        if cls._available is None:
+            cls._available = cls.fts_table in connection.introspection.table_names()
+        return cls._available
+
+    def get_match(self, q, category):
+        """
+        Returns FTS5 query of words of a given query in category columns.
+        """
+        match = ' AND '.join('"{0}"*'.format(token) for token in get_query_tokens(q))
+        return '{0} : ({1})'.format(self.category_columns[category], match)
+
+    def get_rank_sql(self):
+        return '-bm25({0}, {1})'.format(self.fts_table, ', '.join(str(weight) for weight in self.column_weights))
+
+    def search_text(self, q, category):
+        if not get_query_tokens(q):
+            return annotated_books.none()
+
+        # FTS table is joined one-to-one, so full-text query is evaluated once for all books.
+        match = self.get_match(q, category)
+        matched = RawSQL('{0} MATCH %s'.format(self.fts_table), [match], output_field=BooleanField())
+        return annotated_books.filter(
+            matched, search_index__isnull=False
+        ).annotate(rank=RawSQL(self.get_rank_sql(), [])).order_by('-rank', 'title')
+
+    def get_text_rank(self, q, category, results):
+        # Correlated MATCH would run full-text query for every book. Ranks are computed once in a derived table
+        # instead, SQLite indexes it automatically (LIMIT keeps it from being flattened into correlated query).
+        return RawSQL(
+            '(SELECT matched.rank FROM (SELECT rowid AS book_id, {0} AS rank FROM {1} WHERE {1} MATCH %s LIMIT -1) '
+            'matched WHERE matched.book_id = {2}.id)'.format(self.get_rank_sql(), self.fts_table, Book._meta.db_table),
+            [self.get_match(q, category)], output_field=FloatField(),
+        )
+
+
+VENDOR_SEARCH_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    """
+    Returns search backend instance.
+    """
+    backend_path = getattr(settings, 'BOOK_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+
+    backend_class = VENDOR_SEARCH_BACKENDS.get(connection.vendor, IcontainsSearchBackend)
+    if not backend_class.is_available():
+        backend_class = IcontainsSearchBackend
+    return backend_class()
@@ -0,0 +1,146 @@
+"""
+This module provides in-process cache of search results: ordered ids of books found by a query in a category.
+Pages of popular queries (genre, author and year links) are then fetched by ids,
+without matching, ranking and counting books again.
+
+Memory is bounded by total number of cached ids, least recently used results are evicted first.
+Queries finding too many books are only remembered as such (TOO_MANY_RESULTS), their pages are fetched by queryset.
+Results expire after a timeout, and all of them are dropped when search documents change:
+by this process right after commit, by other processes within a few seconds (by cache generation).
+Results ranked by reviews rating (substring search backend) may be stale for up to a timeout after new reviews.
+"""
+
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from django.db import transaction
+
+from .cache import bump_generations, get_generations
+from .constants import (
+    SEARCH_CACHE_CHECK_INTERVAL, SEARCH_CACHE_MAX_IDS, SEARCH_CACHE_MAX_RESULTS, SEARCH_CACHE_TIMEOUT,
+)
+
+SEARCH_RESULTS_GENERATION = 'search_results'
+
+# Cached instead of ids of a query, which finds more than 'max_results' books.
+TOO_MANY_RESULTS = array('q')
+
+
+def get_search_key(q, category):
+    """
+    Returns cache key of a query: case and extra whitespace don't change search results.
+    """
+    return category, ' '.join(str(q).lower().split())
+
+
+class SearchResultsCache:
+    """
+    LRU cache of (key -> ids) with a timeout, counting hits and misses.
+    Results are stored only if generation they were computed at is still current,
+    so results of a query racing with a change are never cached.
+    """
+    def __init__(self, max_ids=SEARCH_CACHE_MAX_IDS, max_results=SEARCH_CACHE_MAX_RESULTS,
+                 timeout=SEARCH_CACHE_TIMEOUT, check_interval=SEARCH_CACHE_CHECK_INTERVAL):
+        self.max_ids = max_ids
+        self.max_results = max_results
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets results and counters.
+        """
+        with self.lock:
+            self.entries = OrderedDict()
+            self.size = 0
+            self.hits = self.misses = self.evictions = 0
+            self.generation = None
+            self.checked_at = 0
+
+    def _clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def _pop(self, key):
+        ids, expires_at = self.entries.pop(key)
+        self.size -= len(ids)
+
+    def is_too_long(self, ids):
+        return len(ids) > self.max_results
+
+    def get_generation(self):
+        """
+        Returns current generation of search results. Shared generation is read at most once per check interval.
+        """
+        now = time.monotonic()
+        if self.generation is None or now - self.checked_at >= self.check_interval:
+            generation = get_generations([SEARCH_RESULTS_GENERATION])[0]
+            with self.lock:
+                if generation != self.generation:
+                    self._clear()
+                    self.generation = generation
+                self.checked_at = now
+        return self.generation
+
+    def get(self, key):
+        """
+        Returns cached ids of a given key, TOO_MANY_RESULTS or None.
+        """
+        self.get_generation()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                self._pop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, ids, generation):
+        """
+        Stores ids computed at a given generation. Too long results are stored as TOO_MANY_RESULTS.
+        """
+        ids = TOO_MANY_RESULTS if self.is_too_long(ids) else array('q', ids)
+        with self.lock:
+            if generation != self.generation:
+                return
+            if key in self.entries:
+                self._pop(key)
+            self.entries[key] = (ids, time.monotonic() + self.timeout)
+            self.size += len(ids)
+            while self.size > self.max_ids:
+                self._pop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self):
+        """
+        Drops all results after current transaction is committed, and notifies other processes.
+        """
+        def bump():
+            generation = bump_generations([SEARCH_RESULTS_GENERATION])[0]
+            with self.lock:
+                self._clear()
+                self.generation = generation
+                self.checked_at = time.monotonic()
+
+        transaction.on_commit(bump)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'ids': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+search_results_cache = SearchResultsCache()
@@ -0,0 +1,145 @@
+"""
+This module records slow database queries: SQL with parameters, url name of the view, call site in project code
+and plan of the query (EXPLAIN, or EXPLAIN QUERY PLAN on SQLite). Slow queries are found by SlowQueryMiddleware.
+
+Only SLOW_QUERY_LOG_SIZE slowest distinct statements are kept (in memory of every process),
+every statement with number of its slow executions and its slowest execution.
+Plan is fetched once, when statement enters the log, so recording stays cheap even if a statement is slow every time.
+"""
+
+import logging
+import sys
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.template import base
+
+from .constants import SLOW_QUERY_LOG_SIZE, SLOW_QUERY_MAX_PARAMS_LENGTH
+
+logger = logging.getLogger(__name__)
+
+# Frames of these modules are never call sites of queries.
+_SKIPPED_FILES = {
+    str(Path(__file__).resolve()),
+    str(Path(__file__).resolve().with_name('metrics.py')),
+    str(Path(__file__).resolve().parent.parent / 'middleware.py'),
+}
+_TEMPLATE_FILE = str(Path(base.__file__).resolve())
+
+
+def get_call_site():
+    """
+    Returns 'path:line in function' of the innermost frame of project code, excluding installed packages,
+    or 'template:line in template' if query is made by template node (e.g. lazy queryset evaluated by a loop).
+    """
+    base_dir = str(settings.BASE_DIR)
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename == _TEMPLATE_FILE and code.co_name == 'render_annotated':
+            node = frame.f_locals['self']
+            return '{0}:{1} in template'.format(node.origin.template_name, node.token.lineno)
+        if (code.co_filename.startswith(base_dir) and code.co_filename not in _SKIPPED_FILES
+                and 'site-packages' not in code.co_filename):
+            return '{0}:{1} in {2}'.format(Path(code.co_filename).relative_to(base_dir), frame.f_lineno, code.co_name)
+        frame = frame.f_back
+    return None
+
+
+def explain(alias, sql, params):
+    """
+    Returns plan of a SELECT query as text, or None for other statements.
+    """
+    if sql.split(None, 1)[0].upper() not in ('SELECT', 'WITH'):
+        return None
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('{0} {1}'.format(connection.ops.explain_query_prefix(), sql), params)
+            rows = cursor.fetchall()
+    except DatabaseError as e:
+        return 'EXPLAIN failed: {0}'.format(e)
+    return '\n'.join(row if isinstance(row, str) else ' '.join(str(value) for value in row) for row in rows)
+
+
+class SlowQuery:
+    """
+    The slowest execution of a statement, and number of its slow executions.
+    """
+    __slots__ = ['sql', 'params', 'duration', 'view_name', 'call_site', 'alias', 'plan', 'count']
+
+    def __init__(self, sql, params, duration, view_name=None, call_site=None, alias='default'):
+        self.sql = sql
+        params = repr(tuple(params or ()))
+        if len(params) > SLOW_QUERY_MAX_PARAMS_LENGTH:
+            params = params[:SLOW_QUERY_MAX_PARAMS_LENGTH] + '...'
+        self.params = params
+        self.duration = duration
+        self.view_name = view_name
+        self.call_site = call_site
+        self.alias = alias
+        self.plan = None
+        self.count = 1
+
+    @property
+    def milliseconds(self):
+        return self.duration * 1000
+
+
+class SlowQueryLog:
+    """
+    Bounded log of the slowest distinct statements: when it's full, a slower statement replaces the fastest one.
+    """
+    def __init__(self, size=SLOW_QUERY_LOG_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.entries = {}
+
+    def add(self, query):
+        """
+        Adds a query to the log. Returns True if it's a new entry of the log, which has no plan yet.
+        """
+        with self.lock:
+            entry = self.entries.get(query.sql)
+            if entry is not None:
+                query.count += entry.count
+                if query.duration > entry.duration:
+                    query.plan = entry.plan
+                    self.entries[query.sql] = query
+                else:
+                    entry.count = query.count
+                return False
+
+            if len(self.entries) >= self.size:
+                fastest = min(self.entries.values(), key=lambda entry: entry.duration)
+                if fastest.duration >= query.duration:
+                    return False
+                del self.entries[fastest.sql]
+            self.entries[query.sql] = query
+            return True
+
+    def get_entries(self):
+        """
+        Returns logged queries from the slowest one.
+        """
+        with self.lock:
+            return sorted(self.entries.values(), key=lambda entry: entry.duration, reverse=True)
+
+
+slow_query_log = SlowQueryLog()
+
+
+def record_slow_query(alias, sql, params, duration, view_name=None, call_site=None):
+    """
+    Logs a slow query and adds it to the log. Plan is fetched for new entries of the log.
+    """
+    logger.warning('Slow query (%d ms) of %s at %s: %s', duration * 1000, view_name, call_site, sql)
+    query = SlowQuery(sql, params, duration, view_name=view_name, call_site=call_site, alias=alias)
+    if slow_query_log.add(query):
+        query.plan = explain(alias, sql, params)
@@ -0,0 +1,42 @@
+"""
+This module provides text helpers shared by search, fuzzy search and autocomplete.
+"""
+
+import re
+import unicodedata
+
+# Letters and digits only, so tokens never contain full-text query syntax.
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def get_query_tokens(q):
+    """
+    Splits query into lower-cased words.
+    """
+    return TOKEN_RE.findall(str(q).lower())
+
+
+def normalize(text):
+    """
+    Splits text into lower-cased words without accents ('Les Misérables' -> ['les', 'miserables']).
+    """
+    text = str(text)
+    if not text.isascii():
+        text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    return get_query_tokens(text)
+
+
+def get_trigrams(word):
+    """
+    Returns set of trigrams of a word padded as pg_trgm does ('tolstoy' -> '  t', ' to', 'tol', ..., 'oy ').
+    """
+    padded = '  ' + word + ' '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def get_similarity(trigrams, other_trigrams):
+    """
+    Returns similarity of words by their trigrams: number of shared trigrams divided by number of all trigrams.
+    """
+    common = len(trigrams & other_trigrams)
+    return common / (len(trigrams) + len(other_trigrams) - common)
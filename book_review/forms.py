@@ -1,5 +1,7 @@
 from django import forms
 
+from .models import Review
+
 
 class SearchForm(forms.Form):
     """
@@ -8,5 +10,35 @@ class SearchForm(forms.Form):
     q = forms.CharField(max_length=50, label='', widget=forms.TextInput(attrs={
         'placeholder': 'Book, author, genre, year...',
         'class': 'form-control search-form',
+        'autocomplete': 'off',
     }),
                         )
+
+
+class ReviewForm(forms.ModelForm):
+    """
+    Creates new review.
+    """
+    class Meta:
+        model = Review
+        fields = ['rating', 'title', 'text']
+
+
+class ReviewUpdateForm(ReviewForm):
+    """
+    Updates review. Version of review shown to user is sent back with the form,
+    so changes made to review in the meantime (e.g. in another tab) are not overwritten silently.
+    Review is checked against version it was read with if version is not sent.
+    """
+    version = forms.IntegerField(min_value=0, required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['version'].initial = self.instance.version
+
+    def save(self, commit=True):
+        review = super().save(commit=False)
+        if commit:
+            version = self.cleaned_data.get('version')
+            review.save(expected_version=review.version if version is None else version)
+        return review
@@ -0,0 +1,33 @@
+"""
+ASGI handler of the project (see mysite/asgi.py).
+"""
+
+from asgiref.sync import sync_to_async
+from django.core.handlers import asgi
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """
+    Django 3.2 iterates streaming responses in event loop, so their body generators can't query database
+    (e.g. CatalogExportView). This handler takes every part of a streaming response in a thread.
+    Parts are taken by the same thread (thread_sensitive), which keeps server-side cursors on one connection.
+    """
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        parts = iter(response)
+        # Django sends headers and the final message, body is sent in between.
+        response.streaming_content = ()
+        get_part = sync_to_async(next, thread_sensitive=True)
+
+        async def send_with_body(message):
+            if message['type'] == 'http.response.body' and not message.get('more_body'):
+                part = await get_part(parts, None)
+                while part is not None:
+                    for chunk, last in self.chunk_bytes(part):
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                    part = await get_part(parts, None)
+            await send(message)
+
+        await super().send_response(response, send_with_body)
@@ -0,0 +1,28 @@
+"""
+Background jobs moving expensive work after writes out of request.
+Jobs are registered on import in BookReviewConfig.ready() and run by 'run_workers' management command.
+"""
+
+from .custom.cache import get_anonymous_request
+from .custom.images import update_book_images
+from .custom.jobs import register_job
+from .models import Book
+from .views import BookDetailView
+
+
+@register_job('build_book_images')
+def build_book_images(book_id):
+    update_book_images(Book.objects.filter(pk=book_id))
+
+
+@register_job('warm_book_views')
+def warm_book_views(book_id):
+    """
+    Renders book detail page for anonymous user, so it's cached before the first visitor asks for it.
+    """
+    book = Book.objects.filter(pk=book_id).only('pk', 'slug').first()
+    if book is None:
+        return
+    request = get_anonymous_request(book.get_absolute_url())
+    response = BookDetailView.as_view()(request, pk=book.pk, slug=book.slug)
+    response.render()
@@ -0,0 +1,112 @@
+import asyncio
+import contextlib
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+
+from .benchmark_views import Command as BenchmarkViewsCommand, percentile
+
+DISABLED_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    """
+    Measures throughput of hot views under concurrent requests against current database (see 'seed_catalog' command).
+    Sync views are requested from a pool of threads, like WSGI server workers do.
+    Async views ('ASYNC_READ_VIEWS' setting is True) are requested by coroutines in one event loop, like ASGI server does.
+    Run command with both settings to compare them. By default view cache is disabled, so uncached path is measured.
+    """
+    help = 'Benchmark book lists, book details and search views under concurrent requests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help='Number of simultaneous requests.')
+        parser.add_argument('--requests', type=int, default=200, help='Number of requests per url.')
+        parser.add_argument('--warm', action='store_true', help='Keep view cache enabled.')
+        parser.add_argument('--json', dest='json_path', help='Also write results to a given JSON file.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('Concurrency and number of requests must be positive.')
+
+        mode = 'asgi' if settings.ASYNC_READ_VIEWS else 'wsgi'
+        measure = self.measure_async if mode == 'asgi' else self.measure_sync
+        results = []
+        for name, url in BenchmarkViewsCommand().get_urls():
+            with contextlib.ExitStack() as stack:
+                # Test clients request 'testserver' host.
+                stack.enter_context(override_settings(ALLOWED_HOSTS=['testserver']))
+                if not options['warm']:
+                    stack.enter_context(override_settings(CACHES=DISABLED_CACHES))
+                timings, elapsed = measure(url, options['concurrency'], options['requests'])
+            results.append({
+                'name': name,
+                'url': url,
+                'mode': mode,
+                'concurrency': options['concurrency'],
+                'requests_per_second': len(timings) / elapsed,
+                'p50_ms': percentile(timings, 50),
+                'p99_ms': percentile(timings, 99),
+                'mean_ms': statistics.mean(timings),
+            })
+
+        self.stdout.write('Mode: {0}, concurrency: {1}.'.format(mode, options['concurrency']))
+        header = '{0:<32} {1:>9} {2:>9} {3:>9} {4:>9}'
+        row = '{name:<32} {requests_per_second:>9.1f} {p50_ms:>9.2f} {p99_ms:>9.2f} {mean_ms:>9.2f}'
+        self.stdout.write(header.format('view', 'req/s', 'p50 ms', 'p99 ms', 'mean ms'))
+        for result in results:
+            self.stdout.write(row.format(**result))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as file:
+                json.dump(results, file, indent=2)
+
+    def check_response(self, url, response):
+        if response.status_code >= 400:
+            raise CommandError('{0} responded with {1}.'.format(url, response.status_code))
+
+    def measure_sync(self, url, concurrency, requests):
+        """
+        Returns list of request timings in milliseconds and total elapsed seconds.
+        """
+        def request():
+            start = time.perf_counter()
+            response = Client().get(url)
+            timing = (time.perf_counter() - start) * 1000
+            self.check_response(url, response)
+            return timing
+
+        # Warm up database and template caches.
+        request()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = list(pool.map(lambda i: request(), range(requests)))
+        return timings, time.perf_counter() - start
+
+    def measure_async(self, url, concurrency, requests):
+        """
+        Returns list of request timings in milliseconds and total elapsed seconds.
+        """
+        async def run():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def request():
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.get(url)
+                    timing = (time.perf_counter() - start) * 1000
+                self.check_response(url, response)
+                return timing
+
+            # Warm up database and template caches.
+            await request()
+            start = time.perf_counter()
+            timings = await asyncio.gather(*(request() for i in range(requests)))
+            return timings, time.perf_counter() - start
+
+        return asyncio.run(run())
@@ -0,0 +1,119 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from book_review.custom.constants import BOOKS_PER_PAGE, REVIEWS_PER_PAGE
+from book_review.custom.dates import get_today
+from book_review.models import Author, Book, Genre
+
+
+def percentile(values, percent):
+    """
+    Returns nearest-rank percentile of values.
+    """
+    values = sorted(values)
+    index = max(0, int(round(percent / 100 * len(values) + 0.5)) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+class Command(BaseCommand):
+    """
+    Measures hot views against current database (see 'seed_catalog' command).
+    Every url is requested 'repeat' times to get latency percentiles,
+    and once more under tracemalloc to get number of queries and peak memory.
+    By default cache is cleared before every request, so uncached path is measured.
+    """
+    help = 'Benchmark book lists, book details and search views.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warm', action='store_true', help='Keep view cache between requests.')
+        parser.add_argument('--json', dest='json_path', help='Also write results to a given JSON file.')
+
+    def handle(self, *args, **options):
+        self.client = Client(HTTP_HOST='localhost')
+        results = []
+        for name, url in self.get_urls():
+            results.append(self.measure(name, url, options['repeat'], options['warm']))
+
+        header = '{0:<32} {1:>9} {2:>9} {3:>9} {4:>8} {5:>10}'
+        row = '{name:<32} {p50_ms:>9.2f} {p99_ms:>9.2f} {mean_ms:>9.2f} {queries:>8} {peak_memory_kb:>10.1f}'
+        self.stdout.write(header.format('view', 'p50 ms', 'p99 ms', 'mean ms', 'queries', 'peak KB'))
+        for result in results:
+            self.stdout.write(row.format(**result))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as file:
+                json.dump(results, file, indent=2)
+
+    def get_urls(self):
+        """
+        Returns list of (name, url) tuples. Search queries and books are taken from current data.
+        """
+        book = Book.objects.filter(pub_date__lte=get_today()).order_by('-num_reviews').first()
+        author, genre = Author.objects.first(), Genre.objects.first()
+        if book is None or author is None or genre is None:
+            raise CommandError('Database is empty. Run "seed_catalog" command first.')
+
+        books_list = reverse('book_review:books_list')
+        search = reverse('book_review:search')
+        published_books = Book.objects.filter(pub_date__lte=get_today()).count()
+        last_books_page = max(1, (published_books + BOOKS_PER_PAGE - 1) // BOOKS_PER_PAGE)
+        last_reviews_page = max(1, (book.num_reviews + REVIEWS_PER_PAGE - 1) // REVIEWS_PER_PAGE)
+        return [
+            ('index', reverse('book_review:index')),
+            ('books_list recent', books_list + '?order=recent'),
+            ('books_list popular', books_list + '?order=popular'),
+            ('books_list best_rated', books_list + '?order=best_rated'),
+            ('books_list recent last page', '{0}?order=recent&page={1}'.format(books_list, last_books_page)),
+            ('books_list recent cursor', books_list + '?order=recent&cursor='),
+            ('book first reviews page', book.get_absolute_url()),
+            ('book last reviews page', '{0}?page={1}'.format(book.get_absolute_url(), last_reviews_page)),
+            ('search book', '{0}?q={1}&category=book'.format(search, book.title.split()[0])),
+            ('search author', '{0}?q={1}&category=author'.format(search, author.last_name)),
+            ('search genre', '{0}?q={1}&category=genre'.format(search, genre.name)),
+            ('search year', '{0}?q={1}&category=year'.format(search, book.pub_date.year)),
+            ('search any', '{0}?q={1}&category=any'.format(search, book.title.split()[0])),
+        ]
+
+    def request(self, url, warm):
+        if not warm:
+            cache.clear()
+        response = self.client.get(url)
+        if response.status_code >= 400:
+            raise CommandError('{0} responded with {1}.'.format(url, response.status_code))
+        return response
+
+    def measure(self, name, url, repeat, warm):
+        # Warm up database and template caches.
+        self.request(url, warm)
+
+        timings = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            self.request(url, warm)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            self.request(url, warm)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        return {
+            'name': name,
+            'url': url,
+            'p50_ms': percentile(timings, 50),
+            'p99_ms': percentile(timings, 99),
+            'mean_ms': statistics.mean(timings),
+            'queries': len(queries),
+            'peak_memory_kb': peak_memory / 1024,
+        }
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from book_review.custom.images import update_book_images
+from book_review.models import Book
+
+
+class Command(BaseCommand):
+    """
+    Builds responsive cover derivatives of books which don't have them or which cover was changed.
+    Needed after deploy for existing books, since derivatives are only built automatically on upload.
+    """
+    help = 'Build responsive cover image derivatives of books.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives of all books.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['force']:
+            Book.objects.update(images={})
+        books = Book.objects.only('pk', 'full_img', 'images').iterator(chunk_size=options['batch_size'])
+        updated = update_book_images(books)
+        self.stdout.write(self.style.SUCCESS('Built cover derivatives of {0} book(s).'.format(updated)))
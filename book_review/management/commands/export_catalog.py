@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from book_review.custom.constants import SEARCH_CATEGORIES
+from book_review.custom.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, EXPORT_KINDS, export
+
+
+class Command(BaseCommand):
+    """
+    Streams books (with review aggregates, authors and genres) or reviews to CSV or JSONL.
+    Books may be filtered the same way as in search: by query and category.
+    """
+    help = 'Export books or reviews as CSV or JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=EXPORT_KINDS, default='books')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='jsonl')
+        parser.add_argument('-q', '--query', help='Export only books matched by search query.')
+        parser.add_argument('--category', choices=SEARCH_CATEGORIES, default='any')
+        parser.add_argument('-o', '--output', help='Output file path, standard output by default.')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        lines = export(
+            options['kind'], options['format'], options['query'], options['category'], options['chunk_size']
+        )
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            output.writelines(lines)
@@ -0,0 +1,185 @@
+import csv
+import io
+import itertools
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils.text import slugify
+
+from book_review.custom.cache import invalidate_books
+from book_review.custom.catalog import CatalogFormatError, read_records
+from book_review.custom.search_backends import update_search_documents
+from book_review.models import Author, Book, Genre
+
+# Book columns written by PostgreSQL COPY. Other columns get their database defaults,
+# so every NOT NULL column with Python default only must be listed.
+COPY_BOOK_COLUMNS = [
+    'title', 'original_title', 'language', 'country', 'pub_date', 'pub_year', 'description', 'pages', 'slug',
+    'full_img', 'small_img', 'images', 'num_reviews', 'rating_sum', 'avg_rating',
+]
+
+
+# Slug of a book which title has no letters or digits.
+DEFAULT_BOOK_SLUG = 'book'
+
+
+def get_book_slug(title):
+    """
+    Returns slug of a title keeping non-Latin letters ('Война и мир' -> 'война-и-мир'), never an empty one,
+    since book url requires a slug.
+    """
+    return slugify(title, allow_unicode=True)[:80] or DEFAULT_BOOK_SLUG
+
+
+def book_key(record):
+    return record['title'], record['pub_date']
+
+
+class Command(BaseCommand):
+    """
+    Imports books with their authors and genres from CSV or JSONL file (see book_review.custom.catalog).
+    File is streamed in batches, so memory use doesn't depend on file size.
+    Every batch takes a constant number of queries:
+    authors and genres are resolved by natural keys in memory and created by bulk_create,
+    books are created by bulk_create (PostgreSQL COPY if available) ignoring already existing ones,
+    then links to authors and genres are created and search documents rebuilt.
+    Existing books are not changed, only new authors and genres are linked to them.
+    """
+    help = 'Import books, authors and genres from CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to catalog file, "-" for standard input.')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Detected by file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk_create even on PostgreSQL.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        # Natural key to primary key maps. Authors and genres are far fewer than books.
+        self.genre_ids, self.author_ids = {}, {}
+
+        file = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        imported = 0
+        try:
+            records = read_records(file, file_format)
+            while True:
+                batch = list(itertools.islice(records, options['batch_size']))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    self.import_batch(batch)
+                imported += len(batch)
+                self.stdout.write('Imported {0} records...'.format(imported))
+        except CatalogFormatError as e:
+            raise CommandError(str(e))
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+        self.stdout.write(self.style.SUCCESS('Imported {0} records.'.format(imported)))
+
+    def import_batch(self, records):
+        self.resolve_genres({name for record in records for name in record['genres']})
+        self.resolve_authors({key for record in records for key in record['authors']})
+        book_ids = self.create_books(records)
+
+        Book.genres.through.objects.bulk_create([
+            Book.genres.through(book_id=book_ids[book_key(record)], genre_id=self.genre_ids[name])
+            for record in records for name in dict.fromkeys(record['genres'])
+        ], ignore_conflicts=True)
+        Book.authors.through.objects.bulk_create([
+            Book.authors.through(book_id=book_ids[book_key(record)], author_id=self.author_ids[key])
+            for record in records for key in dict.fromkeys(record['authors'])
+        ], ignore_conflicts=True)
+
+        update_search_documents(book_ids.values())
+        invalidate_books(book_ids.values())
+
+    def resolve_genres(self, names):
+        missing = names - self.genre_ids.keys()
+        if not missing:
+            return
+        Genre.objects.bulk_create([Genre(name=name) for name in missing], ignore_conflicts=True)
+        self.genre_ids.update(Genre.objects.filter(name__in=missing).values_list('name', 'pk'))
+
+    def resolve_authors(self, keys):
+        missing = keys - self.author_ids.keys()
+        if not missing:
+            return
+        authors = [
+            Author(first_name=first_name, patronymic=patronymic, last_name=last_name, born=born)
+            for first_name, patronymic, last_name, born in missing
+        ]
+        for author in authors:
+            author.search_key = author.get_search_key()
+        Author.objects.bulk_create(authors, ignore_conflicts=True)
+        # Filter by last names selects a superset, exact keys are matched in memory.
+        candidates = Author.objects.filter(last_name__in={key[2] for key in missing}).values_list(
+            'first_name', 'patronymic', 'last_name', 'born', 'pk'
+        )
+        for first_name, patronymic, last_name, born, pk in candidates:
+            if (first_name, patronymic, last_name, born) in missing:
+                self.author_ids[(first_name, patronymic, last_name, born)] = pk
+
+    def create_books(self, records):
+        """
+        Creates new books of a batch and returns natural key to primary key map of all batch books.
+        """
+        books = [
+            Book(
+                title=record['title'],
+                original_title=record['original_title'],
+                language=record['language'],
+                country=record['country'],
+                pub_date=record['pub_date'],
+                pub_year=record['pub_date'].year,
+                description=record['description'],
+                pages=record['pages'],
+                slug=get_book_slug(record['title']),
+            )
+            for record in records
+        ]
+        if self.use_copy:
+            self.copy_books(books)
+        else:
+            Book.objects.bulk_create(books, ignore_conflicts=True)
+
+        keys = {book_key(record) for record in records}
+        candidates = Book.objects.filter(title__in={key[0] for key in keys}).values_list('title', 'pub_date', 'pk')
+        return {(title, pub_date): pk for title, pub_date, pk in candidates if (title, pub_date) in keys}
+
+    def copy_books(self, books):
+        """
+        Loads books into temporary table by COPY and moves them to books table skipping existing ones.
+        """
+        data = io.StringIO()
+        writer = csv.writer(data)
+        fields = [Book._meta.get_field(column) for column in COPY_BOOK_COLUMNS]
+        for book in books:
+            # Database representation of values, e.g. JSON of 'images'.
+            writer.writerow([
+                '' if value is None else value
+                for value in (field.get_prep_value(getattr(book, field.attname)) for field in fields)
+            ])
+        data.seek(0)
+
+        table, columns = Book._meta.db_table, ', '.join(COPY_BOOK_COLUMNS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE IF NOT EXISTS import_book (LIKE {0} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS'.format(table)
+            )
+            # Empty string is NULL only for nullable 'pages' column.
+            cursor.copy_expert(
+                "COPY import_book ({0}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({1}))".format(
+                    columns, ', '.join(column for column in COPY_BOOK_COLUMNS if column != 'pages')
+                ),
+                data,
+            )
+            cursor.execute(
+                'INSERT INTO {0} ({1}) SELECT {1} FROM import_book ON CONFLICT (title, pub_date) DO NOTHING'.format(
+                    table, columns
+                )
+            )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from book_review.custom.ratings import get_drifted_books, rebuild_book_ratings
+from book_review.models import Book
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds stored book aggregates (number of reviews, sum of ratings and average rating)
+    from reviews table and reports books which stored values drifted from real ones.
+    """
+    help = 'Rebuild book review aggregates from scratch and report drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report drift, do not change stored values.',
+        )
+
+    def handle(self, *args, **options):
+        drifted_books = get_drifted_books().order_by('pk')
+
+        for book in drifted_books:
+            self.stdout.write(
+                'Drift in «{0}» (id={1}): num_reviews {2} -> {3}, rating_sum {4} -> {5}'.format(
+                    book.title, book.pk,
+                    book.num_reviews, book.real_num_reviews,
+                    book.rating_sum, book.real_rating_sum,
+                )
+            )
+
+        if options['check']:
+            self.stdout.write('{0} book(s) drifted.'.format(len(drifted_books)))
+            return
+
+        with transaction.atomic():
+            updated = rebuild_book_ratings(Book.objects.all())
+        self.stdout.write(self.style.SUCCESS(
+            'Rebuilt aggregates of {0} book(s), {1} of them drifted.'.format(updated, len(drifted_books))
+        ))
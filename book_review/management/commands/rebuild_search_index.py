@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from book_review.custom.search_backends import update_search_documents
+from book_review.models import Book
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds search documents of all books.
+    Database specific full-text index follows documents automatically.
+    """
+    help = 'Rebuild search documents of all books.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        book_ids = list(Book.objects.values_list('pk', flat=True))
+        batch_size = options['batch_size']
+        for start in range(0, len(book_ids), batch_size):
+            update_search_documents(book_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS('Rebuilt search documents of {0} book(s).'.format(len(book_ids))))
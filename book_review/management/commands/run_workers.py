@@ -0,0 +1,43 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from book_review.custom.constants import JOB_STALE_TIMEOUT
+from book_review.custom.jobs import requeue_stale_jobs, work
+
+
+def _close_connections():
+    # Database connections inherited from parent process must not be shared with it.
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    """
+    Runs background jobs (see book_review.jobs) in a pool of worker processes.
+    Workers wait for new jobs forever, unless '--burst' is set: then they exit when queue is empty.
+    """
+    help = 'Run background job workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes.')
+        parser.add_argument('--burst', action='store_true', help='Exit when there are no due jobs.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between checks of empty queue.')
+        parser.add_argument('--stale-timeout', type=int, default=JOB_STALE_TIMEOUT,
+                            help='Seconds after which running job of lost worker is queued again.')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(options['stale_timeout'])
+        if requeued:
+            self.stdout.write('Queued again {0} stale job(s).'.format(requeued))
+
+        work_options = {'burst': options['burst'], 'poll_interval': options['poll_interval']}
+        if options['processes'] == 1:
+            processed = work(**work_options)
+        else:
+            _close_connections()
+            with ProcessPoolExecutor(max_workers=options['processes'], initializer=_close_connections) as pool:
+                futures = [pool.submit(work, **work_options) for _ in range(options['processes'])]
+                processed = sum(future.result() for future in futures)
+
+        self.stdout.write(self.style.SUCCESS('Processed {0} job(s).'.format(processed)))
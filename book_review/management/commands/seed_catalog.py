@@ -0,0 +1,201 @@
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.text import slugify
+
+from book_review.custom.dates import get_today
+from book_review.custom.ratings import rebuild_book_ratings
+from book_review.custom.search_backends import update_search_documents
+from book_review.models import Author, Book, BookSearchDocument, Genre, Review
+
+FIRST_NAMES = [
+    'Lev', 'Fyodor', 'Anton', 'Ivan', 'Mikhail', 'Nikolai', 'Alexander', 'Ernest', 'George', 'Jane',
+    'Charles', 'Virginia', 'Mark', 'Franz', 'Gabriel', 'Haruki', 'Agatha', 'Ray', 'Erich', 'Umberto',
+]
+PATRONYMICS = ['', '', '', 'Nikolayevich', 'Mikhailovich', 'Pavlovich', 'Sergeyevich', 'Alexandrovich']
+LAST_NAMES = [
+    'Tolstoy', 'Dostoevsky', 'Chekhov', 'Turgenev', 'Bulgakov', 'Gogol', 'Pushkin', 'Hemingway', 'Orwell',
+    'Austen', 'Dickens', 'Woolf', 'Twain', 'Kafka', 'Marquez', 'Murakami', 'Christie', 'Bradbury', 'Remarque',
+    'Eco', 'Nabokov', 'Pasternak', 'Solzhenitsyn', 'Steinbeck', 'Faulkner', 'Joyce', 'Camus', 'Hugo',
+]
+GENRES = [
+    'Novel', 'Short story', 'Poetry', 'Drama', 'Science fiction', 'Fantasy', 'Detective', 'Thriller',
+    'Historical novel', 'Biography', 'Memoir', 'Essay', 'Satire', 'Horror', 'Romance', 'Adventure',
+    'Dystopia', 'Philosophy', 'Fairy tale', 'Comedy', 'Tragedy', 'Epic', 'Mystery', 'Children',
+]
+TITLE_WORDS = [
+    'war', 'peace', 'crime', 'punishment', 'master', 'margarita', 'idiot', 'brothers', 'night', 'day',
+    'sea', 'old', 'man', 'farewell', 'arms', 'animal', 'farm', 'pride', 'prejudice', 'great', 'expectations',
+    'castle', 'trial', 'solitude', 'years', 'hundred', 'kingdom', 'dead', 'souls', 'fathers', 'sons',
+    'garden', 'cherry', 'silent', 'front', 'western', 'rose', 'name', 'time', 'lost', 'river', 'city',
+]
+
+
+class Command(BaseCommand):
+    """
+    Generates large reproducible catalog for benchmarks.
+    Popularity is skewed: few books get most of the reviews, few authors write most of the books.
+    Rows are inserted by bulk_create in batches, so signals are not sent;
+    review aggregates and search documents are rebuilt at the end.
+    """
+    help = 'Seed database with generated books, authors, genres, users and reviews.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=100000)
+        parser.add_argument('--authors', type=int, default=50000)
+        parser.add_argument('--reviews', type=int, default=5000000)
+        parser.add_argument('--reviews-per-user', type=int, default=50)
+        parser.add_argument('--skew', type=float, default=3.0,
+                            help='Popularity skew. 1 is uniform, bigger values concentrate reviews on fewer books.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if options['books'] and not options['authors']:
+            raise CommandError('Books can not be created without authors.')
+
+        self.random = random.Random(options['seed'])
+        self.skew = options['skew']
+        self.batch_size = options['batch_size']
+
+        with transaction.atomic():
+            genres = self.create_genres()
+            authors = self.create_authors(options['authors'])
+            books = self.create_books(options['books'], authors, genres)
+            self.create_reviews(options['reviews'], options['reviews_per_user'], books)
+            if not books:
+                return
+
+            self.stdout.write('Rebuilding review aggregates...')
+            # Created books are the newest ones, range filter avoids huge IN clause.
+            rebuild_book_ratings(Book.objects.filter(pk__gte=books[0]))
+            self.stdout.write('Rebuilding search documents...')
+            BookSearchDocument.objects.filter(book__gte=books[0]).delete()
+            for start in range(0, len(books), 500):
+                update_search_documents(books[start:start + 500])
+
+        self.stdout.write(self.style.SUCCESS('Catalog is seeded.'))
+
+    def skewed_index(self, size):
+        """
+        Returns random index in range(size). Small indexes are much more likely.
+        """
+        return int(size * self.random.random() ** self.skew)
+
+    def bulk_create(self, model, objects):
+        """
+        Creates objects in batches and returns their primary keys.
+        """
+        for start in range(0, len(objects), self.batch_size):
+            model.objects.bulk_create(objects[start:start + self.batch_size])
+        if all(obj.pk is not None for obj in objects):
+            return [obj.pk for obj in objects]
+        # Database can't return primary keys from bulk insert (SQLite on Django 3.2).
+        # Command runs in one transaction, so created rows are the newest ones.
+        return sorted(model.objects.order_by('-pk').values_list('pk', flat=True)[:len(objects)])
+
+    def create_genres(self):
+        existing = set(Genre.objects.values_list('name', flat=True))
+        Genre.objects.bulk_create([Genre(name=name) for name in GENRES if name not in existing])
+        return list(Genre.objects.filter(name__in=GENRES).values_list('pk', flat=True))
+
+    def create_authors(self, number):
+        # Unique birth date makes every generated author unique.
+        first_born = datetime.date(1700, 1, 1) + datetime.timedelta(days=self.random.randrange(10000))
+        authors = [
+            Author(
+                first_name=self.random.choice(FIRST_NAMES),
+                patronymic=self.random.choice(PATRONYMICS),
+                last_name=self.random.choice(LAST_NAMES),
+                born=first_born + datetime.timedelta(days=i),
+            )
+            for i in range(number)
+        ]
+        for author in authors:
+            author.search_key = author.get_search_key()
+        self.stdout.write('Creating {0} authors...'.format(number))
+        return self.bulk_create(Author, authors)
+
+    def create_books(self, number, authors, genres):
+        today = get_today()
+        first_date = datetime.date(1800, 1, 1)
+        days = (today - first_date).days + 365
+        taken = set(Book.objects.values_list('title', 'pub_date'))
+        books = []
+        while len(books) < number:
+            title = ' '.join(self.random.sample(TITLE_WORDS, self.random.randint(1, 4))).capitalize()
+            pub_date = first_date + datetime.timedelta(days=self.random.randrange(days))
+            if (title, pub_date) in taken:
+                continue
+            taken.add((title, pub_date))
+            books.append(Book(
+                title=title,
+                language='English',
+                country='USA',
+                pub_date=pub_date,
+                pub_year=pub_date.year,
+                description=' '.join(self.random.choices(TITLE_WORDS, k=60)),
+                pages=self.random.randint(50, 1500),
+                slug=slugify(title)[:80],
+            ))
+        self.stdout.write('Creating {0} books...'.format(number))
+        books = self.bulk_create(Book, books)
+
+        book_authors, book_genres = [], []
+        for book_id in books:
+            for author_id in {authors[self.skewed_index(len(authors))] for i in range(self.random.randint(1, 2))}:
+                book_authors.append(Book.authors.through(book_id=book_id, author_id=author_id))
+            for genre_id in {genres[self.skewed_index(len(genres))] for i in range(self.random.randint(1, 3))}:
+                book_genres.append(Book.genres.through(book_id=book_id, genre_id=genre_id))
+        self.bulk_create(Book.authors.through, book_authors)
+        self.bulk_create(Book.genres.through, book_genres)
+        return books
+
+    def create_reviews(self, number, reviews_per_user, books):
+        if not books:
+            return
+        today = get_today()
+        published = list(Book.objects.filter(pk__gte=books[0], pub_date__lte=today).values_list('pk', flat=True))
+        if not published or not number:
+            return
+
+        # Most popular books are first, so skewed index selects them more often.
+        self.random.shuffle(published)
+        users_number = max(1, number // reviews_per_user)
+        first_user = User.objects.count()
+        password = make_password(None)
+        self.stdout.write('Creating {0} users...'.format(users_number))
+        users = self.bulk_create(User, [
+            User(username='seed_user_{0}'.format(first_user + i), password=password) for i in range(users_number)
+        ])
+
+        self.stdout.write('Creating {0} reviews...'.format(number))
+        reviews, created = [], 0
+        for user_index, user_id in enumerate(users):
+            # Last user takes the remainder, so exactly 'number' reviews are created if enough books exist.
+            left = number - created
+            user_reviews = left if user_index == len(users) - 1 else min(left, reviews_per_user)
+            user_books = set()
+            for attempt in range(user_reviews * 3):
+                if len(user_books) == min(user_reviews, len(published)):
+                    break
+                user_books.add(published[self.skewed_index(len(published))])
+
+            for book_id in user_books:
+                reviews.append(Review(
+                    book_id=book_id,
+                    owner_id=user_id,
+                    title=' '.join(self.random.sample(TITLE_WORDS, 3)).capitalize(),
+                    text=' '.join(self.random.choices(TITLE_WORDS, k=self.random.randint(20, 300))),
+                    rating=min(5, max(1, round(self.random.gauss(3.8, 1)))),
+                ))
+            created += len(user_books)
+
+            if len(reviews) >= self.batch_size:
+                Review.objects.bulk_create(reviews)
+                reviews = []
+        Review.objects.bulk_create(reviews)
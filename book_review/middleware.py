@@ -0,0 +1,400 @@
+"""
+Project middleware. Every middleware runs in mode of middleware chain (see AsyncCapableMiddleware),
+so under ASGI requests of async views (see book_review.async_views) don't hold a thread while they wait for queries.
+"""
+
+import asyncio
+import cProfile
+import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import reverse
+from django.utils.cache import has_vary_header, patch_cache_control
+from django.utils.deprecation import MiddlewareMixin
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .custom.constants import QUERY_BUDGETS
+from .custom.metrics import metrics, request_metrics
+from .custom.profiling import QueryRecorder, is_profile_asked, is_profile_requested, save_profile
+from .custom.slow_queries import get_call_site, record_slow_query
+from .routers import get_routing_state, routing_state
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """
+    Database execute wrapper counting executed queries and their time.
+    Queries taking at least 'slow_threshold' seconds are collected with their call sites.
+    """
+    def __init__(self, slow_threshold=None):
+        self.count = 0
+        self.duration = 0
+        self.slow_threshold = slow_threshold
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.duration += duration
+            if self.slow_threshold is not None and duration >= self.slow_threshold and not many:
+                self.slow_queries.append((context['connection'].alias, sql, params, duration, get_call_site()))
+
+
+# Counters of current context. Context is copied to threads of sync_to_async,
+# so queries of async views and of sync views served under ASGI are counted as well.
+_query_counters = ContextVar('query_counters', default=())
+
+
+def _count_query(execute, sql, params, many, context):
+    for counter in _query_counters.get():
+        execute = functools.partial(counter, execute)
+    return execute(sql, params, many, context)
+
+
+def count_connection_queries(sender, connection, **kwargs):
+    """
+    Lets count_queries see queries of every new database connection (connection_created signal receiver).
+    """
+    if _count_query not in connection.execute_wrappers:
+        # Inserted first, since execute_wrapper() blocks remove the last wrapper.
+        connection.execute_wrappers.insert(0, _count_query)
+
+
+@contextmanager
+def count_queries(counter):
+    """
+    Counts queries made inside the block by a given counter, in any thread.
+    """
+    token = _query_counters.set(_query_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _query_counters.reset(token)
+
+
+class AsyncCapableMiddleware(MiddlewareMixin):
+    """
+    Base class of middleware running in mode of middleware chain: in async mode (ASGI) __call__ returns
+    coroutine of __acall__, otherwise it calls 'handle'. Subclasses implement both methods,
+    and their 'process_view' must not block, since in async mode it's called in event loop.
+    """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if asyncio.iscoroutinefunction(self) and hasattr(self, 'process_view'):
+            # Otherwise Django runs sync process_view in a thread.
+            process_view = self.process_view
+
+            async def async_process_view(request, view_func, view_args, view_kwargs):
+                return process_view(request, view_func, view_args, view_kwargs)
+
+            self.process_view = async_process_view
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class StaticFilesMiddleware(AsyncCapableMiddleware):
+    """
+    Serves static files by WhiteNoise, which is sync only. Under ASGI static files are looked up and opened
+    in a thread, every other request passes to the next middleware in event loop.
+    """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.whitenoise = WhiteNoiseMiddleware(get_response)
+
+    def handle(self, request):
+        return self.whitenoise(request)
+
+    async def __acall__(self, request):
+        # Files are found on every request when 'autorefresh' is on (DEBUG).
+        if self.whitenoise.autorefresh or request.path_info in self.whitenoise.files:
+            response = await sync_to_async(self.whitenoise.process_request, thread_sensitive=False)(request)
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+
+class QueryBudgetMiddleware(AsyncCapableMiddleware):
+    """
+    Counts database queries of every request and compares it with view budget from QUERY_BUDGETS.
+    Exceeded budget is logged as a warning,
+    or raises QueryBudgetExceeded if 'QUERY_BUDGET_STRICT' setting is True.
+    Counter is left in request for MetricsMiddleware and SlowQueryMiddleware.
+    """
+    def handle(self, request):
+        with count_queries(QueryCounter(getattr(request, 'slow_query_threshold', None))) as counter:
+            request.query_counter = counter
+            response = self.get_response(request)
+        self.check_budget(request, counter)
+        return response
+
+    async def __acall__(self, request):
+        with count_queries(QueryCounter(getattr(request, 'slow_query_threshold', None))) as counter:
+            request.query_counter = counter
+            response = await self.get_response(request)
+        self.check_budget(request, counter)
+        return response
+
+    def check_budget(self, request, counter):
+        url_name = request.resolver_match.view_name if request.resolver_match else None
+        budget = QUERY_BUDGETS.get(url_name)
+        if budget is not None and counter.count > budget:
+            message = '{0} made {1} queries, budget is {2}.'.format(request.path, counter.count, budget)
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+
+class ProfilerMiddleware(AsyncCapableMiddleware):
+    """
+    Profiles requests of staff users having 'profile' url argument or 'X-Profile' header
+    and saves profiles with SQL queries of requests (see book_review.custom.profiling).
+    Response gets 'X-Profile' header with url of the profile in admin. Turned off if 'PROFILER' setting is False.
+    Only this thread is profiled: under ASGI it's event loop thread, so functions run in threads by sync_to_async
+    (queries, sync views) are only seen as waits in the call tree, queries are still recorded.
+    Only one request per process is profiled at a time: profiles of concurrent requests of event loop would clobber
+    each other. Requests asking for a profile meanwhile run unprofiled and get no 'X-Profile' header.
+    Other requests served by event loop during profiled one still show up in its profile.
+    """
+    profile_lock = threading.Lock()
+
+    def __init__(self, get_response):
+        if not settings.PROFILER:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        if not is_profile_requested(request) or not self.acquire_profile(request):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            with count_queries(recorder):
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+        finally:
+            self.profile_lock.release()
+        duration = time.perf_counter() - started
+        return self.add_profile(request, response, save_profile(request, response, profiler, recorder, duration))
+
+    async def __acall__(self, request):
+        # User is loaded in a thread only if request asks for a profile.
+        if not (is_profile_asked(request) and await sync_to_async(is_profile_requested)(request)):
+            return await self.get_response(request)
+        if not self.acquire_profile(request):
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            with count_queries(recorder):
+                profiler.enable()
+                try:
+                    response = await self.get_response(request)
+                finally:
+                    profiler.disable()
+        finally:
+            self.profile_lock.release()
+        duration = time.perf_counter() - started
+        profile = await sync_to_async(save_profile)(request, response, profiler, recorder, duration)
+        return self.add_profile(request, response, profile)
+
+    def acquire_profile(self, request):
+        """
+        Returns True if request may be profiled, caller releases 'profile_lock' then. Never waits.
+        """
+        if self.profile_lock.acquire(blocking=False):
+            return True
+        logger.info('Request %s is not profiled, another request is being profiled.', request.get_full_path())
+        return False
+
+    def add_profile(self, request, response, profile):
+        response['X-Profile'] = reverse('admin:book_review_requestprofile_change', args=[profile.pk])
+        return response
+
+
+class SlowQueryMiddleware(AsyncCapableMiddleware):
+    """
+    Lets QueryBudgetMiddleware collect queries slower than 'SLOW_QUERY_THRESHOLD' seconds
+    in a sampled share of requests ('SLOW_QUERY_SAMPLE_RATE'), then logs them and keeps the slowest ones
+    with their plans (see book_review.custom.slow_queries). Plans are fetched after queries budget is checked,
+    so they don't count towards it. Turned on by 'SLOW_QUERIES' setting.
+    """
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERIES:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        self.sample(request)
+        response = self.get_response(request)
+        if self.get_slow_queries(request):
+            self.record(request)
+        return response
+
+    async def __acall__(self, request):
+        self.sample(request)
+        response = await self.get_response(request)
+        # Plans are fetched in a thread, only for requests having slow queries.
+        if self.get_slow_queries(request):
+            await sync_to_async(self.record)(request)
+        return response
+
+    def sample(self, request):
+        if random.random() < settings.SLOW_QUERY_SAMPLE_RATE:
+            request.slow_query_threshold = settings.SLOW_QUERY_THRESHOLD
+
+    def get_slow_queries(self, request):
+        counter = getattr(request, 'query_counter', None)
+        return counter.slow_queries if counter is not None else []
+
+    def record(self, request):
+        view_name = request.resolver_match.view_name if request.resolver_match else None
+        for alias, sql, params, duration, call_site in self.get_slow_queries(request):
+            record_slow_query(alias, sql, params, duration, view_name=view_name, call_site=call_site)
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Records latency, database queries and template render time of every request by its url name
+    (see book_review.custom.metrics). Queries are counted by QueryBudgetMiddleware.
+    Turned off if 'METRICS' setting is False.
+    """
+    def __init__(self, get_response):
+        if not settings.METRICS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def handle(self, request):
+        started = time.perf_counter()
+        with request_metrics() as state:
+            response = self.get_response(request)
+        self.record(request, time.perf_counter() - started, state)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with request_metrics() as state:
+            response = await self.get_response(request)
+        self.record(request, time.perf_counter() - started, state)
+        return response
+
+    def record(self, request, duration, state):
+        counter = getattr(request, 'query_counter', None)
+        metrics.record_request(
+            request.resolver_match.view_name if request.resolver_match else None, request.method, duration,
+            queries=counter.count if counter else 0, query_seconds=counter.duration if counter else 0, state=state,
+        )
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """
+    Lets views with 'read_from_replica' attribute read from replica databases (see book_review.routers).
+    Request which writes to database sets a cookie, so following requests of the same client
+    read from primary database until the cookie expires in 'REPLICA_STICKINESS' seconds.
+    """
+    cookie_name = 'read_primary'
+
+    def handle(self, request):
+        with routing_state(pinned=self.cookie_name in request.COOKIES) as state:
+            response = self.get_response(request)
+        return self.pin_to_primary(state, response)
+
+    async def __acall__(self, request):
+        with routing_state(pinned=self.cookie_name in request.COOKIES) as state:
+            response = await self.get_response(request)
+        return self.pin_to_primary(state, response)
+
+    def pin_to_primary(self, state, response):
+        if state.written and settings.REPLICA_DATABASES:
+            response.set_cookie(self.cookie_name, '1', max_age=settings.REPLICA_STICKINESS, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if getattr(view_class, 'read_from_replica', False):
+            get_routing_state().use_replica = True
+
+
+class LazySessionAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    Requests without session cookie get anonymous user without touching session,
+    so their responses neither vary on cookies nor create sessions.
+    Sessions are only created by login (register logs user in as well).
+    """
+    def process_request(self, request):
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return super().process_request(request)
+        request.user = AnonymousUser()
+
+    async def __acall__(self, request):
+        # User is loaded lazily, so unlike MiddlewareMixin no thread is needed.
+        self.process_request(request)
+        return await self.get_response(request)
+
+
+class PublicCacheMiddleware(AsyncCapableMiddleware):
+    """
+    Lets shared caches (CDN, reverse proxy) store anonymous responses of views with 'public_cache' attribute
+    for 'PUBLIC_CACHE_TIMEOUT' seconds. Response is anonymous if request has no session cookie,
+    and response neither sets cookies nor varies on them. Browsers revalidate such responses every time,
+    since they cache by url only and the same url shows another page after login.
+    Responses of these views to requests with session cookie are private.
+    Shared cache must pass requests with session cookie to the application.
+    """
+    def handle(self, request):
+        return self.patch_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.patch_response(request, await self.get_response(request))
+
+    def patch_response(self, request, response):
+        if not getattr(request, 'public_cache', False) or request.method not in ('GET', 'HEAD'):
+            return response
+
+        if (settings.SESSION_COOKIE_NAME in request.COOKIES or response.cookies
+                or has_vary_header(response, 'Cookie')):
+            patch_cache_control(response, private=True)
+        elif response.status_code == 200 and settings.PUBLIC_CACHE_TIMEOUT:
+            if 'max-age' in response.get('Cache-Control', ''):
+                patch_cache_control(response, public=True, s_maxage=settings.PUBLIC_CACHE_TIMEOUT)
+            else:
+                patch_cache_control(response, public=True, max_age=0, s_maxage=settings.PUBLIC_CACHE_TIMEOUT)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        request.public_cache = getattr(view_class, 'public_cache', False)
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.6 on 2026-10-18 03:58
+
+from django.db import migrations, models
+from django.db.models import Count, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+
+def fill_book_rating_aggregates(apps, schema_editor):
+    Book = apps.get_model('book_review', 'Book')
+    Review = apps.get_model('book_review', 'Review')
+    reviews = Review.objects.filter(book=OuterRef('pk')).order_by().values('book')
+    num_reviews = Coalesce(
+        Subquery(reviews.annotate(count=Count('id')).values('count')), Value(0), output_field=IntegerField()
+    )
+    rating_sum = Coalesce(
+        Subquery(reviews.annotate(sum=Sum('rating')).values('sum')), Value(0), output_field=IntegerField()
+    )
+    Book.objects.update(
+        num_reviews=num_reviews,
+        rating_sum=rating_sum,
+        avg_rating=Coalesce(Cast(rating_sum, FloatField()) / NullIf(num_reviews, 0), Value(float(0))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book_review', '0052_alter_book_original_title'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='avg_rating',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='num_reviews',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-num_reviews', 'title'], name='book_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-avg_rating', 'title'], name='book_best_rated_idx'),
+        ),
+        migrations.RunPython(fill_book_rating_aggregates, migrations.RunPython.noop),
+    ]
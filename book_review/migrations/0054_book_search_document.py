@@ -0,0 +1,99 @@
+# Generated by Django 3.2.6 on 2026-10-18 04:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.utils import OperationalError
+
+# Must match PostgresSearchBackend.vector (which qualifies columns with table name).
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('simple', title), 'A') || "
+    "setweight(to_tsvector('simple', authors), 'B') || "
+    "setweight(to_tsvector('simple', genres), 'C') || "
+    "setweight(to_tsvector('simple', year), 'D')"
+)
+
+SQLITE_FTS_SQL = [
+    """CREATE VIRTUAL TABLE book_review_booksearch_fts USING fts5(
+        title, authors, genres, year,
+        content='book_review_booksearchdocument', content_rowid='book_id'
+    )""",
+    """CREATE TRIGGER book_review_booksearch_ai AFTER INSERT ON book_review_booksearchdocument BEGIN
+        INSERT INTO book_review_booksearch_fts(rowid, title, authors, genres, year)
+        VALUES (new.book_id, new.title, new.authors, new.genres, new.year);
+    END""",
+    """CREATE TRIGGER book_review_booksearch_ad AFTER DELETE ON book_review_booksearchdocument BEGIN
+        INSERT INTO book_review_booksearch_fts(book_review_booksearch_fts, rowid, title, authors, genres, year)
+        VALUES ('delete', old.book_id, old.title, old.authors, old.genres, old.year);
+    END""",
+    """CREATE TRIGGER book_review_booksearch_au AFTER UPDATE ON book_review_booksearchdocument BEGIN
+        INSERT INTO book_review_booksearch_fts(book_review_booksearch_fts, rowid, title, authors, genres, year)
+        VALUES ('delete', old.book_id, old.title, old.authors, old.genres, old.year);
+        INSERT INTO book_review_booksearch_fts(rowid, title, authors, genres, year)
+        VALUES (new.book_id, new.title, new.authors, new.genres, new.year);
+    END""",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX book_search_document_gin_idx ON book_review_booksearchdocument '
+            'USING gin (({0}))'.format(POSTGRES_VECTOR)
+        )
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_FTS_SQL[0])
+        except OperationalError:
+            # SQLite is compiled without FTS5. Search falls back to substring matching.
+            return
+        for sql in SQLITE_FTS_SQL[1:]:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS book_search_document_gin_idx')
+    elif vendor == 'sqlite':
+        for trigger in ['ai', 'ad', 'au']:
+            schema_editor.execute('DROP TRIGGER IF EXISTS book_review_booksearch_{0}'.format(trigger))
+        schema_editor.execute('DROP TABLE IF EXISTS book_review_booksearch_fts')
+
+
+def fill_search_documents(apps, schema_editor):
+    Book = apps.get_model('book_review', 'Book')
+    BookSearchDocument = apps.get_model('book_review', 'BookSearchDocument')
+    for book in Book.objects.prefetch_related('authors', 'genres'):
+        BookSearchDocument.objects.create(
+            book=book,
+            title=book.title,
+            authors='\n'.join(
+                ' '.join(part for part in [author.first_name, author.patronymic, author.last_name] if part)
+                for author in book.authors.all()
+            ),
+            genres='\n'.join(genre.name for genre in book.genres.all()),
+            year=str(book.pub_date.year),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book_review', '0053_book_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSearchDocument',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='book_review.book')),
+                ('title', models.TextField(blank=True)),
+                ('authors', models.TextField(blank=True)),
+                ('genres', models.TextField(blank=True)),
+                ('year', models.CharField(blank=True, max_length=4)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.6 on 2026-10-18 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book_review', '0054_book_search_document'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['pub_date', 'title'], name='book_anticipated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-pub_date', 'title'], name='book_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.6 on 2026-10-18 04:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book_review', '0055_book_pub_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSearchIndex',
+            fields=[
+                ('book', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='book_review.book')),
+            ],
+            options={
+                'db_table': 'book_review_booksearch_fts',
+                'managed': False,
+            },
+        ),
+    ]
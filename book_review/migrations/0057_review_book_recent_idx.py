@@ -0,0 +1,17 @@
+# Generated by Django 3.2.6 on 2026-10-18 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book_review', '0056_book_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['book', '-pub_date', '-id'], name='review_book_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.6 on 2026-10-18 04:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book_review', '0058_review_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='images',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.6 on 2026-10-18 05:12
+
+from django.db import migrations
+
+# Trigram GIN indexes serve fuzzy search ('<%' operator) of PostgresSearchBackend.
+# Other databases use in-process trigram index (see book_review.custom.fuzzy).
+POSTGRES_TRIGRAM_INDEXES = {
+    'book_search_document_title_trgm_idx': 'title',
+    'book_search_document_authors_trgm_idx': 'authors',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in POSTGRES_TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            'CREATE INDEX {0} ON book_review_booksearchdocument USING gin ({1} gin_trgm_ops)'.format(name, column)
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in POSTGRES_TRIGRAM_INDEXES:
+        schema_editor.execute('DROP INDEX IF EXISTS {0}'.format(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book_review', '0060_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
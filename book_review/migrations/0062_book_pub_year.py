@@ -0,0 +1,30 @@
+# Generated by Django 3.2.6 on 2026-10-18 05:40
+
+from django.db import migrations, models
+from django.db.models.functions import ExtractYear
+
+
+def fill_pub_year(apps, schema_editor):
+    Book = apps.get_model('book_review', 'Book')
+    Book.objects.update(pub_year=ExtractYear('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book_review', '0061_book_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='pub_year',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_pub_year, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['pub_year', 'title'], name='book_year_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.2.6 on 2026-10-18 06:05
+
+from django.db import migrations, models
+
+from book_review.custom.text import normalize
+
+
+def get_search_key(author):
+    # Must match Author.get_search_key.
+    full_name = ' '.join(normalize(' '.join([author.first_name, author.patronymic, author.last_name])))
+    short_name = ' '.join(normalize(' '.join([author.first_name, author.last_name])))
+    return full_name if full_name == short_name else '{0}/{1}'.format(full_name, short_name)
+
+
+def fill_search_keys(apps, schema_editor):
+    Author = apps.get_model('book_review', 'Author')
+    authors = list(Author.objects.only('first_name', 'patronymic', 'last_name'))
+    for author in authors:
+        author.search_key = get_search_key(author)
+    Author.objects.bulk_update(authors, ['search_key'], batch_size=1000)
+
+
+def create_trigram_index(apps, schema_editor):
+    # Substring lookups of search key use trigram index on PostgreSQL (pg_trgm is created by migration 0061).
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX author_search_key_trgm_idx ON book_review_author USING gin (search_key gin_trgm_ops)'
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS author_search_key_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book_review', '0062_book_pub_year'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='author',
+            name='search_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.6 on 2026-10-18 05:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('book_review', '0064_request_profile'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='author',
+            name='search_key',
+            field=models.CharField(editable=False, max_length=255),
+        ),
+    ]
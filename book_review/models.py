@@ -2,11 +2,15 @@ import datetime
 
 from django.conf import settings
 from django.core.validators import MaxValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
-from .custom.constants import RATINGS
+from .custom.constants import JOB_MAX_ATTEMPTS, PROFILE_TIMEOUT, RATINGS
+from .custom.dates import get_today
+from .custom.text import normalize
 
 
 def get_sentinel_user():
@@ -27,11 +31,28 @@ class Author(models.Model):
         help_text='YYYY-MM-DD',
         validators=[MaxValueValidator(limit_value=datetime.date.today)]
     )
+    # Normalized full and short names (see get_search_key), so author search is a lookup of a single column.
+    # Substring lookups can't use B-tree index, only pg_trgm GIN index created by migration serves them.
+    # Set on save, bulk inserts must set it explicitly.
+    search_key = models.CharField(max_length=255, editable=False)
 
     class Meta:
         unique_together = ['first_name', 'patronymic', 'last_name', 'born']
         ordering = ['first_name']
 
+    def get_search_key(self):
+        """
+        Returns lower-cased full name and short name (without patronymic) without accents and punctuation,
+        separated by '/', e.g. 'lev nikolayevich tolstoy/lev tolstoy'. Name without patronymic is stored once.
+        """
+        full_name = ' '.join(normalize(' '.join([self.first_name, self.patronymic, self.last_name])))
+        short_name = ' '.join(normalize(' '.join([self.first_name, self.last_name])))
+        return full_name if full_name == short_name else '{0}/{1}'.format(full_name, short_name)
+
+    def save(self, *args, **kwargs):
+        self.search_key = self.get_search_key()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         """
         String representation is an author's full name.
@@ -56,6 +77,10 @@ class Genre(models.Model):
         return self.name
 
 
+# Denormalized review aggregates of Book, which are never written back by Book.save.
+REVIEW_AGGREGATE_FIELDS = ('num_reviews', 'rating_sum', 'avg_rating')
+
+
 class Book(models.Model):
     """
     Book model.
@@ -69,21 +94,51 @@ class Book(models.Model):
     country = models.CharField(max_length=50)
     # Not limiting pub_date max value by today in case of anticipated books.
     pub_date = models.DateField(help_text='YYYY-MM-DD')
+    # Year of pub_date, stored separately, so year search and year filters are indexed integer comparisons.
+    # Set on save, bulk inserts must set it explicitly.
+    pub_year = models.PositiveSmallIntegerField(editable=False)
     description = models.TextField(max_length=1024, blank=True)
     full_img = models.ImageField(upload_to='img/book_img/full/', default='img/book_img/full/default-book-full.jpg')
     small_img = models.ImageField(upload_to='img/book_img/small/', default='img/book_img/small/default-book-small.jpg')
+    # Responsive derivatives of full_img (see book_review.custom.images).
+    images = models.JSONField(default=dict, blank=True, editable=False)
     pages = models.PositiveIntegerField(null=True, blank=True)
     slug = models.SlugField(max_length=80)
+    # Reviews aggregates are stored denormalized, so ordering by them is an indexed ORDER BY.
+    # They are maintained by review signals (see book_review.signals) and can be rebuilt
+    # with 'rebuild_book_ratings' management command.
+    num_reviews = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    avg_rating = models.FloatField(default=0, editable=False)
 
     class Meta:
         unique_together = ['title', 'pub_date']
         ordering = ['title']
+        # Every book list ordering has its own index.
+        # Indexes starting with pub_date also serve anticipated / published filtering.
+        indexes = [
+            models.Index(fields=['pub_date', 'title'], name='book_anticipated_idx'),
+            models.Index(fields=['-pub_date', 'title'], name='book_recent_idx'),
+            models.Index(fields=['-num_reviews', 'title'], name='book_popular_idx'),
+            models.Index(fields=['-avg_rating', 'title'], name='book_best_rated_idx'),
+            models.Index(fields=['pub_year', 'title'], name='book_year_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.pub_year = self.pub_date.year
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            # Aggregates loaded with the book may be stale already, they are only changed by UPDATE with F-expressions.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in REVIEW_AGGREGATE_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
     def is_published(self):
         """
         Returns True if book is already published.
         """
-        return self.pub_date <= datetime.date.today()
+        return self.pub_date <= get_today()
 
     def get_absolute_url(self):
         # Using slug only is not safe enough since different books may have identical titles.
@@ -98,9 +153,17 @@ class Book(models.Model):
         return self.title
 
 
+class ReviewVersionConflict(Exception):
+    """
+    Raised when review is saved with a version which is not the latest one anymore.
+    """
+
+
 class Review(models.Model):
     """
     Review model.
+    Version is incremented on every update and used for optimistic locking:
+    review saved with 'expected_version' is only updated if it still has this version.
     """
     title = models.CharField(max_length=60)
     # One review can only refer to one book.
@@ -112,11 +175,149 @@ class Review(models.Model):
         on_delete=models.SET(get_sentinel_user)
     )
     pub_date = models.DateField(auto_now_add=True)
+    version = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         # Put unique constraint on book and owner fields,
         # since each user may only have 1 review on each book.
         unique_together = ['book', 'owner']
+        indexes = [
+            models.Index(fields=['book', '-pub_date', '-id'], name='review_book_recent_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remembers book and rating values loaded from database,
+        so book aggregates can be adjusted by delta when review is changed.
+        """
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        instance._loaded_book_id = loaded.get('book_id')
+        instance._loaded_rating = loaded.get('rating')
+        return instance
+
+    def save(self, *args, expected_version=None, **kwargs):
+        """
+        If 'expected_version' is given, existing review is only updated if it still has this version,
+        otherwise ReviewVersionConflict is raised.
+        """
+        self._expected_version = expected_version
+        try:
+            # Review row and its book aggregates are written in one transaction.
+            with transaction.atomic(using=kwargs.get('using')):
+                super().save(*args, **kwargs)
+        finally:
+            self._expected_version = None
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        version_field = self._meta.get_field('version')
+        values = [value for value in values if value[0] is not version_field]
+        values.append((version_field, None, F('version') + 1))
+        expected_version = getattr(self, '_expected_version', None)
+        if expected_version is not None:
+            # Conditional UPDATE: row is changed only if its version wasn't changed since review was read.
+            base_qs = base_qs.filter(version=expected_version)
+        if not super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update):
+            if expected_version is not None:
+                raise ReviewVersionConflict
+            # Row doesn't exist, so it's inserted.
+            return False
+        self.version = (self.version if expected_version is None else expected_version) + 1
+        return True
+
+    def __str__(self):
+        return self.title
+
+
+class BookSearchDocument(models.Model):
+    """
+    Denormalized text of a book used by full-text search backends.
+    Row is rebuilt on every change of book, its authors or genres (see book_review.signals).
+    Database specific index (PostgreSQL GIN index or SQLite FTS5 table) is built over this table.
+    """
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    title = models.TextField(blank=True)
+    authors = models.TextField(blank=True)
+    genres = models.TextField(blank=True)
+    year = models.CharField(max_length=4, blank=True)
 
     def __str__(self):
         return self.title
+
+
+class BookSearchIndex(models.Model):
+    """
+    SQLite FTS5 table built over BookSearchDocument (rowid is a book id).
+    Table is created by migration on SQLite only, so model is unmanaged.
+    Model exists to join the table to books in a single full-text query.
+    """
+    book = models.OneToOneField(
+        Book, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid', related_name='search_index'
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'book_review_booksearch_fts'
+
+
+class Job(models.Model):
+    """
+    Background job stored in database. Jobs are run by 'run_workers' management command.
+    Only one queued job may have a given deduplication key, so repeated enqueueing of the same work is skipped.
+    See book_review.custom.jobs.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    dedup_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=JOB_MAX_ATTEMPTS)
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_queue_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['dedup_key'], condition=Q(status='queued'), name='job_queued_dedup_key'),
+        ]
+
+    def __str__(self):
+        return '{0} #{1}'.format(self.name, self.pk)
+
+
+def get_profile_expiry():
+    return timezone.now() + datetime.timedelta(seconds=PROFILE_TIMEOUT)
+
+
+class RequestProfile(models.Model):
+    """
+    Profile of a request made by staff user on demand: cProfile statistics and SQL queries of the request.
+    Profiles expire after PROFILE_TIMEOUT seconds. See book_review.custom.profiling.
+    """
+    method = models.CharField(max_length=10)
+    path = models.TextField()
+    view_name = models.CharField(max_length=200, blank=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, on_delete=models.SET_NULL)
+    status_code = models.PositiveSmallIntegerField()
+    duration = models.FloatField()
+    num_queries = models.PositiveIntegerField()
+    report = models.TextField()
+    stats = models.BinaryField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(default=get_profile_expiry, db_index=True)
+
+    def __str__(self):
+        return '{0} {1}'.format(self.method, self.path)
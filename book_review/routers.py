@@ -0,0 +1,79 @@
+"""
+Database router sending reads of read-only views to replicas (see 'REPLICA_DATABASES' setting).
+Views opt in with 'read_from_replica' class attribute, every other read and all writes go to primary database.
+Replicas lag behind primary, so user who has just written something reads from primary
+for 'REPLICA_STICKINESS' seconds and sees his own changes (read-your-writes).
+Routing state of current request is kept by ReplicaRoutingMiddleware.
+"""
+
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+
+class RoutingState:
+    """
+    Routing state of a single request.
+    """
+    def __init__(self, pinned=False):
+        # Reads may go to replica.
+        self.use_replica = False
+        # User has written recently, so reads go to primary.
+        self.pinned = pinned
+        # Request has written to primary.
+        self.written = False
+
+
+_routing_state = contextvars.ContextVar('routing_state', default=None)
+
+
+def get_routing_state():
+    return _routing_state.get()
+
+
+def reads_from_replica():
+    """
+    Returns True if reads of current request go to replicas.
+    """
+    state = get_routing_state()
+    replicas = getattr(settings, 'REPLICA_DATABASES', [])
+    return state is not None and state.use_replica and not state.pinned and bool(replicas)
+
+
+@contextmanager
+def routing_state(pinned=False):
+    """
+    Provides routing state for all queries made inside the block.
+    """
+    state = RoutingState(pinned)
+    token = _routing_state.set(state)
+    try:
+        yield state
+    finally:
+        _routing_state.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if reads_from_replica():
+            return random.choice(settings.REPLICA_DATABASES)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = get_routing_state()
+        if state is not None:
+            state.written = True
+            # Rest of request reads its own writes too.
+            state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas contain the same data as primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes from primary by replication.
+        return db not in getattr(settings, 'REPLICA_DATABASES', [])
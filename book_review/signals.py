@@ -0,0 +1,172 @@
+"""
+Signal receivers keeping denormalized data up to date:
+Book review aggregates, book search documents (with fuzzy search index and cached search results),
+autocomplete suggestions, book image derivatives and cached views.
+Expensive work is enqueued as background jobs (see book_review.jobs).
+Receivers are connected in BookReviewConfig.ready().
+post_delete is also sent for cascade and queryset deletes, so aggregates stay correct
+whether review is deleted by view, admin or together with its owner.
+"""
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .custom.autocomplete import remove_suggestion, update_suggestion
+from .custom.cache import invalidate_books
+from .custom.jobs import enqueue
+from .custom.ratings import change_book_rating, rebuild_book_ratings
+from .custom.search_backends import create_search_document, remove_search_document, update_search_documents
+from .models import Author, Book, Genre, Review
+
+
+def _remember_loaded_values(review):
+    review._loaded_book_id = review.book_id
+    review._loaded_rating = review.rating
+
+
+@receiver(post_save, sender=Review)
+def update_book_rating_on_review_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        # Fixtures loading. Aggregates are expected to be loaded together with books.
+        return
+
+    if created:
+        change_book_rating(instance.book_id, 1, instance.rating)
+    elif getattr(instance, '_loaded_rating', None) is None:
+        # Review wasn't loaded from database, so previous values are unknown.
+        rebuild_book_ratings(Book.objects.filter(pk=instance.book_id))
+    elif instance._loaded_book_id != instance.book_id:
+        change_book_rating(instance._loaded_book_id, -1, -instance._loaded_rating)
+        change_book_rating(instance.book_id, 1, instance.rating)
+    else:
+        change_book_rating(instance.book_id, 0, instance.rating - instance._loaded_rating)
+
+    _remember_loaded_values(instance)
+
+
+@receiver(post_delete, sender=Review)
+def update_book_rating_on_review_delete(sender, instance, **kwargs):
+    if getattr(instance, '_loaded_rating', None) is None:
+        # Review row is already deleted, so recount gives correct values.
+        rebuild_book_ratings(Book.objects.filter(pk=instance.book_id))
+    else:
+        change_book_rating(instance._loaded_book_id, -1, -instance._loaded_rating)
+
+
+@receiver(pre_save, sender=Review)
+def invalidate_book_views_on_review_save(sender, instance, raw=False, **kwargs):
+    # Previous book of a moved review is only known before save. Invalidation itself waits for commit.
+    if not raw:
+        invalidate_books({instance.book_id, getattr(instance, '_loaded_book_id', None)} - {None})
+
+
+@receiver(post_delete, sender=Review)
+def invalidate_book_views_on_review_delete(sender, instance, **kwargs):
+    invalidate_books([instance.book_id])
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def warm_book_views_on_review_change(sender, instance, raw=False, **kwargs):
+    if settings.WARM_VIEW_CACHE and not raw:
+        book_id = instance.book_id
+        enqueue('warm_book_views', dedup_key='warm_book_views:{0}'.format(book_id), book_id=book_id)
+
+
+# Search documents and cached views.
+
+def _update_books(book_ids):
+    book_ids = list(book_ids)
+    update_search_documents(book_ids)
+    invalidate_books(book_ids)
+
+
+@receiver(post_save, sender=Book)
+def update_search_document_on_book_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        create_search_document(instance)
+        invalidate_books([instance.pk])
+    else:
+        _update_books([instance.pk])
+
+
+@receiver(pre_save, sender=Book)
+def remember_uploaded_image(sender, instance, raw=False, **kwargs):
+    # Uploaded file is committed to storage during save, so it is only recognizable before save.
+    instance._full_img_uploaded = not raw and bool(instance.full_img) and not instance.full_img._committed
+
+
+@receiver(post_save, sender=Book)
+def build_image_derivatives_on_upload(sender, instance, raw=False, **kwargs):
+    if getattr(instance, '_full_img_uploaded', False):
+        enqueue('build_book_images', dedup_key='build_book_images:{0}'.format(instance.pk), book_id=instance.pk)
+
+
+@receiver(post_delete, sender=Book)
+def invalidate_book_views_on_book_delete(sender, instance, **kwargs):
+    invalidate_books([instance.pk])
+
+
+@receiver(post_delete, sender=Book)
+def remove_search_document_on_book_delete(sender, instance, **kwargs):
+    remove_search_document(instance.pk)
+
+
+@receiver(post_save, sender=Book.authors.through)
+@receiver(post_save, sender=Book.genres.through)
+@receiver(post_delete, sender=Book.authors.through)
+@receiver(post_delete, sender=Book.genres.through)
+def update_search_document_on_link_change(sender, instance, raw=False, **kwargs):
+    # Admin inlines save links between books and authors or genres as through model rows.
+    if not raw:
+        _update_books([instance.book_id])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+@receiver(m2m_changed, sender=Book.genres.through)
+def update_search_document_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._search_book_ids = list(instance.book_set.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        _update_books(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear':
+        _update_books(instance._search_book_ids if reverse else [instance.pk])
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Genre)
+def update_search_document_on_name_change(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        _update_books(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Author)
+@receiver(pre_delete, sender=Genre)
+def remember_books_before_delete(sender, instance, **kwargs):
+    instance._search_book_ids = list(instance.book_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def update_search_document_on_delete(sender, instance, **kwargs):
+    _update_books(getattr(instance, '_search_book_ids', []))
+
+
+# Autocomplete suggestions.
+
+@receiver(post_save, sender=Book)
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Genre)
+def update_autocomplete_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        update_suggestion(instance)
+
+
+@receiver(post_delete, sender=Book)
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Genre)
+def update_autocomplete_on_delete(sender, instance, **kwargs):
+    remove_suggestion(instance)
@@ -2,10 +2,14 @@ from django.urls import reverse
 from urllib.parse import urlencode
 from django import template
 
+from book_review.custom.metrics import timed_tag
+from book_review.custom.pagination import CursorPaginator
+
 register = template.Library()
 
 
 @register.simple_tag(takes_context=True)
+@timed_tag
 def url_replace(context, **kwargs):
     """
     Replaces value of url parameter (such as page=value in pagination).
@@ -16,6 +20,7 @@ def url_replace(context, **kwargs):
 
 
 @register.simple_tag(takes_context=True)
+@timed_tag
 def url_next(context, **kwargs):
     """
     If 'Login' or 'Sign up' buttons are pressed, current path is captured in 'next' parameter,
@@ -35,11 +40,70 @@ def url_next(context, **kwargs):
 
 
 @register.simple_tag(takes_context=True)
+@timed_tag
 def get_page_range(context, on_each_side=2, on_ends=1):
     """
     Allows to call 'get_elided_page_range' method directly from template.
+    Cursor paginator has no page numbers, so only 'next' and 'previous' links are shown.
     """
+    if isinstance(context.get('paginator'), CursorPaginator):
+        return []
+
     cur_page = context.get('page_obj').number
     page_range = context.get('paginator').get_elided_page_range(cur_page, on_each_side=on_each_side, on_ends=on_ends)
 
     return page_range
+
+
+@register.simple_tag(takes_context=True)
+@timed_tag
+def url_page(context, direction):
+    """
+    Returns url parameters of 'next' or 'previous' page.
+    Page number is used for regular pagination, cursor is used for cursor pagination.
+    """
+    page_obj = context.get('page_obj')
+    value = page_obj.next_page_number() if direction == 'next' else page_obj.previous_page_number()
+
+    if isinstance(page_obj.paginator, CursorPaginator):
+        query = context.get('request').GET.copy()
+        query.pop('page', None)
+        query['cursor'] = value
+        return urlencode(query)
+
+    return url_replace(context, page=value)
+
+
+@register.inclusion_tag('books/book_picture.html')
+@timed_tag
+def book_picture(book, sizes='(min-width: 576px) 11.5rem, 100vw', css_class=''):
+    """
+    Renders book cover as <picture> with WebP and JPEG srcsets of cover derivatives (see book_review.custom.images).
+    Browser downloads only one image of suitable format and width. Smallest derivative is a fallback
+    and gives explicit dimensions, so layout doesn't shift while lazily loaded cover arrives.
+    Books without derivatives are rendered with original image.
+    """
+    storage = book.full_img.storage
+    formats = [
+        {
+            'type': image_format['type'],
+            'srcset': ', '.join(
+                '{0} {1}w'.format(storage.url(image['name']), image['width']) for image in image_format['images']
+            ),
+            'fallback': image_format['images'][0],
+        }
+        for image_format in book.images.get('formats', [])
+        if image_format['images']
+    ]
+    fallback = formats[-1]['fallback'] if formats else None
+
+    return {
+        'book': book,
+        'sources': formats[:-1],
+        'srcset': formats[-1]['srcset'] if formats else '',
+        'src': storage.url(fallback['name']) if fallback else book.full_img.url,
+        'width': fallback['width'] if fallback else None,
+        'height': fallback['height'] if fallback else None,
+        'sizes': sizes,
+        'css_class': css_class,
+    }
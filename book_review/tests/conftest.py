@@ -0,0 +1,21 @@
+import pytest
+
+from book_review.custom.autocomplete import autocomplete_index
+from book_review.custom.fuzzy import fuzzy_index
+from book_review.custom.metrics import metrics
+from book_review.custom.search_cache import search_results_cache
+from book_review.custom.slow_queries import slow_query_log
+
+
+# In-process index and cache fixtures.
+
+@pytest.fixture(autouse=True)
+def reset_memory_indexes():
+    """
+    In-process indexes, caches and metrics are filled on first use, so they must not keep data of previous tests.
+    """
+    for index in [autocomplete_index, fuzzy_index, search_results_cache, metrics, slow_query_log]:
+        index.reset()
+    yield
+    for index in [autocomplete_index, fuzzy_index, search_results_cache, metrics, slow_query_log]:
+        index.reset()
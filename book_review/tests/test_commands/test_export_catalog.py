@@ -0,0 +1,88 @@
+import csv
+import json
+import pytest
+
+from io import StringIO
+from mixer.backend.django import mixer
+from django.core.management import call_command
+from book_review.models import Author, Book, Genre, Review
+
+
+CSV_CATALOG = '''title,original_title,pub_date,language,country,description,pages,authors,genres
+War and Peace,Война и мир,1869-01-01,Russian,Russia,Epic novel,1225,Lev Nikolayevich Tolstoy (1828-09-09),Novel;Epic
+Good Omens,,1990-05-01,English,UK,,,Terry Pratchett (1948-04-28);Neil Gaiman (1960-11-10),Fantasy;Comedy
+'''
+
+
+# Local fixtures.
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = tmp_path / 'catalog.csv'
+    path.write_text(CSV_CATALOG, encoding='utf-8')
+    call_command('import_catalog', str(path), stdout=StringIO())
+    return Book.objects.all()
+
+
+def export_catalog(**options):
+    out = StringIO()
+    call_command('export_catalog', stdout=out, **options)
+    return out.getvalue()
+
+
+def get_catalog_state():
+    return sorted(
+        (
+            book.title, book.original_title, book.pub_date, book.pages,
+            sorted(str(author) for author in book.authors.all()),
+            sorted(genre.name for genre in book.genres.all()),
+        )
+        for book in Book.objects.all()
+    )
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+@pytest.mark.parametrize('file_format', ['csv', 'jsonl'])
+def test_exported_books_are_imported_back(tmp_path, catalog, file_format):
+    state = get_catalog_state()
+    path = tmp_path / f'export.{file_format}'
+    call_command('export_catalog', format=file_format, output=str(path))
+    Book.objects.all().delete()
+    Author.objects.all().delete()
+    Genre.objects.all().delete()
+    call_command('import_catalog', str(path), stdout=StringIO())
+    assert get_catalog_state() == state
+
+
+def test_books_export_includes_review_aggregates(catalog):
+    book = catalog.get(title='Good Omens')
+    mixer.blend(Review, book=book, rating=4)
+    mixer.blend(Review, book=book, rating=2)
+    records = {record['title']: record for record in csv.DictReader(StringIO(export_catalog(format='csv')))}
+    assert (records['Good Omens']['num_reviews'], records['Good Omens']['avg_rating']) == ('2', '3.0')
+    assert records['Good Omens']['authors'] == 'Terry Pratchett (1948-04-28);Neil Gaiman (1960-11-10)'
+
+
+def test_books_export_is_filtered_by_search(catalog):
+    output = export_catalog(query='Gaiman', category='author')
+    assert [json.loads(line)['title'] for line in output.splitlines()] == ['Good Omens']
+
+
+def test_reviews_are_exported(catalog):
+    review = mixer.blend(Review, book=catalog.get(title='War and Peace'))
+    mixer.blend(Review, book=catalog.get(title='Good Omens'))
+    output = export_catalog(kind='reviews', query='Tolstoy', category='author')
+    records = [json.loads(line) for line in output.splitlines()]
+    assert [(record['book_title'], record['owner'], record['title']) for record in records] == [
+        ('War and Peace', review.owner.username, review.title),
+    ]
+
+
+def test_export_runs_in_chunks(catalog, django_assert_num_queries):
+    # Books query and authors and genres queries for each of two chunks.
+    with django_assert_num_queries(5):
+        export_catalog(chunk_size=1)
@@ -0,0 +1,173 @@
+import csv
+import json
+import pytest
+
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from book_review.management.commands import import_catalog as import_catalog_command
+from book_review.custom.search import search
+from book_review.models import Author, Book, Genre
+
+
+CSV_CATALOG = '''title,original_title,pub_date,language,country,description,pages,authors,genres
+War and Peace,Война и мир,1869-01-01,Russian,Russia,Epic novel,1225,Lev Nikolayevich Tolstoy (1828-09-09),Novel;Epic
+Anna Karenina,,1878-01-01,Russian,Russia,,,Lev Nikolayevich Tolstoy (1828-09-09),Novel
+Good Omens,,1990-05-01,English,UK,,,Terry Pratchett (1948-04-28);Neil Gaiman (1960-11-10),Fantasy;Comedy
+'''
+
+JSONL_RECORDS = [
+    {
+        'title': 'The Master and Margarita', 'pub_date': '1967-01-01', 'language': 'Russian', 'country': 'USSR',
+        'authors': [{'first_name': 'Mikhail', 'patronymic': 'Afanasyevich', 'last_name': 'Bulgakov', 'born': '1891-05-15'}],
+        'genres': ['Novel', 'Fantasy'],
+    },
+    {
+        'title': 'Heart of a Dog', 'pub_date': '1987-01-01', 'language': 'Russian', 'country': 'USSR',
+        'authors': [{'first_name': 'Mikhail', 'patronymic': 'Afanasyevich', 'last_name': 'Bulgakov', 'born': '1891-05-15'}],
+        'genres': ['Satire'],
+    },
+]
+
+
+# Local fixtures.
+
+@pytest.fixture
+def csv_catalog(tmp_path):
+    path = tmp_path / 'catalog.csv'
+    path.write_text(CSV_CATALOG, encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def jsonl_catalog(tmp_path):
+    path = tmp_path / 'catalog.jsonl'
+    path.write_text('\n'.join(json.dumps(record) for record in JSONL_RECORDS), encoding='utf-8')
+    return str(path)
+
+
+def import_catalog(path, **options):
+    call_command('import_catalog', path, stdout=StringIO(), **options)
+
+
+class CopyCursor:
+    """
+    Cursor recording statements and COPY data, PostgreSQL isn't available in tests.
+    """
+    def __init__(self):
+        self.statements, self.copied = [], None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def copy_expert(self, sql, file):
+        self.statements.append(sql)
+        self.copied = file.read()
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_csv_catalog_is_imported(csv_catalog):
+    import_catalog(csv_catalog)
+    assert (Book.objects.count(), Author.objects.count(), Genre.objects.count()) == (3, 3, 4)
+
+
+def test_jsonl_catalog_is_imported(jsonl_catalog):
+    import_catalog(jsonl_catalog)
+    assert (Book.objects.count(), Author.objects.count(), Genre.objects.count()) == (2, 1, 3)
+
+
+def test_links_are_imported(csv_catalog):
+    import_catalog(csv_catalog)
+    good_omens = Book.objects.get(title='Good Omens')
+    assert sorted(str(author) for author in good_omens.authors.all()) == ['Neil Gaiman', 'Terry Pratchett']
+
+
+def test_links_keep_file_order(csv_catalog):
+    import_catalog(csv_catalog)
+    good_omens = Book.objects.get(title='Good Omens')
+    links = Book.authors.through.objects.filter(book=good_omens).order_by('pk').select_related('author')
+    assert [str(link.author) for link in links] == ['Terry Pratchett', 'Neil Gaiman']
+    links = Book.genres.through.objects.filter(book=good_omens).order_by('pk').select_related('genre')
+    assert [link.genre.name for link in links] == ['Fantasy', 'Comedy']
+
+
+def test_patronymic_is_parsed(csv_catalog):
+    import_catalog(csv_catalog)
+    assert Author.objects.get(last_name='Tolstoy').patronymic == 'Nikolayevich'
+
+
+def test_slug_is_generated(csv_catalog):
+    import_catalog(csv_catalog)
+    assert Book.objects.get(title='War and Peace').slug == 'war-and-peace'
+
+
+def test_non_latin_titles_get_url_slugs(tmp_path):
+    path = tmp_path / 'catalog.csv'
+    path.write_text(
+        'title,pub_date,authors,genres\nВойна и мир,1869-01-01,,\n!!!,1990-01-01,,\n', encoding='utf-8'
+    )
+    import_catalog(str(path))
+    assert Book.objects.get(pub_date='1869-01-01').slug == 'война-и-мир'
+    assert Book.objects.get(title='!!!').slug == 'book'
+    for book in Book.objects.all():
+        assert book.get_absolute_url()
+
+
+def test_copy_writes_columns_without_database_default():
+    columns = {
+        field.column for field in Book._meta.concrete_fields
+        if not field.primary_key and not field.null and not field.has_default()
+    }
+    assert columns <= set(import_catalog_command.COPY_BOOK_COLUMNS)
+    python_defaults = {field.column for field in Book._meta.concrete_fields if field.has_default()}
+    assert python_defaults <= set(import_catalog_command.COPY_BOOK_COLUMNS)
+
+
+def test_books_are_copied_with_database_values(monkeypatch):
+    cursor = CopyCursor()
+    monkeypatch.setattr(import_catalog_command.connection, 'cursor', lambda: cursor)
+    book = Book(title='War and Peace', pub_date='1869-01-01', pub_year=1869, language='Russian', slug='war-and-peace')
+    import_catalog_command.Command().copy_books([book])
+    row = next(csv.DictReader(StringIO(cursor.copied), fieldnames=import_catalog_command.COPY_BOOK_COLUMNS))
+    assert row['images'] == '{}'
+    assert (row['pub_date'], row['pub_year'], row['pages'], row['num_reviews']) == ('1869-01-01', '1869', '', '0')
+    assert cursor.statements[1].startswith('COPY import_book (title, ')
+    assert 'INSERT INTO book_review_book' in cursor.statements[2]
+
+
+def test_repeated_import_doesnt_duplicate_rows(csv_catalog):
+    import_catalog(csv_catalog, batch_size=2)
+    import_catalog(csv_catalog, batch_size=2)
+    assert (Book.objects.count(), Author.objects.count(), Book.authors.through.objects.count()) == (3, 3, 4)
+
+
+def test_imported_books_are_searchable(csv_catalog):
+    import_catalog(csv_catalog)
+    assert search('Tolstoy', 'author').count() == 2
+
+
+def test_number_of_queries_doesnt_depend_on_batch_size(tmp_path, django_assert_max_num_queries):
+    path = tmp_path / 'catalog.jsonl'
+    path.write_text('\n'.join(
+        json.dumps(dict(JSONL_RECORDS[0], title='Book {0}'.format(i))) for i in range(200)
+    ), encoding='utf-8')
+    # SQLite limits number of query parameters, so Django splits inserts of 200 books into 4 queries.
+    with django_assert_max_num_queries(21):
+        import_catalog(str(path), batch_size=200)
+
+
+def test_invalid_record_reports_line_number(tmp_path):
+    path = tmp_path / 'catalog.csv'
+    path.write_text(CSV_CATALOG + 'No date book,,,English,UK,,,,\n', encoding='utf-8')
+    with pytest.raises(CommandError, match='Line 5'):
+        import_catalog(str(path))
@@ -0,0 +1,39 @@
+import pytest
+
+from io import StringIO
+from django.core.management import call_command
+from mixer.backend.django import mixer
+from book_review.models import Book, Review
+
+
+# Local fixtures.
+
+@pytest.fixture
+def drifted_book():
+    book = mixer.blend(Book)
+    mixer.cycle(3).blend(Review, book=book, rating=4)
+    Book.objects.filter(pk=book.pk).update(num_reviews=10, rating_sum=1, avg_rating=0.1)
+    return book
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_drift_is_reported(drifted_book):
+    out = StringIO()
+    call_command('rebuild_book_ratings', stdout=out)
+    assert 'id={0}'.format(drifted_book.pk) in out.getvalue()
+
+
+def test_aggregates_are_rebuilt(drifted_book):
+    call_command('rebuild_book_ratings', stdout=StringIO())
+    drifted_book.refresh_from_db()
+    assert (drifted_book.num_reviews, drifted_book.rating_sum, drifted_book.avg_rating) == (3, 12, 4)
+
+
+def test_check_option_doesnt_change_aggregates(drifted_book):
+    call_command('rebuild_book_ratings', '--check', stdout=StringIO())
+    drifted_book.refresh_from_db()
+    assert drifted_book.num_reviews == 10
@@ -0,0 +1,23 @@
+import pytest
+
+from io import StringIO
+from django.core.management import call_command
+from book_review.custom import jobs
+from book_review.models import Job
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_burst_workers_run_due_jobs_and_exit(monkeypatch):
+    calls = []
+    monkeypatch.setitem(jobs.JOBS, 'record', lambda **kwargs: calls.append(kwargs))
+    jobs.enqueue('record', number=1)
+    jobs.enqueue('record', number=2)
+    out = StringIO()
+    call_command('run_workers', burst=True, stdout=out)
+    assert calls == [{'number': 1}, {'number': 2}]
+    assert 'Processed 2 job(s).' in out.getvalue()
+    assert not Job.objects.exclude(status=Job.DONE).exists()
@@ -0,0 +1,49 @@
+import pytest
+
+from io import StringIO
+from django.core.management import call_command
+from book_review.custom.ratings import get_drifted_books
+from book_review.models import Author, Book, BookSearchDocument, Review
+
+
+# Local fixtures.
+
+@pytest.fixture
+def seeded_catalog():
+    call_command('seed_catalog', books=60, authors=20, reviews=300, reviews_per_user=10, stdout=StringIO())
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_requested_number_of_rows_is_created(seeded_catalog):
+    assert (Book.objects.count(), Author.objects.count()) == (60, 20)
+
+
+def test_reviews_are_created(seeded_catalog):
+    assert 0 < Review.objects.count() <= 300
+
+
+def test_book_aggregates_match_reviews(seeded_catalog):
+    assert not get_drifted_books().exists()
+
+
+def test_every_book_has_search_document(seeded_catalog):
+    assert BookSearchDocument.objects.count() == 60
+
+
+def test_same_seed_gives_same_catalog():
+    call_command('seed_catalog', books=10, authors=5, reviews=0, seed=1, stdout=StringIO())
+    first_titles = list(Book.objects.order_by('pk').values_list('title', 'pub_date'))
+    Book.objects.all().delete()
+    Author.objects.all().delete()
+    call_command('seed_catalog', books=10, authors=5, reviews=0, seed=1, stdout=StringIO())
+    assert list(Book.objects.order_by('pk').values_list('title', 'pub_date')) == first_titles
+
+
+def test_benchmark_reports_every_view(seeded_catalog, tmp_path):
+    out, json_path = StringIO(), tmp_path / 'benchmark.json'
+    call_command('benchmark_views', repeat=1, json_path=str(json_path), stdout=out)
+    assert 'search any' in out.getvalue() and json_path.exists()
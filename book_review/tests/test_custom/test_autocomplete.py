@@ -0,0 +1,160 @@
+import pytest
+
+from mixer.backend.django import mixer
+from book_review.custom import autocomplete
+from book_review.custom.autocomplete import AutocompleteIndex, Suggestion, autocomplete_index
+from book_review.custom.constants import AUTOCOMPLETE_LIMIT
+from book_review.models import Author, Book, Genre
+
+
+# Local fixtures.
+
+@pytest.fixture
+def index():
+    index = AutocompleteIndex()
+    index.build([
+        (Suggestion('book', 1, 'War and Peace', 30, slug='war-and-peace'), ['War and Peace']),
+        (Suggestion('book', 2, 'Warlock', 5, slug='warlock'), ['Warlock']),
+        (Suggestion('book', 3, 'The Cold War', 10, slug='the-cold-war'), ['The Cold War']),
+        (Suggestion('author', 1, 'Leo Nikolayevich Tolstoy', 40), ['Leo Nikolayevich Tolstoy', 'Leo Tolstoy']),
+        (Suggestion('genre', 1, 'Warfare', 1), ['Warfare']),
+    ])
+    return index
+
+
+@pytest.fixture
+def loaded_index():
+    """
+    Global index loaded from test database, forgotten after the test.
+    """
+    autocomplete_index.reset()
+    autocomplete_index.refresh()
+    yield autocomplete_index
+    autocomplete_index.reset()
+
+
+def labels(suggestions):
+    return [suggestion.label for suggestion in suggestions]
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+@pytest.mark.parametrize('q', ['war', 'wa', 'w'])
+def test_lookup_orders_suggestions_by_weight(index, q):
+    assert labels(index.lookup(q)) == ['War and Peace', 'The Cold War', 'Warlock', 'Warfare']
+
+
+def test_lookup_matches_any_word_start(index):
+    assert labels(index.lookup('peac')) == ['War and Peace']
+    assert labels(index.lookup('and peace')) == ['War and Peace']
+    assert index.lookup('eace') == []
+
+
+def test_lookup_matches_author_full_and_short_names(index):
+    assert labels(index.lookup('leo tol')) == ['Leo Nikolayevich Tolstoy']
+    assert labels(index.lookup('leo nik')) == ['Leo Nikolayevich Tolstoy']
+    assert labels(index.lookup('tolst')) == ['Leo Nikolayevich Tolstoy']
+
+
+def test_lookup_filters_kinds_and_limits_results(index):
+    assert labels(index.lookup('war', kinds=['genre'])) == ['Warfare']
+    assert labels(index.lookup('w', limit=2)) == ['War and Peace', 'The Cold War']
+    assert index.lookup('   ') == []
+
+
+def test_put_replaces_suggestion(index):
+    index.put(Suggestion('book', 2, 'Peacelock', 50, slug='peacelock'), ['Peacelock'])
+    assert labels(index.lookup('war')) == ['War and Peace', 'The Cold War', 'Warfare']
+    assert labels(index.lookup('peac')) == ['Peacelock', 'War and Peace']
+    assert labels(index.lookup('p')) == ['Peacelock', 'War and Peace']
+
+
+def test_put_with_lower_weight_moves_suggestion_down(index):
+    index.put(Suggestion('book', 1, 'War and Peace', 1, slug='war-and-peace'), ['War and Peace'])
+    assert labels(index.lookup('wa')) == ['The Cold War', 'Warlock', 'War and Peace', 'Warfare']
+
+
+def test_top_list_is_refilled_when_suggestion_leaves_it():
+    index = AutocompleteIndex()
+    index.build([
+        (Suggestion('book', pk, 'Book {0}'.format(pk), pk), ['Book {0}'.format(pk)])
+        for pk in range(AUTOCOMPLETE_LIMIT + 5)
+    ])
+    best = index.lookup('b')[0]
+    index.remove('book', best.pk)
+    suggestions = index.lookup('b')
+    assert best.label not in labels(suggestions)
+    assert len(suggestions) == AUTOCOMPLETE_LIMIT
+
+
+def test_crowded_long_prefixes_are_precomputed(monkeypatch):
+    monkeypatch.setattr(autocomplete, 'AUTOCOMPLETE_SCAN_LIMIT', 2)
+    index = AutocompleteIndex()
+    index.build([
+        (Suggestion('book', pk, 'Animal {0}'.format(pk), pk), ['Animal {0}'.format(pk)]) for pk in range(5)
+    ] + [(Suggestion('book', 5, 'Anime', 100), ['Anime'])])
+    assert {'anim', 'anima', 'animal'} <= index.crowded
+    assert 'anime' not in index.crowded
+    assert labels(index.lookup('anima')) == ['Animal 4', 'Animal 3', 'Animal 2', 'Animal 1', 'Animal 0']
+
+    index.put(Suggestion('book', 6, 'Animal 6', 50), ['Animal 6'])
+    assert labels(index.lookup('animal', limit=2)) == ['Animal 6', 'Animal 4']
+    assert labels(index.lookup('anim', limit=2)) == ['Anime', 'Animal 6']
+
+
+def test_remove_forgets_suggestion(index):
+    index.remove('author', 1)
+    assert index.lookup('leo') == []
+    assert index.lookup('tolstoy') == []
+
+
+def test_suggestion_urls(index):
+    book, author = index.lookup('war and')[0], index.lookup('leo')[0]
+    assert book.as_dict()['url'] == '/book/1-war-and-peace/'
+    assert author.as_dict()['url'] == '/search/?q=Leo+Nikolayevich+Tolstoy&category=author'
+
+
+def test_index_is_loaded_from_database():
+    book = mixer.blend(Book, title='Anna Karenina', num_reviews=3)
+    author = mixer.blend(Author, first_name='Leo', patronymic='', last_name='Tolstoy')
+    genre = mixer.blend(Genre, name='Novel')
+    book.authors.add(author)
+    book.genres.add(genre)
+
+    index = AutocompleteIndex()
+    index.load()
+    assert [(s.kind, s.label, s.weight) for s in index.lookup('anna')] == [('book', 'Anna Karenina', 3)]
+    assert [(s.kind, s.label, s.weight) for s in index.lookup('leo')] == [('author', 'Leo Tolstoy', 3)]
+    assert [(s.kind, s.label, s.weight) for s in index.lookup('nov')] == [('genre', 'Novel', 3)]
+
+
+def test_saved_and_deleted_objects_change_loaded_index(loaded_index, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        book = mixer.blend(Book, title='Anna Karenina')
+    assert labels(loaded_index.lookup('karen')) == ['Anna Karenina']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        book.title = 'Resurrection'
+        book.save()
+    assert loaded_index.lookup('karen') == []
+    assert labels(loaded_index.lookup('resur')) == ['Resurrection']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        book.delete()
+    assert loaded_index.lookup('resur') == []
+
+
+def test_changes_made_by_this_process_do_not_reload_index(loaded_index, django_capture_on_commit_callbacks):
+    generation = loaded_index.generation
+    with django_capture_on_commit_callbacks(execute=True):
+        mixer.blend(Genre, name='Novel')
+    assert loaded_index.generation == generation + 1
+
+
+def test_rolled_back_changes_are_not_applied(loaded_index, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=False):
+        mixer.blend(Genre, name='Novel')
+    assert loaded_index.lookup('nov') == []
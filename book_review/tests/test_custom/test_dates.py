@@ -0,0 +1,51 @@
+import pytest
+import datetime
+
+import pytz
+from django.utils import timezone
+from book_review.custom import dates
+
+
+# Local fixtures.
+
+@pytest.fixture(autouse=True)
+def reset_today(monkeypatch):
+    # Cached date is restored after each test, so other tests see real date.
+    monkeypatch.setattr(dates, '_today', None)
+    monkeypatch.setattr(dates, '_next_midnight', None)
+
+
+# Tests.
+
+def set_now(monkeypatch, now):
+    monkeypatch.setattr(dates.timezone, 'now', lambda: now)
+
+
+def test_today_is_date_in_time_zone(monkeypatch):
+    # 22:00 UTC is already next day in Moscow.
+    set_now(monkeypatch, datetime.datetime(2021, 1, 1, 22, 0, tzinfo=pytz.utc))
+    assert dates.get_today() == datetime.date(2021, 1, 2)
+
+
+def test_today_rolls_over_at_midnight_in_time_zone(monkeypatch):
+    moscow = timezone.get_current_timezone()
+    set_now(monkeypatch, moscow.localize(datetime.datetime(2021, 1, 1, 23, 59)))
+    assert dates.get_today() == datetime.date(2021, 1, 1)
+    set_now(monkeypatch, moscow.localize(datetime.datetime(2021, 1, 2, 0, 0)))
+    assert dates.get_today() == datetime.date(2021, 1, 2)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('1869', (1869, 1869)),
+    (' 19 ', (19, 19)),
+    ('1950-1960', (1950, 1960)),
+    ('1950 – 1960', (1950, 1960)),
+    ('1860s', (1860, 1869)),
+    ('1960-1950', None),
+    ('0', None),
+    ('1984 Orwell', None),
+    ('', None),
+    (None, None),
+])
+def test_year_range_is_parsed(text, expected):
+    assert dates.parse_year_range(text) == expected
@@ -0,0 +1,102 @@
+import io
+import pytest
+
+from PIL import Image
+from mixer.backend.django import mixer
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from book_review.custom.constants import BOOK_IMAGE_WIDTHS
+from book_review.custom.jobs import run_queued_jobs
+from book_review.models import Book
+
+
+# Local fixtures.
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+def make_upload(width=800, height=1200, color='red', name='cover.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def blend_book_with_cover(**kwargs):
+    # Derivatives are built by background job.
+    book = mixer.blend(Book, full_img=make_upload(**kwargs))
+    run_queued_jobs()
+    book.refresh_from_db()
+    return book
+
+
+@pytest.fixture
+def book_with_cover():
+    return blend_book_with_cover()
+
+
+def render_picture(book):
+    return Template('{% load custom_tags %}{% book_picture book %}').render(Context({'book': book}))
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_derivatives_are_built_after_upload(book_with_cover):
+    formats = Book.objects.get(pk=book_with_cover.pk).images['formats']
+    assert [image_format['type'] for image_format in formats] == ['image/webp', 'image/jpeg']
+    for image_format in formats:
+        assert [image['width'] for image in image_format['images']] == BOOK_IMAGE_WIDTHS
+
+
+def test_derivatives_keep_aspect_ratio(media_root, book_with_cover):
+    for image in book_with_cover.images['formats'][0]['images']:
+        assert image['height'] == image['width'] * 3 // 2
+        with Image.open(media_root / image['name']) as derivative:
+            assert derivative.size == (image['width'], image['height'])
+
+
+def test_derivatives_are_not_upscaled():
+    book = blend_book_with_cover(width=300, height=300)
+    widths = [image['width'] for image in book.images['formats'][0]['images']]
+    assert widths == [184, 300]
+
+
+def test_derivative_names_contain_content_hash(book_with_cover):
+    other_book = blend_book_with_cover(name='other.png')
+    different_book = blend_book_with_cover(color='blue')
+    assert other_book.images['formats'] == book_with_cover.images['formats']
+    assert different_book.images['formats'] != book_with_cover.images['formats']
+
+
+def test_book_without_new_upload_keeps_derivatives(book_with_cover):
+    images = book_with_cover.images
+    book_with_cover.title = 'New title'
+    book_with_cover.save()
+    assert Book.objects.get(pk=book_with_cover.pk).images == images
+
+
+def test_picture_contains_srcsets_and_dimensions(book_with_cover):
+    html = render_picture(book_with_cover)
+    assert '<source type="image/webp"' in html
+    assert html.count(' 184w') == 2
+    assert 'loading="lazy"' in html
+    assert 'width="184" height="276"' in html
+
+
+def test_picture_without_derivatives_uses_original_image():
+    book = mixer.blend(Book)
+    html = render_picture(book)
+    assert 'src="{0}"'.format(book.full_img.url) in html
+    assert '<source' not in html
+
+
+def test_command_builds_missing_derivatives(book_with_cover):
+    Book.objects.update(images={})
+    call_command('build_book_images', stdout=io.StringIO())
+    assert Book.objects.get(pk=book_with_cover.pk).images['source'] == book_with_cover.full_img.name
@@ -0,0 +1,122 @@
+import datetime
+import pytest
+
+from mixer.backend.django import mixer
+from django.utils import timezone
+from book_review.custom import jobs
+from book_review.custom.constants import JOB_MAX_RETRY_DELAY, JOB_RETRY_DELAY
+from book_review.models import Job, Review
+
+
+# Local fixtures.
+
+@pytest.fixture
+def calls(monkeypatch):
+    """
+    Registers 'record' job appending its arguments to returned list and 'fail' job always raising error.
+    """
+    calls = []
+
+    def fail(**kwargs):
+        raise RuntimeError('Job failed.')
+
+    monkeypatch.setitem(jobs.JOBS, 'record', lambda **kwargs: calls.append(kwargs))
+    monkeypatch.setitem(jobs.JOBS, 'fail', fail)
+    return calls
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_enqueued_job_is_run_with_its_arguments(calls):
+    job = jobs.enqueue('record', book_id=1)
+    assert jobs.run_queued_jobs() == 1
+    assert calls == [{'book_id': 1}]
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.DONE, 1)
+
+
+def test_unknown_job_is_not_enqueued():
+    with pytest.raises(ValueError):
+        jobs.enqueue('unknown')
+
+
+def test_queued_job_with_same_dedup_key_is_not_enqueued(calls):
+    assert jobs.enqueue('record', dedup_key='key', book_id=1)
+    assert jobs.enqueue('record', dedup_key='key', book_id=1) is None
+    jobs.run_queued_jobs()
+    assert len(calls) == 1
+
+
+def test_job_with_same_dedup_key_is_enqueued_after_run(calls):
+    jobs.enqueue('record', dedup_key='key')
+    jobs.run_queued_jobs()
+    assert jobs.enqueue('record', dedup_key='key')
+
+
+def test_delayed_job_is_not_run_before_time(calls):
+    jobs.enqueue('record', delay=60)
+    assert jobs.run_queued_jobs() == 0
+
+
+def test_failed_job_is_retried_with_backoff(calls):
+    job = jobs.enqueue('fail')
+    jobs.run_queued_jobs()
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.QUEUED, 1)
+    assert 'Job failed.' in job.last_error
+    assert job.run_at > timezone.now() + datetime.timedelta(seconds=JOB_RETRY_DELAY - 1)
+
+
+def test_job_fails_when_attempts_are_exhausted(calls):
+    job = jobs.enqueue('fail')
+    for _ in range(job.max_attempts):
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        jobs.run_queued_jobs()
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.FAILED, job.max_attempts)
+
+
+@pytest.mark.parametrize('attempts, delay', [
+    (1, JOB_RETRY_DELAY),
+    (2, JOB_RETRY_DELAY * 2),
+    (3, JOB_RETRY_DELAY * 4),
+    (100, JOB_MAX_RETRY_DELAY),
+])
+def test_retry_delay_grows_exponentially(attempts, delay):
+    assert jobs.get_retry_delay(attempts) == delay
+
+
+def test_claimed_job_is_not_claimed_again(calls):
+    jobs.enqueue('record')
+    assert jobs.claim_job('first')
+    assert jobs.claim_job('second') is None
+
+
+def test_stale_running_job_is_queued_again(calls):
+    job = jobs.enqueue('record')
+    jobs.claim_job('lost')
+    Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - datetime.timedelta(hours=1))
+    assert jobs.requeue_stale_jobs(timeout=60) == 1
+    jobs.run_queued_jobs()
+    assert calls == [{}]
+
+
+def test_review_change_enqueues_cache_warming(settings, calls):
+    settings.WARM_VIEW_CACHE = True
+    review = mixer.blend(Review)
+    assert Job.objects.filter(name='warm_book_views', kwargs={'book_id': review.book_id}).exists()
+    assert jobs.run_queued_jobs() == 1
+
+
+def test_warmed_book_page_is_served_from_cache(client, django_assert_num_queries):
+    review = mixer.blend(Review)
+    book = review.book
+    jobs.JOBS['warm_book_views'](book_id=book.pk)
+    with django_assert_num_queries(0):
+        response = client.get(book.get_absolute_url())
+    assert response.status_code == 200
+    assert book.title in response.content.decode()
+
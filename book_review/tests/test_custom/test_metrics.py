@@ -0,0 +1,61 @@
+import pytest
+
+from book_review.custom.metrics import Histogram, MetricsRegistry, RequestMetrics, request_metrics, timed_tag
+
+
+# Local fixtures.
+
+@timed_tag
+def tag(value):
+    return value
+
+
+# Tests.
+
+def test_histogram_counts_values_up_to_bucket_bound():
+    histogram = Histogram(buckets=(0.1, 1))
+    for value in [0.05, 0.1, 0.5, 2]:
+        histogram.observe(value)
+    assert list(histogram.get_cumulative_counts()) == [2, 3, 4]
+    assert histogram.sum == pytest.approx(2.65)
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    state = RequestMetrics()
+    state.template_seconds = 0.02
+    state.templates['books/book_card.html'].observe(0.004)
+    state.templates['books/book_card.html'].observe(0.006)
+    registry.record_request('book_review:index', 'GET', 0.03, queries=3, query_seconds=0.01, state=state)
+    registry.record_request(None, 'GET', 2)
+
+    lines = registry.render().splitlines()
+    assert '# TYPE book_review_request_duration_seconds histogram' in lines
+    assert 'book_review_request_duration_seconds_bucket{view="book_review:index",method="GET",le="0.025"} 0' in lines
+    assert 'book_review_request_duration_seconds_bucket{view="book_review:index",method="GET",le="0.05"} 1' in lines
+    assert 'book_review_request_duration_seconds_bucket{view="unresolved",method="GET",le="+Inf"} 1' in lines
+    assert 'book_review_request_queries_sum{view="book_review:index"} 3' in lines
+    assert 'book_review_request_template_seconds_sum{view="unresolved"} 0' not in lines
+    assert 'book_review_template_render_seconds_count{template="books/book_card.html"} 2' in lines
+    assert 'book_review_template_render_seconds_sum{template="books/book_card.html"} 0.01' in lines
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.record_request('view "quoted"\\', 'GET', 0.01)
+    assert 'book_review_request_queries_count{view="view \\"quoted\\"\\\\"} 1' in registry.render().splitlines()
+
+
+def test_unknown_methods_share_label():
+    registry = MetricsRegistry()
+    for method in ['PROPFIND', 'FOO', 'get', 'POST']:
+        registry.record_request('book_review:index', method, 0.01)
+    assert sorted(method for view_name, method in registry.latency) == ['POST', 'other']
+
+
+def test_tags_are_timed_only_within_request():
+    assert tag(1) == 1
+    with request_metrics() as state:
+        assert tag(2) == 2
+        assert tag(3) == 3
+    assert state.tags['tag'].count == 2
@@ -0,0 +1,94 @@
+import pytest
+
+from book_review.custom import search_cache
+from book_review.custom.search_cache import TOO_MANY_RESULTS, SearchResultsCache, get_search_key
+
+
+# Local fixtures.
+
+@pytest.fixture
+def results_cache():
+    return SearchResultsCache(max_ids=5, max_results=3, timeout=60, check_interval=60)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Returns list with current monotonic time, which is changed by tests.
+    """
+    now = [1000.0]
+    monkeypatch.setattr(search_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def cache_ids(results_cache, key, ids):
+    results_cache.set(key, ids, results_cache.get_generation())
+
+
+# Tests.
+
+def test_key_ignores_case_and_extra_whitespace():
+    assert get_search_key('  War  and PEACE ', 'book') == get_search_key('war and peace', 'book')
+    assert get_search_key('war', 'book') != get_search_key('war', 'genre')
+
+
+def test_hits_and_misses_are_counted(results_cache):
+    assert results_cache.get('a') is None
+    cache_ids(results_cache, 'a', [3, 1, 2])
+    assert list(results_cache.get('a')) == [3, 1, 2]
+    stats = results_cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['entries'], stats['ids']) == (1, 1, 1, 3)
+
+
+def test_least_recently_used_results_are_evicted(results_cache):
+    cache_ids(results_cache, 'a', [1, 2])
+    cache_ids(results_cache, 'b', [3, 4])
+    results_cache.get('a')
+    cache_ids(results_cache, 'c', [5])
+    cache_ids(results_cache, 'd', [6])
+    assert results_cache.get('b') is None
+    assert results_cache.get('a') is not None
+    assert results_cache.get_stats()['evictions'] == 1
+    assert results_cache.size <= results_cache.max_ids
+
+
+def test_too_long_results_are_cached_as_marker(results_cache):
+    cache_ids(results_cache, 'a', [1, 2, 3, 4])
+    assert results_cache.get('a') is TOO_MANY_RESULTS
+    assert results_cache.size == 0
+
+
+def test_results_expire(results_cache, clock):
+    cache_ids(results_cache, 'a', [1])
+    clock[0] += 59
+    assert results_cache.get('a') is not None
+    clock[0] += 2
+    assert results_cache.get('a') is None
+    assert results_cache.get_stats()['ids'] == 0
+
+
+@pytest.mark.django_db
+def test_invalidation_drops_results_after_commit(results_cache, django_capture_on_commit_callbacks):
+    cache_ids(results_cache, 'a', [1])
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        results_cache.invalidate()
+    assert results_cache.get('a') is not None
+    callbacks[0]()
+    assert results_cache.get('a') is None
+
+
+@pytest.mark.django_db
+def test_results_computed_before_invalidation_are_not_cached(results_cache, django_capture_on_commit_callbacks):
+    generation = results_cache.get_generation()
+    with django_capture_on_commit_callbacks(execute=True):
+        results_cache.invalidate()
+    results_cache.set('a', [1], generation)
+    assert results_cache.get('a') is None
+
+
+def test_changes_of_other_processes_are_noticed(results_cache, clock):
+    cache_ids(results_cache, 'a', [1])
+    search_cache.bump_generations([search_cache.SEARCH_RESULTS_GENERATION])
+    assert results_cache.get('a') is not None
+    clock[0] += 60
+    assert results_cache.get('a') is None
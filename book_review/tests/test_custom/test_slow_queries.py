@@ -0,0 +1,43 @@
+import pytest
+
+from book_review.custom.slow_queries import SlowQuery, SlowQueryLog, explain, get_call_site
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_log_keeps_slowest_distinct_statements():
+    log = SlowQueryLog(size=2)
+    assert log.add(SlowQuery('SELECT 1', [], 0.2))
+    assert log.add(SlowQuery('SELECT 2', [], 0.1))
+    assert not log.add(SlowQuery('SELECT 3', [], 0.05))
+    assert log.add(SlowQuery('SELECT 4', [], 0.3))
+    assert [query.sql for query in log.get_entries()] == ['SELECT 4', 'SELECT 1']
+
+
+def test_statement_keeps_its_slowest_execution_and_plan():
+    log = SlowQueryLog()
+    log.add(SlowQuery('SELECT %s', [1], 0.2))
+    log.get_entries()[0].plan = 'SCAN'
+    assert not log.add(SlowQuery('SELECT %s', [2], 0.1))
+    assert not log.add(SlowQuery('SELECT %s', [3], 0.3))
+    query = log.get_entries()[0]
+    assert (query.params, query.count, query.plan) == ('(3,)', 3, 'SCAN')
+
+
+def test_long_parameters_are_shortened():
+    query = SlowQuery('SELECT %s', [list(range(10000))], 0.1)
+    assert len(query.params) < 1100
+    assert query.params.endswith('...')
+
+
+def test_select_is_explained():
+    plan = explain('default', 'SELECT id FROM book_review_book WHERE title = %s', ['War and Peace'])
+    assert 'book_review_book' in plan
+    assert explain('default', 'UPDATE book_review_book SET title = %s', ['War and Peace']) is None
+
+
+def test_call_site_is_innermost_project_frame():
+    assert get_call_site().startswith('book_review/tests/test_custom/test_slow_queries.py:')
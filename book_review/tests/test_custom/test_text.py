@@ -0,0 +1,26 @@
+import pytest
+
+from book_review.custom.text import get_query_tokens, get_similarity, get_trigrams, normalize
+
+
+# Tests.
+
+def test_query_tokens_contain_letters_and_digits_only():
+    assert get_query_tokens('"War" AND peace* 1869') == ['war', 'and', 'peace', '1869']
+
+
+def test_normalize_strips_case_accents_and_punctuation():
+    assert normalize('Les Misérables: Fantine!') == ['les', 'miserables', 'fantine']
+
+
+def test_trigrams_are_padded():
+    assert get_trigrams('leo') == {'  l', ' le', 'leo', 'eo '}
+
+
+@pytest.mark.parametrize('word, other_word, similarity', [
+    ('tolstoy', 'tolstoy', 1.0),
+    ('tolstoi', 'tolstoy', 0.6),
+    ('war', 'peace', 0.0),
+])
+def test_similarity_is_share_of_common_trigrams(word, other_word, similarity):
+    assert get_similarity(get_trigrams(word), get_trigrams(other_word)) == pytest.approx(similarity)
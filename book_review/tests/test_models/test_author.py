@@ -84,3 +84,18 @@ def test_born_field_max_value_validator(days):
     author = Author.objects.create(born=future_date)
     with pytest.raises(ValidationError):
         author.full_clean()
+
+
+def test_search_key_contains_full_and_short_names(full_name_author):
+    assert full_name_author.search_key == 'john jonah jameson/john jameson'
+
+
+def test_search_key_without_patronymic_is_short_name(short_name_author):
+    assert short_name_author.search_key == 'peter parker'
+
+
+def test_search_key_is_accent_folded_and_follows_name_changes(full_name_author):
+    full_name_author.first_name, full_name_author.patronymic = 'Jóhn', ''
+    full_name_author.save()
+    full_name_author.refresh_from_db()
+    assert full_name_author.search_key == 'john jameson'
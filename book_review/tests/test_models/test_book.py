@@ -4,7 +4,7 @@ import datetime
 from django.urls import reverse
 from mixer.backend.django import mixer
 from django.db.utils import IntegrityError
-from book_review.models import Book
+from book_review.models import Book, Review
 
 
 # Constants.
@@ -89,3 +89,22 @@ def test_get_absolute_url(published_book):
 
 def test_str_representation(published_book):
     assert str(published_book) == BOOK_DATA.get('title')
+
+
+def test_pub_year_follows_pub_date(published_book):
+    assert published_book.pub_year == BOOK_DATA['pub_date'].year
+    published_book.pub_date = datetime.date(1869, 1, 1)
+    published_book.save()
+    published_book.refresh_from_db()
+    assert published_book.pub_year == 1869
+
+
+def test_saving_stale_book_keeps_review_aggregates(published_book):
+    stale_book = Book.objects.get(pk=published_book.pk)
+    mixer.blend(Review, book=published_book, rating=8)
+    stale_book.title = 'new title'
+    stale_book.save()
+    stale_book.refresh_from_db()
+    assert stale_book.title == 'new title'
+    assert (stale_book.num_reviews, stale_book.rating_sum, stale_book.avg_rating) == (1, 8, 8.0)
+
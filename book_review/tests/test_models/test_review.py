@@ -3,7 +3,7 @@ import pytest
 from django.db.utils import IntegrityError
 from mixer.backend.django import mixer
 from django.contrib.auth.models import User
-from book_review.models import Book, Review
+from book_review.models import Book, Review, ReviewVersionConflict
 
 
 # Local fixtures.
@@ -37,3 +37,69 @@ def test_review_unique_together_constraint():
 
 def test_str_representation(review):
     assert str(review) == review.title
+
+
+def test_new_review_updates_book_aggregates():
+    book = mixer.blend(Book)
+    mixer.blend(Review, book=book, rating=5)
+    mixer.blend(Review, book=book, rating=2)
+    book.refresh_from_db()
+    assert (book.num_reviews, book.rating_sum, book.avg_rating) == (2, 7, 3.5)
+
+
+def test_changed_review_rating_updates_book_aggregates(review):
+    review = Review.objects.get(pk=review.pk)
+    review.rating = 1
+    review.save()
+    review.book.refresh_from_db()
+    assert (review.book.num_reviews, review.book.avg_rating) == (1, 1)
+
+
+def test_moved_review_updates_both_books_aggregates(review):
+    old_book, new_book = review.book, mixer.blend(Book)
+    review = Review.objects.get(pk=review.pk)
+    review.book = new_book
+    review.save()
+    old_book.refresh_from_db()
+    new_book.refresh_from_db()
+    assert (old_book.num_reviews, new_book.num_reviews) == (0, 1)
+
+
+def test_deleted_review_updates_book_aggregates(review):
+    Review.objects.get(pk=review.pk).delete()
+    review.book.refresh_from_db()
+    assert (review.book.num_reviews, review.book.rating_sum, review.book.avg_rating) == (0, 0, 0)
+
+
+def test_review_update_increments_version(review):
+    review.title = 'Changed title'
+    review.save()
+    assert review.version == Review.objects.get(pk=review.pk).version == 1
+
+
+def test_stale_review_is_not_saved(review):
+    stale_review = Review.objects.get(pk=review.pk)
+    review.title = 'First change'
+    review.save()
+    stale_review.title = 'Second change'
+    with pytest.raises(ReviewVersionConflict):
+        stale_review.save(expected_version=stale_review.version)
+    assert Review.objects.get(pk=review.pk).title == 'First change'
+
+
+def test_review_without_expected_version_is_saved_anyway(review):
+    stale_review = Review.objects.get(pk=review.pk)
+    review.save()
+    stale_review.title = 'Second change'
+    stale_review.save()
+    assert Review.objects.get(pk=review.pk).title == 'Second change'
+
+
+def test_review_with_unused_pk_is_inserted(review):
+    pk = review.pk
+    review.delete()
+    Review(pk=pk, book=review.book, owner=review.owner, title='Restored', text='Text', rating=3).save()
+    restored = Review.objects.get(pk=pk)
+    assert (restored.title, restored.version) == ('Restored', 0)
+    review.book.refresh_from_db()
+    assert review.book.num_reviews == 1
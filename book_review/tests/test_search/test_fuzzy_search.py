@@ -0,0 +1,123 @@
+import pytest
+import datetime
+
+from mixer.backend.django import mixer
+from book_review.models import Author, Book
+from book_review.custom.fuzzy import FuzzyIndex, fuzzy_index
+from book_review.custom.search import search
+from book_review.custom.search_backends import IcontainsSearchBackend, SQLiteSearchBackend
+
+
+BACKENDS = [IcontainsSearchBackend, SQLiteSearchBackend]
+
+
+# Local fixtures.
+
+@pytest.fixture
+def index():
+    index = FuzzyIndex()
+    index.build([
+        (1, 'War and Peace', 'Lev Nikolayevich Tolstoy'),
+        (2, 'Crime and Punishment', 'Fyodor Mikhailovich Dostoyevsky'),
+        (3, 'The Idiot', 'Fyodor Mikhailovich Dostoyevsky'),
+        (4, 'Peacemaker', ''),
+    ])
+    return index
+
+
+@pytest.fixture
+def war_and_peace():
+    book = mixer.blend(Book, title='War and Peace', pub_date=datetime.date(1869, 1, 1))
+    book.authors.add(mixer.blend(Author, first_name='Lev', patronymic='Nikolayevich', last_name='Tolstoy'))
+    return book
+
+
+@pytest.fixture
+def crime_and_punishment():
+    book = mixer.blend(Book, title='Crime and Punishment', pub_date=datetime.date(1866, 1, 1))
+    book.authors.add(mixer.blend(Author, first_name='Fyodor', patronymic='Mikhailovich', last_name='Dostoyevsky'))
+    return book
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+@pytest.mark.parametrize('q, fields, expected', [
+    ('Tolstoi', ['authors'], [1]),
+    ('Dostoevsky', ['authors'], [2, 3]),
+    ('crime and punishmnt', ['title'], [2]),
+    ('Dostoevsky', ['title'], []),
+])
+def test_search_finds_similar_words_in_fields(index, q, fields, expected):
+    assert [book_id for book_id, similarity in index.search(q, fields)] == expected
+
+
+def test_search_orders_books_by_similarity(index):
+    results = index.search('Peace', ['title'], threshold=0.3)
+    assert [book_id for book_id, similarity in results] == [1, 4]
+    assert results[0][1] == 1.0 > results[1][1]
+
+
+def test_threshold_excludes_less_similar_words(index):
+    assert index.search('Tolstoi', ['authors'], threshold=0.9) == []
+
+
+def test_put_and_remove_change_documents(index):
+    index.put(1, 'Anna Karenina', 'Lev Tolstoy')
+    assert index.search('Peace', ['title']) == []
+    assert [book_id for book_id, similarity in index.search('Karenin', ['title'])] == [1]
+    index.remove(1)
+    assert index.search('Karenin', ['title']) == []
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('q, category', [
+    ('Dostoevsky', 'author'),
+    ('Crime and Punishmnt', 'book'),
+    ('Fyodor Dostoyevski', 'any'),
+])
+def test_backend_fuzzy_search_finds_misspelled_query(backend, war_and_peace, crime_and_punishment, q, category):
+    assert list(backend().fuzzy_search(q, category)) == [crime_and_punishment]
+
+
+def test_exact_matches_are_ranked_first(war_and_peace, crime_and_punishment):
+    results = SQLiteSearchBackend().fuzzy_search('Tolstoi', 'author', exact_ids=[crime_and_punishment.pk])
+    assert list(results) == [crime_and_punishment, war_and_peace]
+
+
+def test_search_falls_back_to_fuzzy_search(war_and_peace, crime_and_punishment):
+    assert list(search('Tolstoi', 'author')) == [war_and_peace]
+    assert list(search('Dostoevsky', 'any')) == [crime_and_punishment]
+
+
+def test_fuzzy_search_is_not_used_in_other_categories(war_and_peace):
+    mixer.blend(Book, title='Novel', genres=[])
+    assert not search('Tolstoi', 'genre').exists()
+
+
+@pytest.mark.parametrize('number_of_exact_matches, fuzzy_match_found', [(2, True), (3, False)])
+def test_fuzzy_search_is_used_if_exact_search_finds_too_few(crime_and_punishment, number_of_exact_matches,
+                                                            fuzzy_match_found):
+    books = mixer.cycle(number_of_exact_matches).blend(Book, title=mixer.sequence('Punishmnt {0}'))
+    results = list(search('Punishmnt', 'book'))
+    assert results[:number_of_exact_matches] == books
+    assert (crime_and_punishment in results) is fuzzy_match_found
+
+
+def test_fuzzy_search_can_be_disabled(settings, war_and_peace):
+    settings.FUZZY_SEARCH = False
+    assert not search('Tolstoi', 'author').exists()
+
+
+def test_loaded_index_follows_book_changes(war_and_peace, django_capture_on_commit_callbacks):
+    fuzzy_index.refresh()
+    with django_capture_on_commit_callbacks(execute=True):
+        war_and_peace.title = 'Anna Karenina'
+        war_and_peace.save()
+    assert list(search('Anna Karenin', 'book')) == [war_and_peace]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        war_and_peace.delete()
+    assert fuzzy_index.search('Karenina', ['title']) == []
@@ -0,0 +1,120 @@
+import pytest
+import datetime
+
+from mixer.backend.django import mixer
+from book_review.models import Author, Book, Genre
+from book_review.custom.search import search
+from book_review.custom.search_backends import IcontainsSearchBackend, SQLiteSearchBackend
+
+
+BACKENDS = [IcontainsSearchBackend, SQLiteSearchBackend]
+
+
+# Local fixtures.
+
+@pytest.fixture
+def tolstoy():
+    return mixer.blend(Author, first_name='Lev', patronymic='Nikolayevich', last_name='Tolstoy')
+
+
+@pytest.fixture
+def war_and_peace(tolstoy):
+    book = mixer.blend(Book, title='War and Peace', pub_date=datetime.date(1869, 1, 1))
+    book.authors.add(tolstoy, mixer.blend(Author, first_name='Lev', last_name='Tolstoy junior'))
+    book.genres.add(mixer.blend(Genre, name='Novel'))
+    return book
+
+
+@pytest.fixture
+def novel_about_war():
+    book = mixer.blend(Book, title='Novel', pub_date=datetime.date(1929, 1, 1))
+    book.genres.add(mixer.blend(Genre, name='War'))
+    return book
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('q, category', [
+    ('war', 'book'),
+    ('Lev Tolstoy', 'author'),
+    ('Lev Nikolayevich Tolstoy', 'author'),
+    ('novel', 'genre'),
+    ('1869', 'year'),
+    ('peace', 'any'),
+])
+def test_book_is_found_in_category(backend, war_and_peace, q, category):
+    assert list(backend().search(q, category)) == [war_and_peace]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_category_restricts_matched_field(backend, war_and_peace):
+    assert not backend().search('1869', 'book').exists()
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_book_matched_by_several_authors_is_not_duplicated(backend, war_and_peace):
+    assert backend().search('Tolstoy', 'author').count() == 1
+
+
+def test_title_match_is_ranked_above_genre_match(war_and_peace, novel_about_war):
+    assert list(SQLiteSearchBackend().search('war', 'any')) == [war_and_peace, novel_about_war]
+
+
+def test_renamed_author_is_found(war_and_peace, tolstoy):
+    tolstoy.last_name = 'Tolstoi'
+    tolstoy.save()
+    assert list(search('Tolstoi', 'author')) == [war_and_peace]
+
+
+def test_removed_genre_is_not_found(war_and_peace):
+    war_and_peace.genres.clear()
+    assert not search('novel', 'genre').exists()
+
+
+def test_unknown_category_returns_nothing(war_and_peace):
+    assert not search('war', 'unknown').exists()
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('q, found', [
+    ('1869', True),
+    ('1860s', True),
+    ('1850-1870', True),
+    ('18', False),
+    ('86', False),
+])
+def test_year_is_matched_exactly_or_by_range(backend, war_and_peace, q, found):
+    assert list(backend().search(q, 'year')) == ([war_and_peace] if found else [])
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_books_matched_by_text_go_before_books_of_year_in_any_category(backend, war_and_peace):
+    nineteen_eighty_four = mixer.blend(Book, title='1984', pub_date=datetime.date(1949, 6, 8))
+    of_1984 = mixer.blend(Book, title='Neuromancer', pub_date=datetime.date(1984, 7, 1))
+    assert list(backend().search('1984', 'any')) == [nineteen_eighty_four, of_1984]
+
+
+def test_books_matched_by_text_keep_their_rank_before_books_of_year(war_and_peace):
+    title_match = mixer.blend(Book, title='Zoo of 1984', pub_date=datetime.date(2001, 1, 1))
+    genre_match = mixer.blend(Book, title='Ant', pub_date=datetime.date(2002, 1, 1))
+    genre_match.genres.add(mixer.blend(Genre, name='1984 dystopia'))
+    of_1984 = mixer.blend(Book, title='Bee', pub_date=datetime.date(1984, 7, 1))
+    results = list(SQLiteSearchBackend().search('1984', 'any'))
+    assert results == [title_match, genre_match, of_1984]
+    assert results[0].rank > results[1].rank > results[2].rank
+
+
+@pytest.mark.parametrize('q', ['lev  tolstoy', 'LEV NIKOLAYEVICH', 'tolsto', 'Lév Tolstoy'])
+def test_substring_search_matches_normalized_author_names(war_and_peace, q):
+    assert list(IcontainsSearchBackend().search(q, 'author')) == [war_and_peace]
+
+
+def test_substring_search_matches_author_without_patronymic(war_and_peace):
+    book = mixer.blend(Book, title='Anna Karenina')
+    book.authors.add(mixer.blend(Author, first_name='Leo', patronymic='', last_name='Tolstoy'))
+    assert list(IcontainsSearchBackend().search('leo tolstoy', 'author')) == [book]
+    assert list(IcontainsSearchBackend().search('Leo Tolstoy', 'any')) == [book]
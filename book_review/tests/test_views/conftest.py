@@ -2,8 +2,42 @@ import pytest
 import datetime
 
 from mixer.backend.django import mixer
+from django.core.cache import cache
 from django.contrib.auth.models import User
-from book_review.models import Book, Review
+from book_review.models import Author, Book, Genre, Review
+from book_review.custom.constants import QUERY_BUDGETS
+
+
+# Cache fixtures.
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Cached responses must not leak between tests, since database is rolled back after each test.
+    """
+    cache.clear()
+    yield
+    cache.clear()
+
+
+# Query budget fixtures.
+
+@pytest.fixture(autouse=True)
+def strict_query_budget(settings):
+    """
+    Every view test fails if view exceeds its queries budget.
+    """
+    settings.QUERY_BUDGET_STRICT = True
+
+
+@pytest.fixture
+def query_budget(django_assert_max_num_queries):
+    """
+    Returns context manager asserting that view with a given url name stays within its queries budget.
+    """
+    def assert_query_budget(url_name):
+        return django_assert_max_num_queries(QUERY_BUDGETS[url_name])
+    return assert_query_budget
 
 
 # Book fixtures.
@@ -52,3 +86,18 @@ def published_book_reviews(published_book):
 @pytest.fixture
 def published_book_review_owned_by_user(user, published_book):
     return mixer.blend(Review, owner=user, book=published_book)
+
+
+# Author and genre fixtures.
+
+@pytest.fixture
+def books_with_authors_and_genres(published_books, anticipated_books):
+    books = published_books + anticipated_books
+    authors, genres = mixer.cycle(3).blend(Author), mixer.cycle(2).blend(Genre)
+    Book.authors.through.objects.bulk_create([
+        Book.authors.through(book=book, author=author) for book in books for author in authors
+    ])
+    Book.genres.through.objects.bulk_create([
+        Book.genres.through(book=book, genre=genre) for book in books for genre in genres
+    ])
+    return books
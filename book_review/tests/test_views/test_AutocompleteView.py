@@ -0,0 +1,75 @@
+import pytest
+
+from mixer.backend.django import mixer
+from django.urls import reverse
+from book_review.custom.autocomplete import autocomplete_index
+from book_review.custom.constants import AUTOCOMPLETE_LIMIT
+from book_review.models import Book
+
+
+# Local fixtures.
+
+@pytest.fixture(autouse=True)
+def loaded_index(published_books):
+    """
+    Index is loaded from test database before the test, as it is loaded on process start.
+    """
+    autocomplete_index.reset()
+    autocomplete_index.refresh()
+    yield autocomplete_index
+    autocomplete_index.reset()
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_view_returns_suggestions(client):
+    response = client.get(reverse('book_review:autocomplete') + '?q=published_book1')
+    data = response.json()
+    assert response.status_code == 200
+    assert data['q'] == 'published_book1'
+    assert data['suggestions'][0]['kind'] == 'book'
+    assert data['suggestions'][0]['label'].startswith('published_book1')
+
+
+def test_book_suggestion_links_to_book(client, published_book):
+    response = client.get(reverse('book_review:autocomplete') + '?q=' + published_book.title)
+    assert response.json()['suggestions'][0]['url'] == published_book.get_absolute_url()
+
+
+def test_view_does_not_query_database(client, django_assert_num_queries):
+    with django_assert_num_queries(0):
+        client.get(reverse('book_review:autocomplete') + '?q=pub')
+
+
+def test_suggestions_are_ordered_by_number_of_reviews(client, published_books):
+    Book.objects.filter(pk=published_books[7].pk).update(num_reviews=100)
+    autocomplete_index.load()
+    response = client.get(reverse('book_review:autocomplete') + '?q=pub')
+    assert response.json()['suggestions'][0]['label'] == published_books[7].title
+
+
+@pytest.mark.parametrize('limit, expected', [('3', 3), ('1000', AUTOCOMPLETE_LIMIT)])
+def test_number_of_suggestions_is_limited(client, limit, expected):
+    response = client.get(reverse('book_review:autocomplete') + '?q=pub&limit=' + limit)
+    assert len(response.json()['suggestions']) == expected
+
+
+def test_category_filters_suggestions(client):
+    mixer.blend('book_review.Genre', name='Publicistic')
+    autocomplete_index.load()
+    response = client.get(reverse('book_review:autocomplete') + '?q=pub&category=genre')
+    assert [s['label'] for s in response.json()['suggestions']] == ['Publicistic']
+
+
+def test_empty_query_returns_no_suggestions(client):
+    response = client.get(reverse('book_review:autocomplete'))
+    assert response.json()['suggestions'] == []
+
+
+@pytest.mark.parametrize('arguments', ['category=year', 'limit=abc'])
+def test_invalid_arguments_not_found(client, arguments):
+    response = client.get(reverse('book_review:autocomplete') + '?q=pub&' + arguments)
+    assert response.status_code == 404
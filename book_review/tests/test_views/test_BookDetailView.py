@@ -1,4 +1,10 @@
 import pytest
+import datetime
+
+from mixer.backend.django import mixer
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from book_review.models import Review
 from book_review.custom.constants import REVIEWS_PER_PAGE
 
 
@@ -49,3 +55,25 @@ def test_book_reviews_are_sent_to_template(client, published_book, published_boo
     url = published_book.get_absolute_url()
     response = client.get(url)
     assert response.context.get('paginator').count == len(published_book_reviews)
+
+
+def test_user_review_is_pinned_on_top(client, user, published_book, published_book_reviews):
+    old_review = mixer.blend(Review, book=published_book, owner=user)
+    Review.objects.filter(pk=old_review.pk).update(pub_date=datetime.date(2000, 1, 1))
+    client.force_login(user)
+    response = client.get(published_book.get_absolute_url())
+    assert response.context.get('page_obj')[0] == old_review
+
+
+def test_user_review_is_not_repeated_on_next_pages(client, user, published_book, published_book_reviews):
+    review = mixer.blend(Review, book=published_book, owner=user)
+    client.force_login(user)
+    response = client.get(published_book.get_absolute_url(), {'page': 2})
+    assert review not in response.context.get('page_obj')
+
+
+def test_reviews_are_counted_without_count_query(client, published_book, published_book_reviews):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(published_book.get_absolute_url())
+    assert response.context.get('paginator').count == len(published_book_reviews)
+    assert not any('COUNT(' in query['sql'] for query in context.captured_queries)
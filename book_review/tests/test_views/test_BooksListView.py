@@ -1,5 +1,9 @@
 import pytest
+import datetime
+
+from mixer.backend.django import mixer
 from django.urls import reverse
+from book_review.models import Book
 from book_review.custom.constants import BOOKS_PER_PAGE
 
 
@@ -42,3 +46,61 @@ def test_anticipated_books_are_not_sent_to_template(client, url_argument, antici
     url = '{0}?order={1}'.format(reverse('book_review:books_list'), url_argument)
     response = client.get(url)
     assert response.context.get('paginator').count == len(published_books)
+
+
+@pytest.mark.parametrize('url_argument', URL_ARGUMENTS)
+def test_cursor_pagination_walks_through_all_books(client, url_argument, published_books):
+    url = reverse('book_review:books_list')
+    response = client.get(url, {'order': url_argument, 'cursor': ''})
+    seen_books = list(response.context.get('page_obj'))
+    while response.context.get('page_obj').has_next():
+        cursor = response.context.get('page_obj').next_page_number()
+        response = client.get(url, {'order': url_argument, 'cursor': cursor})
+        seen_books.extend(response.context.get('page_obj'))
+    assert len(seen_books) == len(set(seen_books)) == len(published_books)
+
+
+def test_cursor_pagination_renders_next_page_link(client, published_books):
+    url = reverse('book_review:books_list')
+    response = client.get(url, {'order': 'recent', 'cursor': ''})
+    next_cursor = response.context.get('page_obj').next_page_number()
+    assert 'cursor={0}'.format(next_cursor) in response.content.decode()
+
+
+@pytest.mark.parametrize('url_argument', URL_ARGUMENTS)
+def test_cursor_pagination_previous_page(client, url_argument, published_books):
+    url = reverse('book_review:books_list')
+    first_page = client.get(url, {'order': url_argument, 'cursor': ''}).context.get('page_obj')
+    second_page = client.get(url, {'order': url_argument, 'cursor': first_page.next_page_number()}).context.get('page_obj')
+    response = client.get(url, {'order': url_argument, 'cursor': second_page.previous_page_number()})
+    assert list(response.context.get('page_obj')) == list(first_page)
+
+
+def test_cursor_pagination_doesnt_count_books(client, published_books):
+    url = reverse('book_review:books_list')
+    response = client.get(url, {'order': 'recent', 'cursor': ''})
+    assert response.context.get('paginator').count is None
+
+
+def test_invalid_cursor_raises_404(client, published_books):
+    url = reverse('book_review:books_list')
+    response = client.get(url, {'order': 'recent', 'cursor': 'invalid'})
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('years, expected_titles', [
+    ('1869', ['War and Peace']),
+    ('1860s', ['Crime and Punishment', 'War and Peace']),
+    ('1866-1870', ['Crime and Punishment', 'War and Peace']),
+    ('1950', []),
+])
+def test_books_are_filtered_by_years(client, published_books, years, expected_titles):
+    mixer.blend(Book, title='War and Peace', pub_date=datetime.date(1869, 1, 1))
+    mixer.blend(Book, title='Crime and Punishment', pub_date=datetime.date(1866, 1, 1))
+    response = client.get(reverse('book_review:books_list'), {'order': 'popular', 'years': years})
+    assert [book.title for book in response.context.get('page_obj')] == expected_titles
+
+
+def test_invalid_years_raise_404(client, published_books):
+    response = client.get(reverse('book_review:books_list'), {'order': 'recent', 'years': 'long ago'})
+    assert response.status_code == 404
@@ -0,0 +1,104 @@
+import csv
+import json
+import pytest
+
+from io import StringIO
+from asgiref.sync import async_to_sync
+from mixer.backend.django import mixer
+from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from django.test import Client
+from django.urls import reverse
+from book_review.handlers import ASGIHandler
+from book_review.models import Review
+
+
+# Local fixtures.
+
+@pytest.fixture
+def staff_user():
+    return mixer.blend(User, is_staff=True)
+
+
+def get_content(response):
+    return b''.join(response.streaming_content).decode()
+
+
+def asgi_get(path, user):
+    """
+    Requests the path from ASGI application of the project, returns sent messages.
+    """
+    client = Client()
+    client.force_login(user)
+    cookie = '; '.join('{0}={1}'.format(key, morsel.value) for key, morsel in client.cookies.items())
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    async_to_sync(ASGIHandler())(scope, receive, send)
+    return messages
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_unauthenticated_user_is_redirected(client):
+    response = client.get(reverse('book_review:export'))
+    assert response.status_code == 302
+
+
+def test_not_staff_user_is_redirected(client, user):
+    client.force_login(user)
+    response = client.get(reverse('book_review:export'))
+    assert response.status_code == 302
+
+
+def test_staff_user_gets_streaming_csv(client, staff_user, books_with_authors_and_genres):
+    client.force_login(staff_user)
+    response = client.get(reverse('book_review:export'))
+    assert isinstance(response, StreamingHttpResponse)
+    assert response['Content-Type'] == 'text/csv'
+    assert response['Content-Disposition'] == 'attachment; filename="books.csv"'
+    assert len(list(csv.DictReader(StringIO(get_content(response))))) == len(books_with_authors_and_genres)
+
+
+def test_reviews_are_exported_as_jsonl(client, staff_user, published_book_reviews):
+    client.force_login(staff_user)
+    response = client.get(reverse('book_review:export'), {'kind': 'reviews', 'format': 'jsonl'})
+    records = [json.loads(line) for line in get_content(response).splitlines()]
+    assert len(records) == Review.objects.count()
+
+
+def test_books_are_filtered_by_search(client, staff_user, published_books):
+    client.force_login(staff_user)
+    params = {'format': 'jsonl', 'q': published_books[0].title, 'category': 'book'}
+    response = client.get(reverse('book_review:export'), params)
+    records = [json.loads(line) for line in get_content(response).splitlines()]
+    assert [record['title'] for record in records] == [published_books[0].title]
+
+
+# Rows are read in a thread under ASGI, so test data must be committed.
+@pytest.mark.django_db(transaction=True)
+def test_export_is_streamed_under_asgi(staff_user, books_with_authors_and_genres):
+    messages = asgi_get(reverse('book_review:export'), staff_user)
+    assert messages[0]['status'] == 200
+    assert not messages[-1].get('more_body')
+    content = b''.join(message.get('body', b'') for message in messages[1:]).decode()
+    assert len(list(csv.DictReader(StringIO(content)))) == len(books_with_authors_and_genres)
+
+
+@pytest.mark.parametrize('param, value', [('kind', 'users'), ('format', 'xml'), ('category', 'publisher')])
+def test_unknown_argument_value_leads_to_404(client, staff_user, param, value):
+    client.force_login(staff_user)
+    response = client.get(reverse('book_review:export'), {param: value})
+    assert response.status_code == 404
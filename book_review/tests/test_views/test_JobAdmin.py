@@ -0,0 +1,35 @@
+import pytest
+
+from mixer.backend.django import mixer
+from django.contrib.auth.models import User
+from django.urls import reverse
+from book_review.models import Job
+
+
+# Local fixtures.
+
+@pytest.fixture
+def admin_client(client):
+    client.force_login(mixer.blend(User, is_staff=True, is_superuser=True))
+    return client
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_dashboard_shows_number_of_jobs_by_status(admin_client):
+    mixer.cycle(2).blend(Job, name='build_book_images', status=Job.FAILED, dedup_key=None)
+    response = admin_client.get(reverse('admin:book_review_job_changelist'))
+    assert ('Failed', 2) in response.context.get('status_counts')
+
+
+def test_failed_jobs_are_queued_again(admin_client):
+    job = mixer.blend(Job, name='build_book_images', status=Job.FAILED, attempts=5, dedup_key=None)
+    admin_client.post(reverse('admin:book_review_job_changelist'), {
+        'action': 'retry_jobs',
+        '_selected_action': [job.pk],
+    })
+    job.refresh_from_db()
+    assert (job.status, job.attempts) == (Job.QUEUED, 0)
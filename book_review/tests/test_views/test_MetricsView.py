@@ -0,0 +1,81 @@
+import pytest
+from django.contrib.auth.models import User
+from django.urls import reverse
+from mixer.backend.django import mixer
+from book_review.custom.constants import BOOKS_PER_PAGE
+
+
+# Local fixtures.
+
+@pytest.fixture
+def get_metrics(client, settings):
+    """
+    Returns function fetching metrics lines as Prometheus server on internal address does.
+    """
+    settings.INTERNAL_IPS = ['127.0.0.1']
+
+    def get_lines():
+        return client.get(reverse('book_review:metrics')).content.decode().splitlines()
+    return get_lines
+
+
+def get_value(lines, prefix):
+    for line in lines:
+        if line.startswith(prefix + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_anonymous_user_is_forbidden(client, settings):
+    settings.INTERNAL_IPS = []
+    response = client.get(reverse('book_review:metrics'))
+    assert response.status_code == 403
+
+
+def test_staff_user_gets_metrics(client, settings):
+    settings.INTERNAL_IPS = []
+    client.force_login(mixer.blend(User, is_staff=True))
+    response = client.get(reverse('book_review:metrics'))
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+    assert 'no-cache' in response['Cache-Control']
+
+
+def test_internal_address_gets_metrics(get_metrics):
+    assert '# TYPE book_review_request_duration_seconds histogram' in get_metrics()
+
+
+def test_request_latency_queries_and_templates_are_recorded(client, get_metrics, published_books):
+    response = client.get(reverse('book_review:books_list'), {'order': 'recent'})
+    assert response.status_code == 200
+
+    lines = get_metrics()
+    view = '{view="book_review:books_list"}'
+    assert get_value(lines, 'book_review_request_duration_seconds_count'
+                            '{view="book_review:books_list",method="GET"}') == 1
+    assert get_value(lines, 'book_review_request_queries_count' + view) == 1
+    assert get_value(lines, 'book_review_request_queries_sum' + view) > 0
+    assert get_value(lines, 'book_review_request_query_seconds_sum' + view) > 0
+    assert get_value(lines, 'book_review_request_template_seconds_sum' + view) > 0
+    assert get_value(lines, 'book_review_template_render_seconds_count'
+                            '{template="books/book_card.html"}') == BOOKS_PER_PAGE
+    assert get_value(lines, 'book_review_template_tag_seconds_count{tag="book_picture"}') == BOOKS_PER_PAGE
+
+
+def test_unresolved_requests_share_one_label(client, get_metrics):
+    client.get('/missing/')
+    client.get('/other-missing/')
+    assert get_value(get_metrics(), 'book_review_request_queries_count{view="unresolved"}') == 2
+
+
+def test_metrics_can_be_turned_off(client, settings, published_books):
+    settings.METRICS = False
+    client.get(reverse('book_review:books_list'), {'order': 'recent'})
+    settings.INTERNAL_IPS = ['127.0.0.1']
+    lines = client.get(reverse('book_review:metrics')).content.decode().splitlines()
+    assert get_value(lines, 'book_review_request_queries_count{view="book_review:books_list"}') is None
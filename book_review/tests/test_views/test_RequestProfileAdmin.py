@@ -0,0 +1,117 @@
+import datetime
+import marshal
+
+import pytest
+from mixer.backend.django import mixer
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from book_review.custom import profiling
+from book_review.middleware import ProfilerMiddleware
+from book_review.models import RequestProfile
+
+
+# Local fixtures.
+
+@pytest.fixture
+def staff_client(client):
+    client.force_login(mixer.blend(User, is_staff=True, is_superuser=True))
+    return client
+
+
+@pytest.fixture
+def profile(staff_client, published_book):
+    staff_client.get(published_book.get_absolute_url(), {'profile': ''})
+    return RequestProfile.objects.get()
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_staff_request_with_argument_is_profiled(staff_client, published_book):
+    response = staff_client.get(published_book.get_absolute_url(), {'profile': ''})
+    profile = RequestProfile.objects.get()
+    assert response['X-Profile'] == reverse('admin:book_review_requestprofile_change', args=[profile.pk])
+    assert (profile.view_name, profile.status_code) == ('book_review:book', 200)
+    assert profile.num_queries > 0
+    assert 'SQL queries:' in profile.report
+    assert 'book_review_book' in profile.report
+    assert 'get_context_data' in profile.report
+    assert marshal.loads(bytes(profile.stats))
+
+
+def test_staff_request_with_header_is_profiled(staff_client, published_book):
+    staff_client.get(published_book.get_absolute_url(), HTTP_X_PROFILE='1')
+    assert RequestProfile.objects.count() == 1
+
+
+def test_other_users_requests_are_not_profiled(client, user, published_book):
+    client.get(published_book.get_absolute_url(), {'profile': ''})
+    client.force_login(user)
+    response = client.get(published_book.get_absolute_url(), {'profile': ''})
+    assert 'X-Profile' not in response
+    assert not RequestProfile.objects.exists()
+
+
+def test_only_one_request_is_profiled_at_a_time(staff_client, published_book):
+    with ProfilerMiddleware.profile_lock:
+        response = staff_client.get(published_book.get_absolute_url(), {'profile': ''})
+    assert response.status_code == 200
+    assert 'X-Profile' not in response
+    assert not RequestProfile.objects.exists()
+    staff_client.get(published_book.get_absolute_url(), {'profile': ''})
+    assert RequestProfile.objects.count() == 1
+
+
+def test_profiler_can_be_turned_off(settings, staff_client, published_book):
+    settings.PROFILER = False
+    staff_client.get(published_book.get_absolute_url(), {'profile': ''})
+    assert not RequestProfile.objects.exists()
+
+
+def test_expired_and_oldest_profiles_are_deleted(monkeypatch, staff_client, published_book):
+    monkeypatch.setattr(profiling, 'PROFILE_MAX_COUNT', 2)
+    expired = mixer.blend(RequestProfile, expires_at=timezone.now() - datetime.timedelta(seconds=1))
+    for _ in range(3):
+        staff_client.get(published_book.get_absolute_url(), {'profile': ''})
+    profiles = list(RequestProfile.objects.order_by('pk'))
+    assert len(profiles) == 2
+    assert expired not in profiles
+
+
+def test_long_report_is_cut(monkeypatch, staff_client, published_book):
+    monkeypatch.setattr(profiling, 'PROFILE_MAX_REPORT_SIZE', 100)
+    monkeypatch.setattr(profiling, 'PROFILE_MAX_STATS_SIZE', 100)
+    staff_client.get(published_book.get_absolute_url(), {'profile': ''})
+    profile = RequestProfile.objects.get()
+    assert profile.report.endswith('cut to 100 characters.\n')
+    assert not profile.stats
+
+
+def test_admin_lists_profiles_with_downloads(staff_client, profile):
+    mixer.blend(RequestProfile, path='/expired/', expires_at=timezone.now() - datetime.timedelta(seconds=1))
+    response = staff_client.get(reverse('admin:book_review_requestprofile_changelist'))
+    assert list(response.context['cl'].result_list) == [profile]
+    assert reverse('admin:book_review_requestprofile_stats', args=[profile.pk]) in response.content.decode()
+
+
+def test_admin_shows_report(staff_client, profile):
+    response = staff_client.get(reverse('admin:book_review_requestprofile_change', args=[profile.pk]))
+    assert response.status_code == 200
+    assert 'SQL queries:' in response.content.decode()
+
+
+def test_report_and_stats_are_downloadable(staff_client, profile):
+    response = staff_client.get(reverse('admin:book_review_requestprofile_report', args=[profile.pk]))
+    assert response.content.decode() == profile.report
+    assert 'attachment' in response['Content-Disposition']
+    response = staff_client.get(reverse('admin:book_review_requestprofile_stats', args=[profile.pk]))
+    assert response.content == bytes(profile.stats)
+
+
+def test_downloads_are_staff_only(client, profile):
+    client.logout()
+    response = client.get(reverse('admin:book_review_requestprofile_report', args=[profile.pk]))
+    assert response.status_code == 302
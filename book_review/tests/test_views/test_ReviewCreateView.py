@@ -87,3 +87,27 @@ def test_authenticated_user_cant_add_his_second_review_for_one_book(client, user
     client.force_login(user)
     response = client.get(url)
     assert response.status_code == 302
+
+
+def test_second_review_post_request_is_redirected_without_error(client, user, published_book, published_book_review_owned_by_user):
+    url = reverse('book_review:add_review', kwargs={
+        'pk': published_book.id,
+        'slug': published_book.slug
+    })
+    client.force_login(user)
+    response = client.post(url, REVIEW_DATA)
+    assert response.status_code == 302
+    assert Review.objects.filter(owner=user, book=published_book).count() == 1
+    published_book.refresh_from_db()
+    assert published_book.num_reviews == 1
+
+
+def test_post_request_on_anticipated_book_is_redirected(client, user, anticipated_book):
+    url = reverse('book_review:add_review', kwargs={
+        'pk': anticipated_book.id,
+        'slug': anticipated_book.slug
+    })
+    client.force_login(user)
+    response = client.post(url, REVIEW_DATA)
+    assert response.status_code == 302
+    assert not Review.objects.filter(book=anticipated_book).exists()
@@ -96,3 +96,31 @@ def test_updated_review_contains_correct_data(client, user, published_book, publ
         text=REVIEW_UPDATE_DATA['text']
     )
     assert updated_review
+
+
+def test_update_with_stale_version_shows_form_again(client, user, published_book, published_book_review_owned_by_user):
+    url = reverse('book_review:edit_review', kwargs={
+        'pk': published_book.id,
+        'slug': published_book.slug
+    })
+    client.force_login(user)
+    stale_version = published_book_review_owned_by_user.version
+    Review.objects.filter(pk=published_book_review_owned_by_user.pk).update(version=stale_version + 1)
+    response = client.post(url, {**REVIEW_UPDATE_DATA, 'version': stale_version})
+    assert response.status_code == 200
+    assert response.context.get('form').non_field_errors()
+    assert not Review.objects.filter(title=REVIEW_UPDATE_DATA['title']).exists()
+
+
+def test_update_after_conflict_saves_review(client, user, published_book, published_book_review_owned_by_user):
+    url = reverse('book_review:edit_review', kwargs={
+        'pk': published_book.id,
+        'slug': published_book.slug
+    })
+    client.force_login(user)
+    stale_version = published_book_review_owned_by_user.version
+    Review.objects.filter(pk=published_book_review_owned_by_user.pk).update(version=stale_version + 1)
+    response = client.post(url, {**REVIEW_UPDATE_DATA, 'version': stale_version})
+    response = client.post(url, response.context.get('form').data)
+    assert response.status_code == 302
+    assert Review.objects.get(pk=published_book_review_owned_by_user.pk).version == stale_version + 2
@@ -1,6 +1,11 @@
 import pytest
+
+from mixer.backend.django import mixer
 from django.urls import reverse
+from book_review.models import Book
 from book_review.custom.constants import BOOKS_PER_PAGE
+from book_review.custom.search import search
+from book_review.custom.search_cache import search_results_cache
 
 
 pytestmark = pytest.mark.django_db
@@ -53,3 +58,53 @@ def test_paginator_count_value_is_correct(client, published_books, anticipated_b
     url = reverse('book_review:search')
     response = client.get(url, {'q': 'book', 'category': 'any'})
     assert response.context.get('paginator').count == len(published_books) + len(anticipated_books)
+
+
+def test_cursor_pagination_walks_through_all_results(client, published_books, anticipated_books):
+    url = reverse('book_review:search')
+    response = client.get(url, {'q': 'book', 'category': 'any', 'cursor': ''})
+    seen_books = list(response.context.get('page_obj'))
+    while response.context.get('page_obj').has_next():
+        cursor = response.context.get('page_obj').next_page_number()
+        response = client.get(url, {'q': 'book', 'category': 'any', 'cursor': cursor})
+        seen_books.extend(response.context.get('page_obj'))
+    assert len(seen_books) == len(set(seen_books)) == len(published_books) + len(anticipated_books)
+
+
+def test_found_books_are_ordered_as_search_orders_them(client, published_books, anticipated_books):
+    url = reverse('book_review:search')
+    response = client.get(url, {'q': 'book', 'category': 'any', 'page': 2})
+    assert list(response.context.get('page_obj')) == list(search('book', 'any')[BOOKS_PER_PAGE:BOOKS_PER_PAGE * 2])
+
+
+def test_repeated_search_fetches_page_by_cached_ids(client, published_books, django_assert_num_queries):
+    url = reverse('book_review:search')
+    client.get(url, {'q': 'Published_Book', 'category': 'book'})
+    # Page of books and their authors.
+    with django_assert_num_queries(2):
+        response = client.get(url, {'q': 'published_book ', 'category': 'book', 'page': 2})
+    assert response.context.get('paginator').count == len(published_books)
+    assert search_results_cache.get_stats()['hits'] == 1
+
+
+def test_added_book_is_found_by_cached_query(client, published_books, django_capture_on_commit_callbacks):
+    url = reverse('book_review:search')
+    client.get(url, {'q': 'published_book', 'category': 'book'})
+    with django_capture_on_commit_callbacks(execute=True):
+        mixer.blend(Book, title='published_book_new')
+    response = client.get(url, {'q': 'published_book', 'category': 'book'})
+    assert response.context.get('paginator').count == len(published_books) + 1
+
+
+def test_too_broad_search_is_paged_by_database(client, monkeypatch, published_books, django_assert_max_num_queries):
+    monkeypatch.setattr(search_results_cache, 'max_results', 10)
+    url = reverse('book_review:search')
+    response = client.get(url, {'q': 'published_book', 'category': 'book', 'page': 2})
+    assert response.context.get('paginator').count == len(published_books)
+    assert list(response.context.get('page_obj')) == list(
+        search('published_book', 'book')[BOOKS_PER_PAGE:BOOKS_PER_PAGE * 2]
+    )
+    # Repeated query doesn't load all ids again: check for fuzzy search, count, page of books and their authors.
+    with django_assert_max_num_queries(4):
+        client.get(url, {'q': 'published_book', 'category': 'book', 'page': 3})
+
@@ -0,0 +1,58 @@
+import pytest
+
+from mixer.backend.django import mixer
+from django.contrib.auth.models import User
+from django.urls import reverse
+from book_review.custom.slow_queries import slow_query_log
+
+
+# Local fixtures.
+
+@pytest.fixture
+def record_all_queries(settings):
+    settings.SLOW_QUERIES = True
+    settings.SLOW_QUERY_THRESHOLD = 0
+    settings.SLOW_QUERY_SAMPLE_RATE = 1
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_slow_queries_are_recorded_with_view_call_site_and_plan(client, record_all_queries, published_books):
+    client.get(reverse('book_review:books_list'), {'order': 'popular'})
+    queries = [query for query in slow_query_log.get_entries() if 'ORDER BY' in query.sql]
+    assert queries
+    for query in queries:
+        assert query.view_name == 'book_review:books_list'
+        assert query.plan
+    call_sites = {query.call_site for query in slow_query_log.get_entries()}
+    # Count is made by paginator, page of books is fetched by a loop of template.
+    assert any(call_site.startswith('book_review/custom/pagination.py:') for call_site in call_sites)
+    assert any(call_site.startswith('books/books_list.html:') for call_site in call_sites)
+
+
+def test_unsampled_requests_are_not_watched(client, record_all_queries, settings, published_books):
+    settings.SLOW_QUERY_SAMPLE_RATE = 0
+    client.get(reverse('book_review:books_list'), {'order': 'popular'})
+    assert slow_query_log.get_entries() == []
+
+
+def test_recording_is_off_by_default(client, published_books):
+    client.get(reverse('book_review:books_list'), {'order': 'popular'})
+    assert slow_query_log.get_entries() == []
+
+
+def test_page_is_available_to_staff_only(client):
+    response = client.get(reverse('slow_queries'))
+    assert response.status_code == 302
+    assert reverse('admin:login') in response.url
+
+
+def test_page_shows_slowest_queries(client, record_all_queries, published_books):
+    client.get(reverse('book_review:books_list'), {'order': 'popular'})
+    client.force_login(mixer.blend(User, is_staff=True))
+    response = client.get(reverse('slow_queries'))
+    assert response.status_code == 200
+    assert 'book_review:books_list' in response.content.decode()
@@ -0,0 +1,173 @@
+import pytest
+import asyncio
+import importlib
+
+from asgiref.sync import async_to_sync
+from mixer.backend.django import mixer
+from django.conf import settings as django_settings
+from django.contrib.auth.models import User
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import AsyncClient
+from django.urls import clear_url_caches, resolve, reverse
+from django.utils.module_loading import import_string
+from book_review import middleware, views
+from book_review.models import Book, RequestProfile, Review
+from book_review.custom.constants import BOOKS_PER_PAGE, REVIEWS_PER_PAGE
+from book_review.custom.metrics import metrics
+
+
+# Local fixtures.
+
+def reload_urls():
+    import book_review.urls
+    import mysite.urls
+    importlib.reload(book_review.urls)
+    importlib.reload(mysite.urls)
+    clear_url_caches()
+
+
+@pytest.fixture(autouse=True)
+def async_read_views(settings):
+    """
+    Serves read-only views by async views, as ASGI application does.
+    """
+    settings.ASYNC_READ_VIEWS = True
+    reload_urls()
+    yield
+    settings.ASYNC_READ_VIEWS = False
+    reload_urls()
+
+
+# Queries of async views run in other threads, so test data must be committed.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+# Tests.
+
+@pytest.mark.parametrize('url, view_class', [
+    ('/', views.IndexListView),
+    ('/published_books/', views.BooksListView),
+    ('/book/1-slug/', views.BookDetailView),
+    ('/search/', views.SearchListView),
+])
+def test_read_views_are_async(url, view_class):
+    view = resolve(url).func
+    assert asyncio.iscoroutinefunction(view)
+    assert view.view_class is view_class
+
+
+def test_index_page_contains_expected_books(client, anticipated_books):
+    response = client.get(reverse('book_review:index') + '?page=2')
+    expected = sorted(anticipated_books, key=lambda book: (book.pub_date, book.title))
+    assert response.status_code == 200
+    assert list(response.context['anticipated_books']) == expected[BOOKS_PER_PAGE:BOOKS_PER_PAGE * 2]
+    assert response.context['paginator'].count == len(anticipated_books)
+    assert response.context['page_obj'].number == 2
+
+
+def test_books_list_page_contains_expected_books(client, published_books):
+    response = client.get(reverse('book_review:books_list') + '?order=recent')
+    expected = list(Book.objects.order_by('-pub_date', 'title')[:BOOKS_PER_PAGE])
+    assert list(response.context['books']) == expected
+    assert response.context['paginator'].count == len(published_books)
+
+
+def test_books_list_without_order_is_redirected(client):
+    response = client.get(reverse('book_review:books_list'))
+    assert response.status_code == 302
+
+
+@pytest.mark.parametrize('page', ['0', '100', 'abc'])
+def test_books_list_invalid_page_not_found(client, published_books, page):
+    response = client.get(reverse('book_review:books_list') + '?order=recent&page=' + page)
+    assert response.status_code == 404
+
+
+def test_books_list_cursor_pagination(client, published_books):
+    response = client.get(reverse('book_review:books_list') + '?order=recent&cursor=')
+    assert response.status_code == 200
+    assert len(response.context['books']) == BOOKS_PER_PAGE
+
+
+def test_search_results(client, published_books):
+    response = client.get(reverse('book_review:search') + '?q=published_book1&category=book')
+    assert response.status_code == 200
+    assert published_books[1] in response.context['object_list']
+
+
+def test_book_user_review_is_pinned(client, user, published_book, published_book_reviews):
+    review = mixer.blend(Review, owner=user, book=published_book, pub_date=published_book.pub_date)
+    client.force_login(user)
+    response = client.get(published_book.get_absolute_url())
+    published_book.refresh_from_db()
+    assert response.status_code == 200
+    assert response.context['user_review'] == review
+    assert response.context['page_obj'].object_list[0] == review
+    assert response.context['paginator'].count == published_book.num_reviews
+
+
+def test_book_page_out_of_range_returns_last_page(client, published_book, published_book_reviews):
+    response = client.get(published_book.get_absolute_url() + '?page=100')
+    last_page = (len(published_book_reviews) + REVIEWS_PER_PAGE - 1) // REVIEWS_PER_PAGE
+    assert response.context['page_obj'].number == last_page
+    assert len(response.context['page_obj'].object_list) == len(published_book_reviews) - (last_page - 1) * REVIEWS_PER_PAGE
+
+
+def test_nonexistent_book_not_found(client):
+    response = client.get(reverse('book_review:book', kwargs={'pk': 1, 'slug': 'missing'}))
+    assert response.status_code == 404
+
+
+def test_queries_of_async_views_count_towards_budget(client, settings, monkeypatch, caplog, published_book):
+    # Anonymous request makes all its queries in threads of async view.
+    settings.QUERY_BUDGET_STRICT = False
+    monkeypatch.setitem(middleware.QUERY_BUDGETS, 'book_review:book', 2)
+    client.get(published_book.get_absolute_url())
+    assert 'budget is 2' in caplog.text
+
+
+def test_async_views_record_metrics(client, published_books):
+    client.get(reverse('book_review:books_list') + '?order=recent')
+    assert metrics.queries['book_review:books_list'].sum > 0
+    assert metrics.templates['books/book_card.html'].count == BOOKS_PER_PAGE
+
+
+@pytest.mark.parametrize('path', django_settings.MIDDLEWARE)
+def test_middleware_runs_in_event_loop(path):
+    async def get_response(request):
+        pass
+
+    try:
+        middleware_instance = import_string(path)(get_response)
+    except MiddlewareNotUsed:
+        return
+    assert asyncio.iscoroutinefunction(middleware_instance)
+
+
+def test_asgi_requests_count_queries_towards_budget(settings, monkeypatch, caplog, user, published_book):
+    settings.QUERY_BUDGET_STRICT = False
+    monkeypatch.setitem(middleware.QUERY_BUDGETS, 'book_review:book', 2)
+    monkeypatch.setitem(middleware.QUERY_BUDGETS, 'book_review:my_reviews', 1)
+    client = AsyncClient()
+    client.force_login(user)
+    # Async view, and sync view run in a thread by Django.
+    async_to_sync(client.get)(published_book.get_absolute_url())
+    async_to_sync(client.get)(reverse('book_review:my_reviews'))
+    assert 'budget is 2' in caplog.text
+    assert 'budget is 1' in caplog.text
+    assert metrics.queries['book_review:my_reviews'].sum > 0
+
+
+
+def test_concurrent_requests_are_profiled_one_at_a_time(published_book):
+    client = AsyncClient()
+    client.force_login(mixer.blend(User, is_staff=True))
+
+    # Url arguments given as data are lost by AsyncClient of Django 3.2.
+    async def get_concurrently():
+        return await asyncio.gather(*[client.get(published_book.get_absolute_url() + '?profile') for _ in range(3)])
+
+    responses = async_to_sync(get_concurrently)()
+    assert [response.status_code for response in responses] == [200] * 3
+    assert sum('X-Profile' in response for response in responses) == 1
+    assert RequestProfile.objects.count() == 1
@@ -0,0 +1,76 @@
+import pytest
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.urls import reverse
+
+
+# Local fixtures.
+
+@pytest.fixture
+def read_urls(published_book):
+    return [
+        reverse('book_review:index'),
+        reverse('book_review:books_list') + '?order=recent',
+        published_book.get_absolute_url(),
+        reverse('book_review:search') + '?q=published&category=book',
+    ]
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_anonymous_read_responses_are_public_and_cookie_free(client, settings, read_urls):
+    for url in read_urls:
+        # Second response is served from view cache.
+        for _ in range(2):
+            response = client.get(url)
+            assert response.status_code == 200
+            assert not response.cookies
+            assert 'Cookie' not in response.get('Vary', '')
+            assert response['Cache-Control'] == 'public, max-age=0, s-maxage={0}'.format(settings.PUBLIC_CACHE_TIMEOUT)
+            assert response.has_header('ETag')
+
+
+def test_anonymous_read_requests_dont_create_sessions(client, read_urls):
+    for url in read_urls:
+        client.get(url)
+    assert not Session.objects.exists()
+
+
+def test_autocomplete_keeps_browser_cache_timeout(client, settings):
+    response = client.get(reverse('book_review:autocomplete'), {'q': 'war'})
+    assert response['Cache-Control'] == 'max-age=60, public, s-maxage={0}'.format(settings.PUBLIC_CACHE_TIMEOUT)
+
+
+def test_authenticated_read_responses_are_private(client, user, read_urls):
+    client.force_login(user)
+    for url in read_urls:
+        response = client.get(url)
+        assert response['Cache-Control'] == 'private'
+        assert 'Cookie' in response['Vary']
+
+
+def test_other_views_are_not_marked_public(client):
+    response = client.get(reverse('users:login'))
+    assert 'public' not in response['Cache-Control']
+    assert response.cookies['csrftoken']
+
+
+def test_session_is_created_on_login(client, read_urls):
+    User.objects.create_user('reader', password='secret-password')
+    client.get(reverse('users:login'))
+    response = client.post(reverse('users:login'), {'username': 'reader', 'password': 'secret-password'})
+    assert response.cookies['sessionid']
+    assert Session.objects.count() == 1
+
+    response = client.get(read_urls[0])
+    assert response.context['user'].username == 'reader'
+    assert response['Cache-Control'] == 'private'
+
+
+def test_public_cache_can_be_turned_off(client, settings, read_urls):
+    settings.PUBLIC_CACHE_TIMEOUT = 0
+    response = client.get(read_urls[0])
+    assert 'Cache-Control' not in response
@@ -0,0 +1,66 @@
+import pytest
+from django.urls import reverse
+from book_review.custom.search_backends import get_search_backend
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('url_name, url_arguments', [
+    ('book_review:index', {}),
+    ('book_review:books_list', {'order': 'recent'}),
+    ('book_review:books_list', {'order': 'popular'}),
+    ('book_review:books_list', {'order': 'best_rated'}),
+    ('book_review:search', {'q': 'book', 'category': 'any'}),
+    ('book_review:my_reviews', {}),
+])
+def test_list_view_stays_within_query_budget(client, query_budget, user, reviews_owned_by_user,
+                                            books_with_authors_and_genres, url_name, url_arguments):
+    client.force_login(user)
+    # Search backend availability is checked once per process, it's not a per-request cost.
+    get_search_backend()
+    with query_budget(url_name):
+        response = client.get(reverse(url_name), url_arguments)
+    assert response.status_code == 200
+
+
+def test_book_detail_view_stays_within_query_budget(client, query_budget, user, books_with_authors_and_genres,
+                                                    published_book_reviews, published_book_review_owned_by_user):
+    client.force_login(user)
+    with query_budget('book_review:book'):
+        response = client.get(published_book_review_owned_by_user.book.get_absolute_url())
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('url_name, method, data, num_queries', [
+    # User, book and review existence check (session is read from cache).
+    ('book_review:add_review', 'get', {}, 3),
+    # User, book, review insert and book aggregates update in a savepoint.
+    ('book_review:add_review', 'post', {'rating': 3, 'title': 'Title', 'text': 'Text'}, 6),
+])
+def test_review_create_view_query_count(client, django_assert_num_queries, user, published_book_reviews,
+                                        url_name, method, data, num_queries):
+    client.force_login(user)
+    book = published_book_reviews[0].book
+    with django_assert_num_queries(num_queries):
+        getattr(client, method)(reverse(url_name, args=[book.pk, book.slug]), data)
+
+
+@pytest.mark.parametrize('url_name, method, data, num_queries', [
+    # User and review joined with its book.
+    ('book_review:edit_review', 'get', {}, 2),
+    ('book_review:delete_review', 'get', {}, 2),
+    # User, review, review update and book aggregates update in a savepoint.
+    ('book_review:edit_review', 'post', {'rating': 3, 'title': 'Title', 'text': 'Text'}, 6),
+    # User, review, review delete and book aggregates update.
+    ('book_review:delete_review', 'post', {}, 4),
+])
+def test_own_review_view_query_count(client, django_assert_num_queries, user, published_book_reviews,
+                                     published_book_review_owned_by_user, url_name, method, data, num_queries):
+    client.force_login(user)
+    book = published_book_review_owned_by_user.book
+    if 'rating' in data:
+        # Unchanged rating doesn't update book aggregates.
+        data = {**data, 'rating': published_book_review_owned_by_user.rating % 5 + 1}
+    with django_assert_num_queries(num_queries):
+        getattr(client, method)(reverse(url_name, args=[book.pk, book.slug]), data)
@@ -0,0 +1,123 @@
+import pytest
+
+from django.core.cache import cache
+from django.db import connections
+from django.urls import reverse
+from book_review.custom.constants import VIEW_CACHE_TIMEOUT
+from book_review.models import Book
+from book_review.routers import ReplicaRouter, routing_state
+
+
+# Local fixtures.
+
+@pytest.fixture
+def replica(settings, tmp_path, published_books):
+    """
+    Registers SQLite file copy of primary test database as 'replica1' and returns its alias.
+    Replica gets a book missing in primary, so reads from replica are recognizable.
+    """
+    alias = 'replica1'
+    connections.settings[alias] = {**connections['default'].settings_dict, 'NAME': str(tmp_path / 'replica.sqlite3')}
+    with connections['default'].cursor() as cursor:
+        # Shadow tables of full-text index are created by its virtual table.
+        cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%%' "
+            "AND name NOT LIKE 'book_review_booksearch_fts_%%' ORDER BY rowid"
+        )
+        schema = [row[0] for row in cursor.fetchall()]
+    with connections[alias].cursor() as cursor:
+        for statement in schema:
+            cursor.execute(statement)
+    Book.objects.using(alias).bulk_create([Book(
+        title='Replica only book', language='English', country='UK', pub_date=published_books[0].pub_date,
+        pub_year=published_books[0].pub_year, slug='replica-only-book',
+    )])
+    settings.REPLICA_DATABASES = [alias]
+    yield alias
+    connections[alias].close()
+    del connections[alias]
+    del connections.settings[alias]
+
+
+@pytest.fixture
+def cache_timeouts(monkeypatch):
+    """
+    Returns list of timeouts of cached responses.
+    """
+    timeouts = []
+    set_value = cache.set
+
+    def set_recording_timeout(key, value, timeout=None, *args, **kwargs):
+        if key.startswith('view:'):
+            timeouts.append(timeout)
+        return set_value(key, value, timeout, *args, **kwargs)
+
+    monkeypatch.setattr(cache, 'set', set_recording_timeout)
+    return timeouts
+
+
+pytestmark = pytest.mark.django_db
+
+
+# Tests.
+
+def test_router_reads_from_primary_outside_of_read_views(settings):
+    settings.REPLICA_DATABASES = ['replica1']
+    assert ReplicaRouter().db_for_read(Book) == 'default'
+
+
+def test_router_reads_from_replica_in_read_views(settings):
+    settings.REPLICA_DATABASES = ['replica1']
+    with routing_state() as state:
+        state.use_replica = True
+        assert ReplicaRouter().db_for_read(Book) == 'replica1'
+
+
+def test_router_reads_from_primary_after_write(settings):
+    settings.REPLICA_DATABASES = ['replica1']
+    router = ReplicaRouter()
+    with routing_state() as state:
+        state.use_replica = True
+        assert router.db_for_write(Book) == 'default'
+        assert router.db_for_read(Book) == 'default'
+
+
+def test_router_doesnt_migrate_replicas(settings):
+    settings.REPLICA_DATABASES = ['replica1']
+    assert not ReplicaRouter().allow_migrate('replica1', 'book_review')
+    assert ReplicaRouter().allow_migrate('default', 'book_review')
+
+
+def test_read_view_reads_from_replica(client, replica):
+    response = client.get(reverse('book_review:books_list'), {'order': 'recent'})
+    assert 'Replica only book' in response.content.decode()
+
+
+def test_not_read_view_reads_from_primary(client, user, replica):
+    client.force_login(user)
+    response = client.get(reverse('book_review:my_reviews'))
+    assert response.status_code == 200
+    assert 'read_primary' not in response.cookies
+
+
+def test_user_reads_own_writes_from_primary(client, user, replica, published_books):
+    book = published_books[0]
+    client.force_login(user)
+    response = client.post(reverse('book_review:add_review', args=[book.pk, book.slug]), {
+        'rating': 5, 'title': 'Title', 'text': 'Text',
+    })
+    assert response.cookies['read_primary']['max-age'] == 10
+    response = client.get(book.get_absolute_url())
+    assert 'Reviews (1)' in response.content.decode()
+    response = client.get(reverse('book_review:books_list'), {'order': 'recent'})
+    assert 'Replica only book' not in response.content.decode()
+
+
+def test_page_read_from_replica_is_cached_until_replica_catches_up(client, replica, cache_timeouts):
+    client.get(reverse('book_review:books_list'), {'order': 'recent'})
+    assert cache_timeouts == [10]
+
+
+def test_page_read_from_primary_is_cached_for_full_timeout(client, published_books, cache_timeouts):
+    client.get(reverse('book_review:books_list'), {'order': 'recent'})
+    assert cache_timeouts == [VIEW_CACHE_TIMEOUT]
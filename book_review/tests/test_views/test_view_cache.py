@@ -0,0 +1,63 @@
+import pytest
+from django.urls import reverse
+from mixer.backend.django import mixer
+from book_review.models import Review
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('url', [
+    reverse('book_review:index'),
+    reverse('book_review:books_list') + '?order=popular',
+])
+def test_anonymous_list_response_is_served_from_cache(client, django_assert_num_queries, published_books, anticipated_books, url):
+    client.get(url)
+    with django_assert_num_queries(0):
+        response = client.get(url)
+    assert response.status_code == 200
+
+
+def test_anonymous_detail_response_is_served_from_cache(client, django_assert_num_queries, published_book):
+    client.get(published_book.get_absolute_url())
+    with django_assert_num_queries(0):
+        client.get(published_book.get_absolute_url())
+
+
+def test_different_pages_are_cached_separately(client, published_books):
+    url = reverse('book_review:books_list')
+    first_page = client.get(url, {'order': 'recent'})
+    second_page = client.get(url, {'order': 'recent', 'page': 2})
+    assert first_page.content != second_page.content
+
+
+def test_authenticated_user_response_is_not_cached(client, user, published_book):
+    client.force_login(user)
+    client.get(published_book.get_absolute_url())
+    response = client.get(published_book.get_absolute_url())
+    assert response.context is not None
+
+
+def test_new_review_invalidates_book_detail(client, django_capture_on_commit_callbacks, published_book):
+    client.get(published_book.get_absolute_url())
+    with django_capture_on_commit_callbacks(execute=True):
+        review = mixer.blend(Review, book=published_book)
+    response = client.get(published_book.get_absolute_url())
+    assert review.title in response.content.decode()
+
+
+def test_new_review_invalidates_books_list(client, django_capture_on_commit_callbacks, published_books):
+    url = reverse('book_review:books_list') + '?order=popular'
+    client.get(url)
+    with django_capture_on_commit_callbacks(execute=True):
+        mixer.blend(Review, book=published_books[-1])
+    response = client.get(url)
+    assert response.context.get('page_obj')[0] == published_books[-1]
+
+
+def test_review_on_other_book_doesnt_invalidate_book_detail(client, django_capture_on_commit_callbacks, published_books):
+    client.get(published_books[0].get_absolute_url())
+    with django_capture_on_commit_callbacks(execute=True):
+        mixer.blend(Review, book=published_books[1])
+    response = client.get(published_books[0].get_absolute_url())
+    assert response.context is None
@@ -2,19 +2,33 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import path, re_path
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 
-from . import views
+from . import async_views, views
 
 app_name = 'book_review'
+
+# Read-only views are async in ASGI deployment.
+if settings.ASYNC_READ_VIEWS:
+    index_view = async_views.AsyncIndexView.as_view()
+    books_list_view = async_views.AsyncBooksListView.as_view()
+    book_view = async_views.AsyncBookDetailView.as_view()
+    search_view = async_views.AsyncSearchListView.as_view()
+else:
+    index_view = views.IndexListView.as_view()
+    books_list_view = views.BooksListView.as_view()
+    book_view = views.BookDetailView.as_view()
+    search_view = views.SearchListView.as_view()
+
 urlpatterns = [
     # Index page and list of anticipated books.
-    path('', views.IndexListView.as_view(), name='index'),
+    path('', index_view, name='index'),
 
     # List of published books ordered according to provided url argument.
-    path('published_books/', views.BooksListView.as_view(), name='books_list'),
+    path('published_books/', books_list_view, name='books_list'),
 
     # Book detail page.
-    re_path(r'^book/(?P<pk>\d+)-(?P<slug>[\w-]+)/$', views.BookDetailView.as_view(), name='book'),
+    re_path(r'^book/(?P<pk>\d+)-(?P<slug>[\w-]+)/$', book_view, name='book'),
 
     # Create, edit and delete review pages.
     re_path(r'^review/(?P<pk>\d+)-(?P<slug>[\w-]+)/add/$', login_required(views.ReviewCreateView.as_view()), name='add_review'),
@@ -25,7 +39,16 @@ urlpatterns = [
     path('my_reviews/', login_required(views.MyReviewsListView.as_view()), name='my_reviews'),
 
     # Search results page.
-    path('search/', views.SearchListView.as_view(), name='search'),
+    path('search/', search_view, name='search'),
+
+    # Search-as-you-type suggestions.
+    path('search/autocomplete/', views.AutocompleteView.as_view(), name='autocomplete'),
+
+    # Staff only catalog export.
+    path('export/', staff_member_required(views.CatalogExportView.as_view()), name='export'),
+
+    # Request metrics for staff and Prometheus.
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
 ]
 
 if settings.DEBUG:
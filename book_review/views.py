@@ -1,41 +1,60 @@
-import datetime
-from itertools import chain
-
-from django.contrib.auth.models import User
-from django.core.paginator import Paginator
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError
+from django.db.models import Case, IntegerField, Value, When
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils.functional import cached_property
 from django.views import generic
-from django.http import Http404
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import add_never_cache_headers, patch_cache_control
 
-from .models import Book, Review
+from .models import Book, Review, ReviewVersionConflict
 from .custom.annotations import annotated_books
-from .custom.search import search
-from .forms import SearchForm
-from .custom.constants import BOOKS_PER_PAGE, REVIEWS_PER_PAGE, SEARCH_CATEGORIES
-
-
-class IndexListView(generic.list.ListView):
+from .custom.autocomplete import SUGGESTION_KINDS, get_suggestions
+from .custom.dates import get_today, parse_year_range
+from .custom.export import EXPORT_FORMATS, EXPORT_KINDS, export
+from .custom.metrics import PROMETHEUS_CONTENT_TYPE, metrics
+from .custom.cache import CachedViewMixin, get_book_generation_name
+from .custom.pagination import CountedPaginator, CursorPaginationMixin
+from .custom.slow_queries import slow_query_log
+from .custom.search import cached_search, search
+from .forms import ReviewForm, ReviewUpdateForm, SearchForm
+from .custom.constants import AUTOCOMPLETE_LIMIT, BOOKS_PER_PAGE, REVIEWS_PER_PAGE, SEARCH_CATEGORIES
+
+
+class IndexListView(CachedViewMixin, CursorPaginationMixin, generic.list.ListView):
     """
     Return list of anticipated books ordered by book publication date and title.
+    Cursor pagination is used if 'cursor' url argument is provided.
+    Responses for anonymous users are cached until any book or review is changed.
     """
     template_name = 'general/index.html'
+    read_from_replica = True
+    public_cache = True
     context_object_name = 'anticipated_books'
     paginate_by = BOOKS_PER_PAGE
 
     def get_queryset(self):
-        today = datetime.date.today()
-        anticipated_books = annotated_books.filter(pub_date__gt=today)
+        today = get_today()
+        anticipated_books = annotated_books.filter(pub_date__gt=today).prefetch_related('authors')
         return anticipated_books.order_by('pub_date', 'title')
 
 
-class BooksListView(generic.list.ListView):
+class BooksListView(CachedViewMixin, CursorPaginationMixin, generic.list.ListView):
     """
     Return list of published books ordered according to provided url argument.
     'recent', 'popular' or 'best_rated' argument values are possible.
     Different argument value leads to 404.
+    Optional 'years' argument (a year, range of years or decade, e.g. '1950-1960' or '1860s')
+    filters books by indexed publication year. Invalid value leads to 404.
+    Cursor pagination is used if 'cursor' url argument is provided.
+    Responses for anonymous users are cached until any book or review is changed.
     """
     template_name = 'books/books_list.html'
+    read_from_replica = True
+    public_cache = True
     context_object_name = 'books'
     paginate_by = BOOKS_PER_PAGE
 
@@ -45,8 +64,8 @@ class BooksListView(generic.list.ListView):
         return super().get(*args, **kwargs)
 
     def get_queryset(self):
-        today = datetime.date.today()
-        published_books = annotated_books.filter(pub_date__lte=today)
+        today = get_today()
+        published_books = annotated_books.filter(pub_date__lte=today).prefetch_related('authors')
         order_dict = {
             'recent': '-pub_date',
             'popular': '-num_reviews',
@@ -56,137 +75,177 @@ class BooksListView(generic.list.ListView):
         order_value = order_dict.get(order_key)
         if order_value is None:
             raise Http404
+
+        years = self.request.GET.get('years')
+        if years:
+            year_range = parse_year_range(years)
+            if year_range is None:
+                raise Http404
+            published_books = published_books.filter(pub_year__range=year_range)
         return published_books.order_by(order_value, 'title')
 
 
-class BookDetailView(generic.detail.DetailView):
+class BookDetailView(CachedViewMixin, generic.detail.DetailView):
     """
     Return a particular book and list of reviews for it.
     Reviews are ordered by review publication date.
     Authenticated user who already has review on requested book
     will always see his review on the top of the list regardless of the date.
+    Only requested page of reviews is fetched, number of reviews is taken from book counter.
+    Responses for anonymous users are cached until the book, its authors, genres or reviews are changed.
     """
     model = Book
-    queryset = annotated_books
+    queryset = annotated_books.prefetch_related('authors', 'genres')
     query_pk_and_slug = True
     template_name = 'books/book_details.html'
+    read_from_replica = True
+    public_cache = True
+
+    def get_cache_generations(self):
+        return [get_book_generation_name(self.kwargs.get('pk'))]
+
+    def get_user(self):
+        return self.request.user if self.request.user.is_authenticated else None
+
+    def get_reviews(self, user):
+        """
+        Returns reviews of requested book ordered by publication date.
+        Review of authenticated user is pinned on the top of the list in database, so only one page is fetched.
+        """
+        reviews = Review.objects.filter(book_id=self.kwargs.get('pk')).select_related('owner')
+        if user is None:
+            return reviews.order_by('-pub_date', '-id')
+        is_other_owner = Case(When(owner=user, then=Value(0)), default=Value(1), output_field=IntegerField())
+        return reviews.order_by(is_other_owner, '-pub_date', '-id')
+
+    def get_user_review(self, user):
+        if user is None:
+            return None
+        return Review.objects.filter(book_id=self.kwargs.get('pk'), owner=user).first()
+
+    def get_reviews_context(self, book):
+        user = self.get_user()
+        reviews = self.get_reviews(user)
+        paginator = CountedPaginator(reviews, REVIEWS_PER_PAGE, count=book.num_reviews)
+        return {
+            'paginator': paginator,
+            'page_obj': paginator.get_page(self.request.GET.get('page', '1')),
+            'is_paginated': True,
+            'reviews': reviews,
+            'user_review': self.get_user_review(user),
+        }
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        reviews = Review.objects.filter(book=context.get('book')).order_by('-pub_date')
-        user = self.request.user if self.request.user.is_authenticated else None
-        user_review = reviews.filter(owner=user).first()
+        context.update(self.get_reviews_context(context.get('book')))
+        return context
 
-        if user_review:
-            other_reviews = reviews.exclude(owner=user)
-            reviews = list(chain((user_review, ), other_reviews))
 
-        paginator = Paginator(reviews, REVIEWS_PER_PAGE)
-        page_number = self.request.GET.get('page', '1')
-        page_obj = paginator.get_page(page_number)
+class ReviewBookMixin:
+    """
+    Resolves requested book once per request and sends it to template.
+    Users are redirected to the book detail page after successful review changes.
+    """
+    def get_book(self):
+        return get_object_or_404(Book, id=self.kwargs.get('pk'), slug=self.kwargs.get('slug'))
+
+    @cached_property
+    def book(self):
+        return self.get_book()
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
         context.update({
-            'paginator': paginator,
-            'page_obj': page_obj,
-            'is_paginated': True,
-            'reviews': reviews,
+            'book': self.book,
         })
         return context
 
+    def get_success_url(self):
+        return self.book.get_absolute_url()
+
 
-class ReviewCreateView(generic.edit.CreateView):
+class OwnReviewMixin(ReviewBookMixin):
+    """
+    Resolves authenticated user's review for requested book together with the book by one query.
+    """
+    def get_object(self, queryset=None):
+        # Get review by its book and owner fields since review.owner and review.book have unique_together constraint.
+        # Benefit is a simple url without review id, for example, '/review/9-war-and-peace/edit/'.
+        return get_object_or_404(
+            Review.objects.select_related('book'),
+            book_id=self.kwargs.get('pk'),
+            book__slug=self.kwargs.get('slug'),
+            owner=self.request.user,
+        )
+
+    def get_book(self):
+        return self.object.book
+
+
+class ReviewCreateView(ReviewBookMixin, generic.edit.CreateView):
     """
     Create new review on a book.
     User may have at most one review for each book.
     If user already has review for requested book or book is not published yet,
     user will be redirected to book detail page.
+    Review is created by a single INSERT: existing review is detected by (book, owner) unique constraint,
+    so concurrent double submits redirect as well.
     """
     model = Review
-    fields = ['rating', 'title', 'text']
+    form_class = ReviewForm
     template_name = 'reviews/add_review.html'
 
     def get(self, request, *args, **kwargs):
-        book = get_object_or_404(Book, id=self.kwargs.get('pk'), slug=self.kwargs.get('slug'))
-        book_reviews = book.review_set.all()
-        users_already_reviewed = User.objects.filter(review__in=book_reviews)
-
-        if not book.is_published() or request.user in users_already_reviewed:
+        book = self.book
+        if not book.is_published() or Review.objects.filter(book=book, owner=request.user).exists():
             return redirect(book)
 
         return super().get(request, *args, **kwargs)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        book = get_object_or_404(Book, id=self.kwargs.get('pk'), slug=self.kwargs.get('slug'))
-        context.update({
-            'book': book,
-        })
-        return context
+    def post(self, request, *args, **kwargs):
+        if not self.book.is_published():
+            return redirect(self.book)
+
+        return super().post(request, *args, **kwargs)
 
     def form_valid(self, form):
         new_review = form.save(commit=False)
         new_review.owner = self.request.user
-        book = get_object_or_404(Book, id=self.kwargs.get('pk'), slug=self.kwargs.get('slug'))
-        new_review.book = book
-        return super().form_valid(form)
-
-    def get_success_url(self):
-        book = get_object_or_404(Book, id=self.kwargs.get('pk'), slug=self.kwargs.get('slug'))
-        return book.get_absolute_url()
+        new_review.book = self.book
+        try:
+            return super().form_valid(form)
+        except IntegrityError:
+            # User already has review for this book.
+            return redirect(self.book)
 
 
-class ReviewUpdateView(generic.edit.UpdateView):
+class ReviewUpdateView(OwnReviewMixin, generic.edit.UpdateView):
     """
     Update authenticated user's review for a particular book.
+    Review is updated only if it wasn't changed since the form was shown,
+    otherwise the form is shown again with the latest version of review.
     """
-    fields = ['rating', 'title', 'text']
+    form_class = ReviewUpdateForm
     template_name = 'reviews/edit_review.html'
+    conflict_message = 'Review was changed after you started editing it. Saving again will overwrite those changes.'
 
-    def get_object(self, queryset=None):
-        # Get review by its book and owner fields since review.owner and review.book have unique_together constraint.
-        # Benefit is a simple url without review id, for example, '/review/9-war-and-peace/edit/'.
-        book = get_object_or_404(Book, id=self.kwargs.get('pk'), slug=self.kwargs.get('slug'))
-        review = get_object_or_404(Review, book=book, owner=self.request.user)
-        return review
-
-    def get_success_url(self):
-        book = get_object_or_404(Book, id=self.kwargs.get('pk'), slug=self.kwargs.get('slug'))
-        return book.get_absolute_url()
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        book = get_object_or_404(Book, id=self.kwargs.get('pk'), slug=self.kwargs.get('slug'))
-        context.update({
-            'book': book
-        })
-        return context
-
-
-class ReviewDeleteView(generic.edit.DeleteView):
+    def form_valid(self, form):
+        try:
+            return super().form_valid(form)
+        except ReviewVersionConflict:
+            self.object = self.get_object()
+            data = self.request.POST.copy()
+            data['version'] = self.object.version
+            form = self.get_form_class()(data, instance=self.object)
+            form.add_error(None, self.conflict_message)
+            return self.form_invalid(form)
+
+
+class ReviewDeleteView(OwnReviewMixin, generic.edit.DeleteView):
     """
     Delete authenticated user's review for a particular book.
     """
     template_name = 'reviews/delete_review.html'
-    query_pk_and_slug = True
-
-    def get_object(self, queryset=None):
-        # Get review by its book and owner fields since review.owner and review.book have unique_together constraint.
-        # Benefit is a simple url without review id, for example, '/review/9-war-and-peace/delete/'.
-        book = get_object_or_404(Book, id=self.kwargs.get('pk'), slug=self.kwargs.get('slug'))
-        review = get_object_or_404(Review, book=book, owner=self.request.user)
-        return review
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        book = get_object_or_404(Book, id=self.kwargs.get('pk'), slug=self.kwargs.get('slug'))
-        context.update({
-            'book': book
-        })
-        return context
-
-    def get_success_url(self):
-        book = get_object_or_404(Book, id=self.kwargs.get('pk'), slug=self.kwargs.get('slug'))
-        return book.get_absolute_url()
 
 
 class MyReviewsListView(generic.list.ListView):
@@ -199,19 +258,23 @@ class MyReviewsListView(generic.list.ListView):
     paginate_by = REVIEWS_PER_PAGE
 
     def get_queryset(self):
-        return Review.objects.filter(owner=self.request.user).order_by('-pub_date', 'title')
+        return Review.objects.filter(owner=self.request.user).select_related('book', 'owner').order_by('-pub_date', 'title')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         return context
 
 
-class SearchListView(generic.list.ListView):
+class SearchListView(CursorPaginationMixin, generic.list.ListView):
     """
     Return a list of books found by request.
     'q' is a name of the variable that points to query string.
+    Ids of found books are cached, so pages of repeated queries are fetched by ids without counting books.
+    Cursor pagination is used if 'cursor' url argument is provided.
     """
     template_name = 'search/search.html'
+    read_from_replica = True
+    public_cache = True
     context_object_name = 'results'
     paginate_by = BOOKS_PER_PAGE
 
@@ -228,8 +291,10 @@ class SearchListView(generic.list.ListView):
     def get_queryset(self):
         q = self.request.GET.get('q')
         category = self.request.GET.get('category')
-        results = search(q, category)
-        return results
+        if self.cursor_kwarg in self.request.GET:
+            # Cursor pagination filters queryset by rank of the last book on a page.
+            return search(q, category).prefetch_related('authors')
+        return cached_search(q, category).prefetch_related('authors')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -240,3 +305,89 @@ class SearchListView(generic.list.ListView):
             'SEARCH_CATEGORIES': SEARCH_CATEGORIES,
         })
         return context
+
+
+class AutocompleteView(generic.View):
+    """
+    Return JSON list of book, author and genre suggestions for a search query prefix.
+    Suggestions come from in-process prefix index (see book_review.custom.autocomplete), so database is not queried.
+    'category' ('book', 'author', 'genre' or 'any') and 'limit' url arguments are optional.
+    Unknown category or invalid limit leads to 404.
+    """
+    public_cache = True
+    cache_timeout = 60
+
+    def get(self, request, *args, **kwargs):
+        q = request.GET.get('q', '')
+        category = request.GET.get('category', 'any')
+        try:
+            limit = min(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), AUTOCOMPLETE_LIMIT)
+        except ValueError:
+            raise Http404
+        if category != 'any' and category not in SUGGESTION_KINDS:
+            raise Http404
+
+        kinds = SUGGESTION_KINDS if category == 'any' else [category]
+        suggestions = [suggestion.as_dict() for suggestion in get_suggestions(q, kinds, limit)]
+        response = JsonResponse({'q': q, 'suggestions': suggestions})
+        # Browser repeats prefixes while user corrects typos.
+        patch_cache_control(response, max_age=self.cache_timeout)
+        return response
+
+
+class CatalogExportView(generic.View):
+    """
+    Stream books or reviews as CSV or JSONL file. Available to staff only.
+    'kind' ('books' or 'reviews') and 'format' ('csv' or 'jsonl') url arguments choose the export,
+    'q' and 'category' arguments filter exported books the same way as search does.
+    Unknown argument values lead to 404.
+    Rows are read while response is sent, after middleware is done: export reads primary database
+    and its queries don't count towards request budget and metrics. Under ASGI rows are read
+    in a thread (see book_review.handlers).
+    """
+    content_types = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+    def get(self, request, *args, **kwargs):
+        kind = request.GET.get('kind', 'books')
+        file_format = request.GET.get('format', 'csv')
+        category = request.GET.get('category', 'any')
+        if kind not in EXPORT_KINDS or file_format not in EXPORT_FORMATS or category not in SEARCH_CATEGORIES:
+            raise Http404
+        response = StreamingHttpResponse(
+            export(kind, file_format, request.GET.get('q'), category),
+            content_type=self.content_types[file_format],
+        )
+        response['Content-Disposition'] = 'attachment; filename="{0}.{1}"'.format(kind, file_format)
+        return response
+
+
+class MetricsView(generic.View):
+    """
+    Return request metrics of this process in Prometheus text format (see book_review.custom.metrics).
+    Available to staff users and to clients from 'INTERNAL_IPS' (e.g. Prometheus server), others get 403.
+    """
+    def get(self, request, *args, **kwargs):
+        if not (request.user.is_staff or request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS):
+            raise PermissionDenied
+        response = HttpResponse(metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+        add_never_cache_headers(response)
+        return response
+
+
+class SlowQueriesView(generic.TemplateView):
+    """
+    Return admin page with the slowest queries recorded by this process (see book_review.custom.slow_queries).
+    Available to staff only.
+    """
+    template_name = 'admin/book_review/slow_queries.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(admin.site.each_context(self.request))
+        context.update({
+            'title': 'Slow queries',
+            'enabled': settings.SLOW_QUERIES,
+            'slow_queries': slow_query_log.get_entries(),
+            'threshold': settings.SLOW_QUERY_THRESHOLD * 1000,
+        })
+        return context
@@ -9,8 +9,22 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
+# Read-only views are served by their async versions (see book_review.async_views).
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# Streaming responses (catalog export) query database while they are sent (see book_review.handlers).
+from book_review.handlers import ASGIHandler  # noqa: E402
+
+application = ASGIHandler()
+
+# In-process indexes are loaded before the first request (see book_review.custom.memory_index).
+from book_review.custom.autocomplete import autocomplete_index  # noqa: E402
+from book_review.custom.fuzzy import fuzzy_index  # noqa: E402
+
+autocomplete_index.preload()
+fuzzy_index.preload()
@@ -66,15 +66,53 @@ CRISPY_TEMPLATE_PACK = 'bootstrap5'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise, which also runs under ASGI without holding a thread per request.
+    'book_review.middleware.StaticFilesMiddleware',
+    # Records latency, queries and template render time of requests, if 'METRICS' setting is True.
+    'book_review.middleware.MetricsMiddleware',
+    # Adds ETag, so revalidated pages are answered by 304 without body.
+    'django.middleware.http.ConditionalGetMiddleware',
+    # Marks anonymous responses of read-only views cacheable by shared caches.
+    # Must wrap every middleware setting cookies or Vary header.
+    'book_review.middleware.PublicCacheMiddleware',
+    # Routes reads of read-only views to replicas. Must wrap every middleware writing to database.
+    'book_review.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Doesn't load session of requests without session cookie.
+    'book_review.middleware.LazySessionAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    # Profiles requests of staff users asking for it by 'profile' url argument or 'X-Profile' header.
+    'book_review.middleware.ProfilerMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Records slow queries with their plans, if 'SLOW_QUERIES' setting is True.
+    'book_review.middleware.SlowQueryMiddleware',
+    # Logs requests exceeding database queries budget.
+    'book_review.middleware.QueryBudgetMiddleware',
 ]
 
+# Serve book lists, book details and search by async views (see book_review.async_views).
+# Set by ASGI application, sync WSGI deployment keeps sync views.
+ASYNC_READ_VIEWS = config('ASYNC_READ_VIEWS', default='False') == 'True'
+
+# Request metrics are collected in memory of every process and served at /metrics/
+# to staff users and to clients from INTERNAL_IPS (comma separated).
+METRICS = config('METRICS', default='True') == 'True'
+INTERNAL_IPS = list(filter(None, config('INTERNAL_IPS', default='').split(',')))
+
+# Staff users may profile any request, profiles are downloadable from admin.
+PROFILER = config('PROFILER', default='True') == 'True'
+
+# Queries slower than SLOW_QUERY_THRESHOLD milliseconds in SLOW_QUERY_SAMPLE_RATE share of requests
+# are logged, the slowest ones are shown with their plans at /admin/slow_queries/.
+SLOW_QUERIES = config('SLOW_QUERIES', default='False') == 'True'
+SLOW_QUERY_THRESHOLD = float(config('SLOW_QUERY_THRESHOLD', default='100')) / 1000
+SLOW_QUERY_SAMPLE_RATE = float(config('SLOW_QUERY_SAMPLE_RATE', default='0.1'))
+
+# Raise exception instead of logging if view exceeds its queries budget.
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=str(DEBUG)) == 'True'
+
 ROOT_URLCONF = 'mysite.urls'
 TEMPLATES = [
     {
@@ -109,6 +147,27 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Local memory cache by default. Any backend supporting 'incr' can be used in production (Redis, Memcached).
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Re-render invalidated book pages by background workers (see 'run_workers' management command).
+# Only useful with cache shared between processes, so it's off for default local memory cache.
+WARM_VIEW_CACHE = config('WARM_VIEW_CACHE', default='False') == 'True'
+
+# Sessions are read from cache and written through to database, so they survive cache restarts.
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db')
+# Shared caches keep anonymous book lists, book details and search results for this number of seconds.
+PUBLIC_CACHE_TIMEOUT = int(config('PUBLIC_CACHE_TIMEOUT', default='60'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -167,9 +226,33 @@ DEFAULT_FILE_STORAGE = config('FILE_STORAGE', default='django.core.files.storage
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Dotted path to book search backend class. Chosen by database vendor if empty.
+# See book_review.custom.search_backends.
+BOOK_SEARCH_BACKEND = config('BOOK_SEARCH_BACKEND', default='')
+
+# Fuzzy (trigram similarity) search is used when exact search finds too few books.
+# Words are similar if share of their common trigrams is at least the threshold (0..1).
+FUZZY_SEARCH = config('FUZZY_SEARCH', default='True') == 'True'
+FUZZY_SEARCH_THRESHOLD = config('FUZZY_SEARCH_THRESHOLD', default=0.6, cast=float)
+
 LOGIN_URL = '/login'
 LOGIN_REDIRECT_URL = '/'
 
 # Heroku: Update database configuration from $DATABASE_URL.
 db_from_env = dj_database_url.config(conn_max_age=500)
 DATABASES['default'].update(db_from_env)
+
+# Read replicas: comma separated database urls in $REPLICA_DATABASE_URLS.
+# Read-only views read from them, see book_review.routers.
+# Tests use primary database instead of replicas.
+REPLICA_DATABASES = []
+for number, url in enumerate(filter(None, config('REPLICA_DATABASE_URLS', default='').split(',')), start=1):
+    alias = 'replica{0}'.format(number)
+    DATABASES[alias] = dj_database_url.parse(url.strip(), conn_max_age=500)
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['book_review.routers.ReplicaRouter']
+
+# Seconds during which user reads from primary database after his last write.
+REPLICA_STICKINESS = int(config('REPLICA_STICKINESS', default='10'))
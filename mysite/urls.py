@@ -15,8 +15,11 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from book_review.views import SlowQueriesView
 
 urlpatterns = [
+    # Staff page of slow queries, before admin urls which would match it as an app.
+    path('admin/slow_queries/', admin.site.admin_view(SlowQueriesView.as_view()), name='slow_queries'),
     # admin urls
     path('admin/', admin.site.urls),
     # book_review urls
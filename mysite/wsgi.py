@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mysite.settings')
 
 application = get_wsgi_application()
+
+# In-process indexes are loaded before the first request (see book_review.custom.memory_index).
+from book_review.custom.autocomplete import autocomplete_index  # noqa: E402
+from book_review.custom.fuzzy import fuzzy_index  # noqa: E402
+
+autocomplete_index.preload()
+fuzzy_index.preload()
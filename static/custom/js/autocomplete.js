@@ -0,0 +1,53 @@
+// Shows search-as-you-type suggestions under search field.
+// Suggestions are requested after user stops typing, stale responses are ignored.
+document.addEventListener("DOMContentLoaded", () => {
+  let form = document.querySelector("[data-autocomplete-url]");
+  if (!form) {
+    return;
+  }
+  let input = form.querySelector("input[name='q']");
+  let list = form.querySelector(".search-suggestions");
+  let timer = null;
+  let lastQuery = "";
+
+  function showSuggestions(suggestions) {
+    list.innerHTML = "";
+    for (let suggestion of suggestions) {
+      let link = document.createElement("a");
+      link.className = "list-group-item list-group-item-action";
+      link.href = suggestion.url;
+      link.textContent = suggestion.label;
+      let kind = document.createElement("small");
+      kind.className = "text-muted ms-2";
+      kind.textContent = suggestion.kind;
+      link.appendChild(kind);
+      list.appendChild(link);
+    }
+  }
+
+  input.addEventListener("input", () => {
+    clearTimeout(timer);
+    timer = setTimeout(() => {
+      let query = input.value.trim();
+      lastQuery = query;
+      if (!query) {
+        showSuggestions([]);
+        return;
+      }
+      let url = `${form.dataset.autocompleteUrl}?q=${encodeURIComponent(query)}`;
+      fetch(url)
+        .then((response) => response.json())
+        .then((data) => {
+          if (data.q === lastQuery) {
+            showSuggestions(data.suggestions);
+          }
+        });
+    }, 150);
+  });
+
+  document.addEventListener("click", (event) => {
+    if (!form.contains(event.target)) {
+      showSuggestions([]);
+    }
+  });
+});